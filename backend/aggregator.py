@@ -0,0 +1,264 @@
+from array import array
+from functools import reduce
+from math import gcd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ring_buffer import RingBuffer
+
+
+class RollingWindow:
+    """
+    Taker buy/sell quote volume over a trailing time span. Trades land in
+    fixed-width time buckets held in a ring; buckets that fall out of the span
+    are subtracted from the running totals as time advances, so both adding a
+    trade and reading the totals are O(1) amortized.
+    """
+
+    def __init__(self, span_ms: int, bucket_ms: int):
+        self.span_ms = span_ms
+        self.bucket_ms = bucket_ms
+        self.n = span_ms // bucket_ms
+        self.buy = array("d", [0.0]) * self.n
+        self.sell = array("d", [0.0]) * self.n
+        self.buy_total = 0.0
+        self.sell_total = 0.0
+        self._head: Optional[int] = None  # newest bucket index (ts // bucket_ms)
+
+    def advance(self, ts: int) -> bool:
+        """Evicts buckets older than the span ending at `ts`; True if any of them held volume."""
+        idx = ts // self.bucket_ms
+        head = self._head
+        if head is None:
+            self._head = idx
+            return False
+        if idx <= head:
+            return False
+        if idx - head >= self.n:
+            aged = any(self.buy) or any(self.sell)
+            self.reset()
+            self._head = idx
+            return aged
+        aged = False
+        for b in range(head + 1, idx + 1):
+            slot = b % self.n
+            if self.buy[slot] or self.sell[slot]:
+                aged = True
+                self.buy_total -= self.buy[slot]
+                self.sell_total -= self.sell[slot]
+                self.buy[slot] = 0.0
+                self.sell[slot] = 0.0
+        self._head = idx
+        return aged
+
+    def add(self, volume: float, is_sell: bool, ts: int):
+        self.advance(ts)
+        idx = ts // self.bucket_ms
+        if idx <= self._head - self.n:
+            return  # older than the window
+        slot = idx % self.n
+        if is_sell:
+            self.sell[slot] += volume
+            self.sell_total += volume
+        else:
+            self.buy[slot] += volume
+            self.buy_total += volume
+
+    def reset(self):
+        for i in range(self.n):
+            self.buy[i] = 0.0
+            self.sell[i] = 0.0
+        self.buy_total = 0.0
+        self.sell_total = 0.0
+        self._head = None
+
+    def to_dict(self) -> Dict:
+        # Clamp float drift from repeated add/subtract
+        return {"buy": max(self.buy_total, 0.0), "sell": max(self.sell_total, 0.0)}
+
+
+class Candle:
+    __slots__ = ("time", "open", "high", "low", "close", "volume", "buy_volume", "delta", "cvd")
+
+    def __init__(self, time: int, price: float, cvd: float):
+        self.time = time
+        self.open = self.high = self.low = self.close = price
+        self.volume = 0.0       # quote volume
+        self.buy_volume = 0.0   # taker buy quote volume
+        self.delta = 0.0        # taker buy - taker sell
+        self.cvd = cvd          # running CVD at the candle's last trade
+
+    def to_dict(self) -> Dict:
+        return {
+            "time": self.time, "open": self.open, "high": self.high, "low": self.low,
+            "close": self.close, "volume": self.volume, "delta": self.delta, "cvd": self.cvd,
+        }
+
+
+class CandleSeries:
+    """OHLCV + delta candles built trade by trade; the newest candle is live."""
+
+    def __init__(self, interval_ms: int, depth: int):
+        self.interval_ms = interval_ms
+        self.candles = RingBuffer(depth)
+
+    def add(self, price: float, volume: float, is_sell: bool, ts: int, cvd: float) -> bool:
+        """Applies one trade; returns True if it opened a new candle."""
+        start = ts - ts % self.interval_ms
+        opened = False
+        current = self.candles[-1] if len(self.candles) else None
+        if current is None or start > current.time:
+            current = Candle(start, price, cvd)
+            self.candles.append(current)
+            opened = True
+        elif start < current.time:
+            return False  # late trade for a candle already closed
+        if price > current.high:
+            current.high = price
+        elif price < current.low:
+            current.low = price
+        current.close = price
+        current.volume += volume
+        if is_sell:
+            current.delta -= volume
+        else:
+            current.buy_volume += volume
+            current.delta += volume
+        current.cvd = cvd
+        return opened
+
+    def add_run(self, start: int, open_: float, high: float, low: float, close: float,
+                volume: float, buy_volume: float, cvd: float) -> bool:
+        """
+        Applies a run of trades that all fall in the candle opening at
+        `start`, already summed; returns True if it opened a new candle.
+        """
+        opened = False
+        current = self.candles[-1] if len(self.candles) else None
+        if current is None or start > current.time:
+            current = Candle(start, open_, cvd)
+            self.candles.append(current)
+            opened = True
+        elif start < current.time:
+            return False  # late trades for a candle already closed
+        if high > current.high:
+            current.high = high
+        if low < current.low:
+            current.low = low
+        current.close = close
+        current.volume += volume
+        current.buy_volume += buy_volume
+        current.delta += 2 * buy_volume - volume
+        current.cvd = cvd
+        return opened
+
+    def seed(self, klines: List[list]) -> float:
+        """
+        Warms the series from REST klines; returns the CVD they sum to.
+        Kline rows are [openTime, o, h, l, c, volume, closeTime, quoteVolume,
+        trades, takerBuyBase, takerBuyQuote, ignore].
+        """
+        self.candles.clear()
+        cvd = 0.0
+        for k in klines:
+            candle = Candle(int(k[0]), float(k[1]), 0.0)
+            candle.high, candle.low, candle.close = float(k[2]), float(k[3]), float(k[4])
+            candle.volume = float(k[7])
+            candle.buy_volume = float(k[10])
+            candle.delta = 2 * candle.buy_volume - candle.volume
+            cvd += candle.delta
+            candle.cvd = cvd
+            self.candles.append(candle)
+        return cvd
+
+    def tail(self, count: int) -> List[Candle]:
+        return self.candles.tail(count)
+
+    def clear(self):
+        self.candles.clear()
+
+
+# Rolling taker-volume windows: label -> (span, bucket width) in ms
+WINDOWS = {
+    "1m": (60_000, 1_000),
+    "5m": (300_000, 1_000),
+    "15m": (900_000, 5_000),
+}
+
+
+class TradeAggregator:
+    """Incremental per-trade aggregation: rolling taker windows plus 1m candles."""
+
+    def __init__(self, candle_depth: int = 60, candle_interval_ms: int = 60_000):
+        self.windows = {label: RollingWindow(span, bucket) for label, (span, bucket) in WINDOWS.items()}
+        self.candles = CandleSeries(candle_interval_ms, candle_depth)
+        # Trades in the same slice of this width share a bucket in every window
+        self.slice_ms = reduce(gcd, (w.bucket_ms for w in self.windows.values()))
+
+    def add_trade(self, price: float, volume: float, is_sell: bool, ts: int, cvd: float) -> bool:
+        """Returns True if the trade opened a new candle."""
+        for window in self.windows.values():
+            window.add(volume, is_sell, ts)
+        return self.candles.add(price, volume, is_sell, ts, cvd)
+
+    def add_trades(self, trades: Sequence[Tuple[float, float, bool, int]], cvd: float) -> Tuple[float, int]:
+        """
+        Applies a batch of (price, quantity, is_sell, ts) trades in order,
+        starting from `cvd`; returns the CVD after the batch and the number
+        of candles it opened. Volume is summed per window bucket and trades
+        per candle first, so a burst costs a few window and candle updates
+        instead of a few per trade.
+        """
+        slice_ms = self.slice_ms
+        interval = self.candles.interval_ms
+        slices: Dict[int, List[float]] = {}
+        opened = 0
+        run_start = -1
+        open_ = high = low = close = run_volume = run_buy = 0.0
+        run_cvd = cvd
+        for price, quantity, is_sell, ts in trades:
+            volume = price * quantity
+            sums = slices.get(ts // slice_ms)
+            if sums is None:
+                sums = slices[ts // slice_ms] = [0.0, 0.0]
+            if is_sell:
+                sums[1] += volume
+                cvd -= volume
+            else:
+                sums[0] += volume
+                cvd += volume
+            start = ts - ts % interval
+            if start != run_start:
+                if run_start >= 0:
+                    opened += self.candles.add_run(run_start, open_, high, low, close, run_volume, run_buy, run_cvd)
+                run_start = start
+                open_ = high = low = price
+                run_volume = run_buy = 0.0
+            elif price > high:
+                high = price
+            elif price < low:
+                low = price
+            close = price
+            run_volume += volume
+            if not is_sell:
+                run_buy += volume
+            run_cvd = cvd
+        if run_start >= 0:
+            opened += self.candles.add_run(run_start, open_, high, low, close, run_volume, run_buy, run_cvd)
+        for window in self.windows.values():
+            for idx, (buy, sell) in slices.items():
+                ts = idx * slice_ms
+                if buy:
+                    window.add(buy, False, ts)
+                if sell:
+                    window.add(sell, True, ts)
+        return cvd, opened
+
+    def advance(self, ts: int):
+        """Ages windows out when no trades arrive (call on a clock tick)."""
+        for window in self.windows.values():
+            window.advance(ts)
+
+    def reset(self):
+        for window in self.windows.values():
+            window.reset()
+        self.candles.clear()
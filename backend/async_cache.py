@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger("AsyncCache")
+
+Loader = Callable[[], Awaitable[Any]]
+
+
+class AsyncCache:
+    """
+    TTL + LRU cache for async fetchers, keyed per symbol or source.
+
+    - Fresh (younger than `ttl`): served from memory.
+    - Stale (up to `ttl + stale_ttl`): served from memory while one background
+      refresh runs (stale-while-revalidate); a failed refresh keeps the old value.
+    - Missing/expired: loaded, with concurrent callers for the same key sharing
+      one in-flight load (single-flight) instead of each hitting upstream.
+
+    At most `max_entries` keys are kept, least recently used evicted first.
+    """
+
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0.0, max_entries: int = 256):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, key: Hashable, loader: Loader) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._load(key, loader)
+                return entry[1]
+        self.misses += 1
+        return await asyncio.shield(self._load(key, loader))
+
+    async def refresh(self, key: Hashable, loader: Loader) -> Any:
+        """Loads now regardless of age (still single-flight), e.g. for pollers."""
+        return await asyncio.shield(self._load(key, loader))
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def _load(self, key: Hashable, loader: Loader) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+        task = asyncio.create_task(self._run(key, loader))
+        self._inflight[key] = task
+        # Background refreshes may fail with nobody awaiting them
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return task
+
+    async def _run(self, key: Hashable, loader: Loader) -> Any:
+        try:
+            value = await loader()
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"{self.name} cache load failed for {key}: {e}")
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "errors": self.errors,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 3) if lookups else None,
+        }
@@ -0,0 +1,98 @@
+"""
+Broadcast payload benchmark: full to_dict() every tick vs. snapshot-plus-patch.
+
+Simulates a busy BTCUSDT session at the 250 ms ticker window (mark price
+every tick, trade bursts, occasional liquidations and social messages) and
+reports bytes per second and serialization time per tick for both protocols.
+
+    cd backend && python -m benchmarks.bench_broadcast
+"""
+import argparse
+import json
+import random
+import time
+
+from market_state import DEFAULT_CHANNELS, MarketState, LiquidationEvent
+
+TICK_SECONDS = 0.25
+
+
+def build_state() -> MarketState:
+    state = MarketState(symbol="BTCUSDT")
+    now = int(time.time() * 1000)
+    state.mark_price = 65000.0
+    state.seed_candles([
+        [now - (60 - i) * 60000, "65000", "65010", "64990", str(65000 + i), "10", 0, "650000", 100, "5", "330000", "0"]
+        for i in range(60)
+    ])
+    for i in range(60):
+        state.add_open_interest(now - (60 - i) * 300000, 80000.0 + i)
+    for i in range(50):
+        state.add_liquidation(LiquidationEvent("BTCUSDT", "SELL", 64900.0 + i, 0.5, now))
+    for i in range(30):
+        state.add_social_message(f"BTC market chatter #{i}", "neutral")
+    state.global_news = [{"title": f"Global headline {i}", "url": f"https://news.example/{i}", "source": "cc"} for i in range(15)]
+    state.asset_news = [{"title": f"BTC headline {i}", "url": f"https://news.example/btc/{i}", "source": "cc"} for i in range(10)]
+    state.load_scanner_signals(
+        {"timestamp": "2026-01-01T00:00:00", "symbol": "SOLUSDT", "price": 150.0, "rsi": 70.0, "delta": 1.0, "top_ratio": 1.1}
+        for _ in range(30)
+    )
+    return state
+
+
+def mutate(state: MarketState, rng: random.Random):
+    """One tick of market activity."""
+    state.update_price(state.mark_price + rng.uniform(-5, 5))
+    now = int(time.time() * 1000)
+    for _ in range(rng.randint(0, 40)):
+        state.add_trade(state.mark_price, rng.uniform(0.001, 2), rng.random() < 0.5, now)
+    if rng.random() < 0.1:
+        state.add_liquidation(LiquidationEvent("BTCUSDT", "SELL", state.mark_price, rng.uniform(0.1, 5), 0))
+    if rng.random() < 0.02:
+        state.add_social_message("BTC market update", "bullish")
+
+
+def run(ticks: int, seed: int):
+    results = {}
+
+    rng = random.Random(seed)
+    state = build_state()
+    total_bytes, total_time = 0, 0.0
+    for _ in range(ticks):
+        mutate(state, rng)
+        t0 = time.perf_counter()
+        payload = json.dumps(state.to_dict())
+        total_time += time.perf_counter() - t0
+        total_bytes += len(payload)
+    results["full"] = (total_bytes, total_time)
+
+    rng = random.Random(seed)
+    state = build_state()
+    for channel in DEFAULT_CHANNELS:
+        state.collect_patch(channel)  # clear setup changes; the client already holds this in its snapshot
+    total_bytes, total_time = 0, 0.0
+    for _ in range(ticks):
+        mutate(state, rng)
+        t0 = time.perf_counter()
+        for channel in DEFAULT_CHANNELS:
+            patch = state.collect_patch(channel)
+            if patch:
+                total_bytes += len(json.dumps(patch))
+        total_time += time.perf_counter() - t0
+    results["patch"] = (total_bytes, total_time)
+
+    snapshot_bytes = sum(len(json.dumps(state.snapshot(channel))) for channel in DEFAULT_CHANNELS)
+    seconds = ticks * TICK_SECONDS
+    print(f"{ticks} ticks ({seconds:.0f}s of market time), one client on the default channels")
+    print(f"{'protocol':<10}{'bytes/s':>12}{'us/tick':>12}")
+    for name, (nbytes, elapsed) in results.items():
+        print(f"{name:<10}{nbytes / seconds:>12.0f}{elapsed / ticks * 1e6:>12.1f}")
+    print(f"snapshot on connect: {snapshot_bytes} bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ticks", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.ticks, args.seed)
@@ -0,0 +1,191 @@
+"""
+State bus benchmark: dashboard fan-out in one process vs. split over workers.
+
+Runs a busy BTCUSDT market (bench_push's feed) with N dashboard sockets,
+first all served by the process that also ingests, then with the ingest
+process publishing on the state bus and K worker processes (StateSubscriber
+plus their share of the sockets) fanning out. Each fake socket burns
+`--send-cost` microseconds of CPU per frame, standing in for the WebSocket
+write. Reports event-to-socket latency, frames per dashboard and how busy
+each process was, and checks that every worker's mirror ends up equal to the
+ingest state.
+
+    cd backend && python -m benchmarks.bench_bus
+    cd backend && python -m benchmarks.bench_bus --clients 2000 --workers 4
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from broadcaster import ConnectionManager
+from market_state import MarketState, DEFAULT_CHANNELS
+from state_bus import StatePublisher, StateSubscriber
+from wire_format import decode_message, encode_message
+from benchmarks.bench_fanout import FakeWebSocket
+from benchmarks.bench_push import feed, SYMBOL
+
+
+class CostlyWebSocket(FakeWebSocket):
+    """A socket whose every write keeps the CPU busy for `cost` seconds."""
+
+    def __init__(self, cost: float):
+        super().__init__()
+        self.cost = cost
+
+    async def send_text(self, data: str):
+        end = time.perf_counter() + self.cost
+        while time.perf_counter() < end:
+            pass
+        self.received += 1
+
+
+class Registry:
+    """The ingest side's SymbolRegistry, for a state that already exists."""
+
+    def __init__(self, states):
+        self.states = states
+
+    async def acquire(self, symbol: str):
+        return self.states[symbol]
+
+    async def release(self, symbol: str):
+        pass
+
+
+async def connect(manager: ConnectionManager, clients: int, cost: float):
+    sockets = [CostlyWebSocket(cost) for _ in range(clients)]
+    for ws in sockets:
+        await manager.connect(ws, SYMBOL, DEFAULT_CHANNELS)
+    return sockets
+
+
+def summary(manager: ConnectionManager, sockets, frames_before: int, cpu: float, wall: float) -> dict:
+    stats = manager.stats()
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return {
+        "latency": stats["latency_ms"]["socket"],
+        "frames": sum(ws.received for ws in sockets) - frames_before,
+        "clients": len(sockets),
+        "busy": cpu / wall,
+    }
+
+
+async def single(args) -> dict:
+    manager = ConnectionManager()
+    state = MarketState(symbol=SYMBOL)
+    state.on_change = manager.notifier.notify
+    sockets = await connect(manager, args.clients, args.send_cost)
+    task = asyncio.create_task(manager.run({SYMBOL: state}))
+    await asyncio.sleep(0.5)
+    frames = sum(ws.received for ws in sockets)
+    cpu, wall = time.process_time(), time.monotonic()
+    await feed(state, args.seconds, args.trades_per_second, random.Random(args.seed))
+    await asyncio.sleep(0.5)
+    result = summary(manager, sockets, frames, time.process_time() - cpu, time.monotonic() - wall)
+    task.cancel()
+    return result
+
+
+def worker_main(path: str, clients: int, args, start, results):
+    asyncio.run(worker(path, clients, args, start, results))
+
+
+async def worker(path: str, clients: int, args, start, results):
+    manager = ConnectionManager()
+    bus = StateSubscriber(manager, path=path)
+    tasks = [asyncio.create_task(bus.run())]
+    sockets = await connect(manager, clients, args.send_cost)
+    await bus.acquire(SYMBOL)
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(None, start.wait)
+    frames = sum(ws.received for ws in sockets)
+    cpu, wall = time.process_time(), time.monotonic()
+    while "end" not in bus.docs:  # sent after the last patch, so everything before it has arrived
+        await asyncio.sleep(0.05)
+    while any(client.queue.qsize() for client in manager.clients.values()):
+        await asyncio.sleep(0.05)
+    result = summary(manager, sockets, frames, time.process_time() - cpu, time.monotonic() - wall)
+    mirror = bus.mirrors[SYMBOL]
+    result["mirror"] = {c: mirror.values[c] for c in mirror.seqs}
+    result["gaps"] = bus.gaps
+    for task in tasks:
+        task.cancel()
+    results.put(result)
+
+
+async def split(args) -> tuple:
+    path = os.path.join(tempfile.mkdtemp(), "bench-bus.sock")
+    manager = StatePublisher()
+    state = MarketState(symbol=SYMBOL)
+    state.on_change = manager.notifier.notify
+    await manager.serve(Registry({SYMBOL: state}), {}, path)
+    task = asyncio.create_task(manager.run({SYMBOL: state}))
+
+    ctx = multiprocessing.get_context("spawn")
+    start, results = ctx.Event(), ctx.Queue()
+    share = [args.clients // args.workers + (i < args.clients % args.workers) for i in range(args.workers)]
+    procs = [ctx.Process(target=worker_main, args=(path, n, args, start, results)) for n in share]
+    for proc in procs:
+        proc.start()
+    while len(manager.workers) < args.workers or any(w.needs_snapshot or not w.watching for w in manager.workers):
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+    start.set()
+    cpu, wall = time.process_time(), time.monotonic()
+    await feed(state, args.seconds, args.trades_per_second, random.Random(args.seed))
+    ingest_busy = (time.process_time() - cpu) / (time.monotonic() - wall)
+    while any(state.has_changes(c) for c in DEFAULT_CHANNELS):
+        await asyncio.sleep(0.05)
+    manager.publish_doc("end", True)
+    truth = {c: state.snapshot(c)["set"] for c in DEFAULT_CHANNELS}
+    loop = asyncio.get_running_loop()
+    workers = [await loop.run_in_executor(None, results.get) for _ in procs]
+    for proc in procs:
+        await loop.run_in_executor(None, proc.join)
+    await asyncio.sleep(0.1)  # let the bus connections see the workers go
+    bus = manager.stats()["workers"]
+    task.cancel()
+    await manager.close()
+    for w in workers:
+        assert w.pop("mirror") == wire_values(truth), "worker mirror differs from ingest state"
+    return ingest_busy, bus, workers
+
+
+def wire_values(values: dict) -> dict:
+    """`values` as a worker sees them after the JSON round trip."""
+    return decode_message(encode_message(values))
+
+
+def row(label: str, r: dict):
+    lat = r["latency"]
+    print(f"  {label:<14}{lat.get('p50', 0):>9.1f}{lat.get('p99', 0):>9.1f}{lat.get('max', 0):>9.1f}"
+          f"{r['frames'] / max(r['clients'], 1):>15.0f}{r['busy']:>8.0%}")
+
+
+async def main(args):
+    print(f"{args.clients} dashboards, {args.trades_per_second} trades/s for {args.seconds:.0f}s, "
+          f"{args.send_cost * 1e6:.0f} us per socket write")
+    print(f"  {'process':<14}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'frames/client':>15}{'busy':>8}")
+    row("single", await single(args))
+    ingest_busy, bus, workers = await split(args)
+    print(f"  {'ingest':<14}{'':>42}{ingest_busy:>8.0%}   bus frames {bus['sent']}, "
+          f"{bus['bytes_sent'] / 1e3:,.0f} kB, dropped {bus['dropped']}")
+    for i, r in enumerate(workers):
+        row(f"worker {i}", r)
+    print(f"  worker mirrors match ingest state: ok, seq gaps: {sum(w['gaps'] for w in workers)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--trades-per-second", type=int, default=2000)
+    parser.add_argument("--send-cost", type=float, default=30e-6, help="CPU seconds per socket write")
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
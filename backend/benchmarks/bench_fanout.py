@@ -0,0 +1,112 @@
+"""
+Fan-out load test: sequential send_json per client vs. encode-once with
+per-client bounded send queues (broadcaster.ConnectionManager).
+
+Uses in-process fake WebSockets; a fraction of them sleep on every send to
+model slow consumers on bad links. Reports the broadcast loop's time per tick
+as the number of connections grows.
+
+    cd backend && python -m benchmarks.bench_fanout
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+from broadcaster import ConnectionManager
+from market_state import DEFAULT_CHANNELS
+from benchmarks.bench_broadcast import build_state, mutate
+
+
+class FakeWebSocket:
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.received = 0
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, data: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def send_json(self, data: dict):
+        # Starlette re-encodes for every socket
+        await self.send_text(json.dumps(data, separators=(",", ":")))
+
+
+def make_sockets(n: int, slow_fraction: float, slow_delay: float):
+    n_slow = int(n * slow_fraction)
+    return [FakeWebSocket(slow_delay if i < n_slow else 0.0) for i in range(n)]
+
+
+async def sequential(n: int, ticks: int, slow_fraction: float, slow_delay: float):
+    sockets = make_sockets(n, slow_fraction, slow_delay)
+    state, rng = build_state(), random.Random(1)
+    timings = []
+    for _ in range(ticks):
+        mutate(state, rng)
+        message = state.to_dict()
+        t0 = time.perf_counter()
+        for ws in sockets:
+            await ws.send_json(message)
+        timings.append(time.perf_counter() - t0)
+    return timings, sockets
+
+
+async def queued(n: int, ticks: int, slow_fraction: float, slow_delay: float, tick: float):
+    sockets = make_sockets(n, slow_fraction, slow_delay)
+    manager = ConnectionManager()
+    state, rng = build_state(), random.Random(1)
+    for ws in sockets:
+        await manager.connect(ws, state.symbol)
+    state, rng = build_state(), random.Random(1)
+    timings = []
+    for _ in range(ticks):
+        mutate(state, rng)
+        t0 = time.perf_counter()
+        for channel in DEFAULT_CHANNELS:
+            patch = state.collect_patch(channel)
+            if patch:
+                manager.broadcast(patch, state.symbol, channel)
+            if manager.awaiting_snapshot(state.symbol, channel):
+                manager.send_snapshots(state.snapshot(channel), state.symbol, channel)
+        timings.append(time.perf_counter() - t0)
+        await asyncio.sleep(tick)  # let writer tasks drain between coalescing windows
+    stats = manager.stats()
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return timings, sockets, stats
+
+
+def report(label: str, timings):
+    p50 = statistics.median(timings) * 1000
+    p99 = sorted(timings)[int(len(timings) * 0.99) - 1] * 1000
+    print(f"  {label:<12} p50 {p50:8.2f} ms   p99 {p99:8.2f} ms")
+
+
+async def main(args):
+    for n in args.clients:
+        print(f"{n} clients ({args.slow_fraction:.0%} slow, {args.slow_delay * 1000:.0f} ms per send)")
+        if n <= args.sequential_max:
+            timings, _ = await sequential(n, args.ticks, args.slow_fraction, args.slow_delay)
+            report("sequential", timings)
+        timings, sockets, stats = await queued(n, args.ticks, args.slow_fraction, args.slow_delay, args.tick)
+        report("queued", timings)
+        fast = [ws.received for ws in sockets if not ws.delay]
+        print(f"  fast clients got {min(fast)}-{max(fast)} frames, dropped/coalesced frames: {stats['dropped']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--ticks", type=int, default=100)
+    parser.add_argument("--tick", type=float, default=0.01, help="simulated broadcast interval (s)")
+    parser.add_argument("--slow-fraction", type=float, default=0.1)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--sequential-max", type=int, default=100,
+                        help="skip the sequential baseline above this many clients (it takes too long)")
+    asyncio.run(main(parser.parse_args()))
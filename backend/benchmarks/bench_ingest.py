@@ -0,0 +1,110 @@
+"""
+Ingestion benchmark: stream frames per second per core, per frame vs. batched.
+
+Replays a burst of raw combined-stream frames (a capture from
+`--jsonl`, or a synthetic cascade of dense aggTrades with mark prices and
+liquidations) through BinanceClient on one core: first the old way (stdlib
+json.loads and one frame at a time), then decode_message plus
+_handle_batch at several batch sizes, which is what the live socket does with
+everything that arrived in one event-loop turn. Reports frames/s of CPU time
+and whether that keeps up with the burst's own rate.
+
+    cd backend && python -m benchmarks.bench_ingest
+    cd backend && python -m benchmarks.bench_ingest --jsonl capture.jsonl.gz
+"""
+import argparse
+import itertools
+import json
+import random
+import time
+
+from binance_client import BinanceClient
+from market_state import MarketState
+from replay import read_jsonl, event_time
+from wire_format import decode_message, orjson
+
+START_MS = 1_700_000_000_000
+
+
+def synthetic_burst(symbols: int, seconds: int, trades_per_second: int, seed: int):
+    """A cascade: per symbol and second, dense aggTrades, some liquidations and a markPrice."""
+    rng = random.Random(seed)
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    price = [rng.uniform(1, 50000) for _ in names]
+    for second in range(seconds):
+        base = START_MS + second * 1000
+        for t in range(trades_per_second):
+            ts = base + t * 1000 // trades_per_second
+            for i, name in enumerate(names):
+                price[i] *= 1 - 0.00002 + rng.gauss(0, 0.00005)
+                yield {"stream": f"{name.lower()}@aggTrade",
+                       "data": {"e": "aggTrade", "E": ts, "s": name, "a": ts, "p": f"{price[i]:.4f}",
+                                "q": f"{rng.expovariate(2):.3f}", "f": 1, "l": 1, "T": ts, "m": rng.random() < 0.7}}
+                if rng.random() < 0.02:
+                    yield {"stream": "!forceOrder@arr",
+                           "data": {"e": "forceOrder", "E": ts,
+                                    "o": {"s": name, "S": "SELL", "o": "LIMIT", "f": "IOC", "q": f"{rng.expovariate(1):.3f}",
+                                          "p": f"{price[i] * 0.999:.4f}", "ap": f"{price[i]:.4f}", "X": "FILLED",
+                                          "l": "0.1", "z": "0.1", "T": ts}}}
+        for i, name in enumerate(names):
+            yield {"stream": f"{name.lower()}@markPrice",
+                   "data": {"e": "markPriceUpdate", "E": base + 999, "s": name, "p": f"{price[i]:.4f}",
+                            "P": f"{price[i] * 0.9999:.4f}", "i": f"{price[i]:.4f}", "r": "0.0001", "T": base}}
+
+
+def client_for(frames) -> BinanceClient:
+    client = BinanceClient()
+    for frame in frames:
+        data = frame["data"]
+        symbol = data.get("s") or data.get("o", {}).get("s")
+        if symbol and symbol not in client.states:
+            client.states[symbol] = MarketState(symbol=symbol)
+    return client
+
+
+def per_frame(raw, frames) -> float:
+    client = client_for(frames)
+    t0 = time.process_time()
+    for text in raw:
+        client._handle_stream_message(json.loads(text))
+    return time.process_time() - t0
+
+
+def batched(raw, frames, size: int) -> float:
+    client = client_for(frames)
+    t0 = time.process_time()
+    for i in range(0, len(raw), size):
+        client._handle_batch([decode_message(text) for text in raw[i:i + size]])
+    return time.process_time() - t0
+
+
+def run(frames, batch_sizes):
+    frames = [f for f in frames if isinstance(f.get("data"), dict)]
+    raw = [json.dumps(f, separators=(",", ":")) for f in frames]
+    span = max((event_time(frames[-1]) - event_time(frames[0])) / 1000, 1e-3)
+    rate = len(frames) / span
+    print(f"{len(frames)} frames over {span:.0f}s of market time ({rate:,.0f} frames/s), "
+          f"decoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"  {'mode':<22}{'frames/s/core':>15}{'us/frame':>10}{'headroom':>10}")
+    for label, seconds in [("per frame, json", per_frame(raw, frames))] + [
+        (f"batched x{size}", batched(raw, frames, size)) for size in batch_sizes
+    ]:
+        throughput = len(frames) / seconds
+        print(f"  {label:<22}{throughput:>15,.0f}{seconds / len(frames) * 1e6:>10.2f}{throughput / rate:>9.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jsonl", help="captured combined-stream frames, one per line (optionally .gz)")
+    parser.add_argument("--limit", type=int, default=300_000, help="frames to read from the capture")
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--trades-per-second", type=int, default=1000, help="per symbol, synthetic burst")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64, 512])
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+    if args.jsonl:
+        source = itertools.islice(read_jsonl(args.jsonl), args.limit)
+    else:
+        source = synthetic_burst(args.symbols, args.seconds, args.trades_per_second, args.seed)
+    run(list(source), args.batch_sizes)
@@ -0,0 +1,109 @@
+"""
+Liquidation heatmap benchmark: a liquidation cascade through LiquidationMap.
+
+Drives a long-squeeze cascade (price sliding several percent with bursts of
+forced orders) into one symbol's LiquidationMap and reports the cost per
+liquidation, the cost of building the wire view, the view's payload size
+and the aggregator's memory, against keeping every event and sending it as a
+raw list. Checks the heatmap cells against a brute-force histogram of the
+raw events.
+
+    cd backend && python -m benchmarks.bench_liquidations
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+import numpy as np
+
+from liquidation_heatmap import LiquidationMap, LONG, SHORT, liquidated_side
+from wire_format import encode_message
+
+START_TS = 1_700_000_000_000
+
+
+def cascade(seconds: int, peak_rate: int, drop: float, seed: int):
+    """(side, price, qty, ts) events: quiet, then a cascade peaking mid-way, then quiet."""
+    rng = random.Random(seed)
+    price = 65000.0
+    events = []
+    for second in range(seconds):
+        # Bell-shaped intensity around the middle of the run
+        intensity = math.exp(-((second - seconds / 2) / (seconds / 8)) ** 2)
+        price *= 1 - drop / seconds * 4 * intensity + rng.gauss(0, 0.0003)
+        n = int(peak_rate * intensity) + (rng.random() < 0.2)
+        for _ in range(n):
+            side = "SELL" if rng.random() < 0.85 else "BUY"
+            events.append((side, price * (1 + rng.gauss(0, 0.001)), rng.expovariate(1 / 0.5),
+                           START_TS + second * 1000 + rng.randrange(1000)))
+    events.sort(key=lambda e: e[3])
+    return events
+
+
+def raw_view(events):
+    return [{"price": p, "side": s, "qty": q, "ts": ts} for s, p, q, ts in events]
+
+
+def check(liq: LiquidationMap, events):
+    """Every in-window event lands in the cell the heatmap reports for it."""
+    heatmap = liq.heatmap
+    view = heatmap.to_dict(max_bins=heatmap.bins)
+    cells = {(r, b): (lo, sh) for r, b, lo, sh in zip(view["rows"], view["bins"], view["long"], view["short"])}
+    start = view["start"]
+    expected = {}
+    base = math.floor(math.log(view["prices"][0]) / heatmap.step + 0.5)
+    for side, price, qty, ts in events:
+        row = (ts - start) // heatmap.bucket_ms
+        col = math.floor(math.log(price) / heatmap.step) - base
+        if row < 0 or not 0 <= col < len(view["prices"]) - 1:
+            continue  # aged out or dropped by a re-centre
+        cell = expected.setdefault((row, col), [0.0, 0.0])
+        cell[liquidated_side(side)] += price * qty
+    assert cells.keys() == expected.keys(), "heatmap cells differ from brute force"
+    for key, (lo, sh) in cells.items():
+        assert abs(lo - expected[key][LONG]) <= 1 and abs(sh - expected[key][SHORT]) <= 1, key
+    totals = liq.totals.to_dict()["1h"]
+    assert abs(totals["long"] + totals["short"] - sum(p * q for _, p, q, _ in events)) < 1e-6 * totals["long"]
+
+
+def run(seconds: int, peak_rate: int, drop: float, seed: int):
+    events = cascade(seconds, peak_rate, drop, seed)
+    liq = LiquidationMap()
+    timings = []
+    for side, price, qty, ts in events:
+        t0 = time.perf_counter()
+        liq.add(side, price, qty, ts)
+        timings.append(time.perf_counter() - t0)
+    check(liq, events)
+
+    t0 = time.perf_counter()
+    for _ in range(50):
+        view = liq.to_dict()
+    view_us = (time.perf_counter() - t0) / 50 * 1e6
+    payload = len(encode_message(view))
+
+    t0 = time.perf_counter()
+    raw = encode_message(raw_view(events))
+    raw_us = (time.perf_counter() - t0) * 1e6
+
+    peak = max(np.bincount([(ts - START_TS) // 1000 for *_, ts in events]))
+    low = min(p for _, p, _, _ in events)
+    high = max(p for _, p, _, _ in events)
+    print(f"{len(events)} liquidations over {seconds}s (peak {peak}/s), price {high:,.0f} -> {low:,.0f}")
+    print(f"  heatmap: add p50 {statistics.median(timings) * 1e6:.1f} us, p99 {sorted(timings)[int(len(timings) * 0.99)] * 1e6:.1f} us, "
+          f"view {view_us:.0f} us, payload {payload:,} B ({len(view['heatmap']['rows'])} cells), "
+          f"memory {liq.heatmap.grid.nbytes:,} B fixed, {liq.heatmap.recenters} re-centres")
+    print(f"  raw list: payload {len(raw):,} B, encode {raw_us:.0f} us, grows with the cascade")
+    print("  brute-force match: ok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--seconds", type=int, default=1800)
+    parser.add_argument("--peak-rate", type=int, default=300, help="liquidations per second at the cascade peak")
+    parser.add_argument("--drop", type=float, default=0.12, help="fractional price drop over the cascade")
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+    run(args.seconds, args.peak_rate, args.drop, args.seed)
@@ -0,0 +1,126 @@
+"""
+Instrumentation overhead benchmark: /metrics on vs. off on the hot paths.
+
+Times the primitives (Counter.inc, Histogram.observe, a perf_counter pair,
+LatencyStats.add bare, with its histogram and with the 1-in-N sampling
+the /ws socket stage uses), then runs two real workloads with the registry enabled and disabled, interleaved and best of
+several rounds: stream ingestion (bench_ingest's synthetic cascade through
+_drain_batch, decode included) and the /ws flush loop (bench_broadcast's
+market activity, flush_due plus the client writers, many dashboards), the
+latter with free sockets (the worst case: the per-write latency bookkeeping
+is all there is) and with sockets that cost `--send-cost` per write like a real
+one. Reports the overhead of each and the cost of one /metrics scrape.
+
+    cd backend && python -m benchmarks.bench_metrics
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from broadcaster import ConnectionManager, LatencyStats, SOCKET_HISTOGRAM_EVERY
+from metrics import REGISTRY, Counter, Histogram, render
+from benchmarks.bench_broadcast import build_state, mutate
+from benchmarks.bench_bus import CostlyWebSocket
+from benchmarks.bench_ingest import client_for, synthetic_burst
+
+
+def per_call_ns(fn, n: int = 200_000) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e9
+
+
+def primitives():
+    counter, histogram = Counter(), Histogram()
+    plain, fed = LatencyStats(), LatencyStats(histogram=Histogram())
+    sampled = LatencyStats(histogram=Histogram(), histogram_every=SOCKET_HISTOGRAM_EVERY)
+    baseline = per_call_ns(lambda: None)
+    perf_counter = time.perf_counter
+    rows = [
+        ("Counter.inc", per_call_ns(counter.inc)),
+        ("Histogram.observe", per_call_ns(lambda: histogram.observe(0.00042))),
+        ("perf_counter pair", per_call_ns(lambda: perf_counter() - perf_counter())),
+        ("LatencyStats.add", per_call_ns(lambda: plain.add(12.5))),
+        ("  + histogram", per_call_ns(lambda: fed.add(12.5))),
+        (f"  + histogram 1/{SOCKET_HISTOGRAM_EVERY}", per_call_ns(lambda: sampled.add(12.5))),
+    ]
+    print("primitives (ns per call, call overhead subtracted)")
+    for label, ns in rows:
+        print(f"  {label:<22}{ns - baseline:>8.0f}")
+
+
+def ingest(raw, frames, batch: int) -> float:
+    client = client_for(frames)
+    start = time.process_time()
+    for i in range(0, len(raw), batch):
+        client._drain_batch(raw[i:i + batch])
+    return time.process_time() - start
+
+
+async def fanout(clients: int, ticks: int, send_cost: float) -> float:
+    manager = ConnectionManager()
+    state = build_state()
+    sockets = [CostlyWebSocket(send_cost) for _ in range(clients)]
+    for ws in sockets:
+        await manager.connect(ws, state.symbol)
+    states = {state.symbol: state}
+    rng = random.Random(1)
+    manager.flush_due(states, float("inf"))  # initial snapshots
+    await asyncio.sleep(0)
+    state.pending_since = lambda channel: int(time.time() * 1000) - 50  # every patch carries an event time
+    start = time.process_time()
+    for _ in range(ticks):
+        mutate(state, rng)
+        manager.flush_due(states, float("inf"))
+        for _ in range(3):  # let every writer drain its queue
+            await asyncio.sleep(0)
+    elapsed = time.process_time() - start
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return elapsed
+
+
+def compare(label: str, run, rounds: int):
+    """Best of `rounds` for each setting, alternating so drift hits both alike."""
+    on, off = [], []
+    for _ in range(rounds):
+        REGISTRY.set_enabled(False)
+        off.append(run())
+        REGISTRY.set_enabled(True)
+        on.append(run())
+    best_on, best_off = min(on), min(off)
+    print(f"  {label:<34}{best_off * 1000:>10.1f}{best_on * 1000:>10.1f}{(best_on / best_off - 1) * 100:>+10.2f}%")
+
+
+def main(args):
+    primitives()
+
+    frames = [f for f in synthetic_burst(args.symbols, args.seconds, args.trades_per_second, 17)]
+    raw = [json.dumps(f, separators=(",", ":")) for f in frames]
+    print(f"workloads (CPU ms, metrics off / on, best of {args.rounds})")
+    compare(f"ingest {len(raw):,} frames x{args.batch}", lambda: ingest(raw, frames, args.batch), args.rounds)
+    for cost in (0.0, args.send_cost):
+        compare(f"flush, {args.clients} clients, {cost * 1e6:.0f} us/write",
+                lambda: asyncio.run(fanout(args.clients, args.ticks, cost)), args.rounds)
+
+    start = time.perf_counter()
+    for _ in range(20):
+        page = render(REGISTRY.collect())
+    print(f"/metrics scrape: {(time.perf_counter() - start) / 20 * 1000:.2f} ms, "
+          f"{len(page):,} B, {len(REGISTRY.families)} families")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=10)
+    parser.add_argument("--seconds", type=int, default=10)
+    parser.add_argument("--trades-per-second", type=int, default=1000, help="per symbol")
+    parser.add_argument("--batch", type=int, default=64, help="frames per ingest batch")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--send-cost", type=float, default=10e-6, help="CPU seconds per socket write")
+    parser.add_argument("--rounds", type=int, default=5)
+    main(parser.parse_args())
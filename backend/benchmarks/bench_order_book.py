@@ -0,0 +1,164 @@
+"""
+Order book benchmark: local L2 book under a BTCUSDT-like depth diff stream.
+
+Generates a 1000-level snapshot and @depth@100ms diffs (random walk mid,
+level churn clustered near the touch) and reports how long each diff blocks
+the event loop, level updates per second and the cost of building the
+metrics view, against a plain dict book that sorts on every read. Also checks
+the book against the generator's reference and exercises gap detection.
+
+    cd backend && python -m benchmarks.bench_order_book
+"""
+import argparse
+import heapq
+import random
+import statistics
+import time
+
+from order_book import OrderBook, BOOK_BANDS, WALL_BAND, WALL_COUNT
+
+TICK = 0.1
+
+
+def synthetic_depth(levels: int, events: int, changes: int, seed: int):
+    """
+    (snapshot, diffs, reference book) with Binance futures U/u/pu numbering.
+    The snapshot is taken right after the first diff, so that diff straddles
+    its lastUpdateId like a real one does.
+    """
+    rng = random.Random(seed)
+    mid = 65000.0
+    bids = {round(mid - (i + 1) * TICK, 1): rng.uniform(0.001, 5) for i in range(levels)}
+    asks = {round(mid + (i + 1) * TICK, 1): rng.uniform(0.001, 5) for i in range(levels)}
+    update_id = 1_000_000
+    snapshot = None
+    diffs = []
+    ts = 1_700_000_000_000
+    for _ in range(events):
+        mid = round(mid + rng.choice((-1, 0, 0, 1)) * TICK * rng.randint(0, 3), 1)
+        b, a = {}, {}
+        # Levels the move crossed are pulled
+        for p in [p for p in bids if p >= mid]:
+            b[p] = 0.0
+        for p in [p for p in asks if p <= mid]:
+            a[p] = 0.0
+        for _ in range(changes):
+            side, book = (b, bids) if rng.random() < 0.5 else (a, asks)
+            distance = int(abs(rng.gauss(0, 40))) + 1
+            price = round(mid - distance * TICK if side is b else mid + distance * TICK, 1)
+            side[price] = 0.0 if price in book and rng.random() < 0.3 else round(rng.uniform(0.001, 8), 3)
+        for p, q in b.items():
+            bids.pop(p, None) if q == 0 else bids.__setitem__(p, q)
+        for p, q in a.items():
+            asks.pop(p, None) if q == 0 else asks.__setitem__(p, q)
+        ts += 100
+        first = update_id + 1
+        update_id += rng.randint(1, 20)
+        diffs.append({
+            "e": "depthUpdate", "E": ts, "s": "BTCUSDT",
+            "U": first, "u": update_id, "pu": diffs[-1]["u"] if diffs else first - 1,
+            "b": [[str(p), str(q)] for p, q in b.items()],
+            "a": [[str(p), str(q)] for p, q in a.items()],
+        })
+        if snapshot is None:
+            snapshot = {
+                "lastUpdateId": rng.randint(first, update_id),
+                "bids": [[str(p), str(q)] for p, q in sorted(bids.items(), reverse=True)],
+                "asks": [[str(p), str(q)] for p, q in sorted(asks.items())],
+            }
+    return snapshot, diffs, (bids, asks)
+
+
+class DictBook:
+    """Baseline: unsorted dicts, sorted and summed on every metrics read."""
+
+    def __init__(self, snapshot):
+        self.bids = {float(p): float(q) for p, q in snapshot["bids"]}
+        self.asks = {float(p): float(q) for p, q in snapshot["asks"]}
+
+    def apply(self, event):
+        for book, levels in ((self.bids, event["b"]), (self.asks, event["a"])):
+            for p, q in levels:
+                price, qty = float(p), float(q)
+                if qty == 0.0:
+                    book.pop(price, None)
+                else:
+                    book[price] = qty
+
+    def metrics(self):
+        bids = sorted(self.bids.items(), reverse=True)
+        asks = sorted(self.asks.items())
+        mid = (bids[0][0] + asks[0][0]) / 2
+        depth = [
+            (sum(p * q for p, q in bids if p >= mid * (1 - band)), sum(p * q for p, q in asks if p <= mid * (1 + band)))
+            for band in BOOK_BANDS
+        ]
+        walls = [
+            heapq.nlargest(WALL_COUNT, [(p * q, p) for p, q in bids if p >= mid * (1 - WALL_BAND)]),
+            heapq.nlargest(WALL_COUNT, [(p * q, p) for p, q in asks if p <= mid * (1 + WALL_BAND)]),
+        ]
+        return depth, walls
+
+
+def check(book: OrderBook, reference):
+    bids, asks = reference
+    assert book.bids.qty == bids and book.asks.qty == asks, "book diverged from reference"
+    mid = book.anchor
+    for i, band in enumerate(BOOK_BANDS):
+        expected = sum(p * q for p, q in bids.items() if p >= mid * (1 - band))
+        assert abs(book.bid_depth[i] - expected) <= 1e-6 * max(expected, 1), (band, book.bid_depth[i], expected)
+
+
+def run(levels: int, events: int, changes: int, seed: int):
+    snapshot, diffs, reference = synthetic_depth(levels, events, changes, seed)
+    n_updates = sum(len(d["b"]) + len(d["a"]) for d in diffs)
+
+    book = OrderBook()
+    book.apply(diffs[0])  # buffered until the snapshot arrives
+    assert book.load_snapshot(snapshot)
+    timings = []
+    for diff in diffs[1:]:
+        t0 = time.perf_counter()
+        assert book.apply(diff)
+        timings.append(time.perf_counter() - t0)
+    check(book, reference)
+    t0 = time.perf_counter()
+    for _ in range(100):
+        book.metrics()
+    metrics_us = (time.perf_counter() - t0) / 100 * 1e6
+
+    baseline = DictBook(snapshot)
+    t0 = time.perf_counter()
+    for diff in diffs:
+        baseline.apply(diff)
+    baseline_apply = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for _ in range(100):
+        baseline.metrics()
+    baseline_metrics_us = (time.perf_counter() - t0) / 100 * 1e6
+
+    # Gap detection: drop one diff, the next must fail and the book go back to buffering
+    gap = OrderBook()
+    gap.load_snapshot(snapshot)
+    for diff in diffs[:10]:
+        gap.apply(diff)
+    detected = not gap.apply(diffs[11]) and not gap.synced
+
+    span = len(diffs) * 0.1
+    total = sum(timings)
+    print(f"{len(diffs)} diffs ({span:.0f}s at 100 ms), {n_updates} level updates, {levels} levels per side")
+    print(f"  sorted book: {n_updates / total:,.0f} level updates/s, per diff p50 {statistics.median(timings) * 1e6:.0f} us, "
+          f"p99 {sorted(timings)[int(len(timings) * 0.99)] * 1e6:.0f} us, max {max(timings) * 1e6:.0f} us "
+          f"({total / span * 100:.2f}% of one core), metrics {metrics_us:.0f} us, {book.rebases} re-anchors")
+    print(f"  dict book:   {n_updates / baseline_apply:,.0f} level updates/s, metrics {baseline_metrics_us:.0f} us")
+    print(f"  reference match: ok, gap detected: {detected}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--levels", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=6000)
+    parser.add_argument("--changes", type=int, default=150, help="level changes per diff")
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    run(args.levels, args.events, args.changes, args.seed)
@@ -0,0 +1,92 @@
+"""
+Push latency benchmark: fixed 250 ms broadcast loop vs. event-driven push.
+
+Feeds live-timestamped market events into a MarketState watched by a few
+fake clients and reports exchange-event-to-socket latency, frames per client
+and loop wake-ups for the old fixed-cadence loop and for
+ConnectionManager.run (flush at once when idle, coalesce under load). Runs a
+quiet market (sparse liquidations only) and a busy one (trade bursts).
+
+    cd backend && python -m benchmarks.bench_push
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from broadcaster import ConnectionManager
+from market_state import MarketState, LiquidationEvent
+from benchmarks.bench_fanout import FakeWebSocket
+
+SYMBOL = "BTCUSDT"
+
+
+async def fixed_loop(manager: ConnectionManager, states: dict, tick: float):
+    """The previous broadcast loop: wake every `tick` and flush every channel."""
+    while True:
+        await asyncio.sleep(tick)
+        manager.notifier.wakeups += 1
+        manager.flush_due(states, float("inf"))
+
+
+async def feed(state: MarketState, seconds: float, trades_per_second: int, rng: random.Random):
+    price = 65000.0
+    end = time.monotonic() + seconds
+    while time.monotonic() < end:
+        now = int(time.time() * 1000)
+        if trades_per_second:
+            # Trades arrive in bursts of ~10 ms worth
+            for _ in range(max(1, trades_per_second // 100)):
+                price += rng.uniform(-2, 2)
+                state.add_trade(price, rng.uniform(0.001, 1), rng.random() < 0.5, now)
+            await asyncio.sleep(0.01)
+        else:
+            await asyncio.sleep(rng.uniform(0.2, 0.6))
+        if not trades_per_second or rng.random() < 0.02:
+            state.add_liquidation(LiquidationEvent(SYMBOL, "SELL", price, rng.uniform(0.1, 5), int(time.time() * 1000)))
+
+
+async def run(mode: str, clients: int, seconds: float, trades_per_second: int, seed: int) -> dict:
+    manager = ConnectionManager()
+    state = MarketState(symbol=SYMBOL)
+    state.on_change = manager.notifier.notify
+    states = {SYMBOL: state}
+    sockets = [FakeWebSocket() for _ in range(clients)]
+    for ws in sockets:
+        await manager.connect(ws, SYMBOL)
+    loop = manager.run(states) if mode == "event" else fixed_loop(manager, states, 0.25)
+    task = asyncio.create_task(loop)
+    await asyncio.sleep(0.3)  # initial snapshots
+    frames = sum(ws.received for ws in sockets)
+    await feed(state, seconds, trades_per_second, random.Random(seed))
+    await asyncio.sleep(0.3)  # drain the last window
+    task.cancel()
+    stats = manager.stats()
+    for ws in list(manager.clients):
+        manager.disconnect(ws)
+    return {
+        "latency": stats["latency_ms"]["socket"],
+        "frames_per_client": (sum(ws.received for ws in sockets) - frames) / clients,
+        "wakeups": stats["wakeups"],
+    }
+
+
+async def main(args):
+    scenarios = [("quiet", 0), ("busy", args.trades_per_second)]
+    for name, tps in scenarios:
+        print(f"{name} market ({tps} trades/s, {args.seconds:.0f}s, {args.clients} clients)")
+        print(f"  {'loop':<8}{'p50 ms':>9}{'p99 ms':>9}{'max ms':>9}{'frames/client':>15}{'wakeups':>9}")
+        for mode in ("fixed", "event"):
+            r = await run(mode, args.clients, args.seconds, tps, args.seed)
+            lat = r["latency"]
+            print(f"  {mode:<8}{lat.get('p50', 0):>9.1f}{lat.get('p99', 0):>9.1f}{lat.get('max', 0):>9.1f}"
+                  f"{r['frames_per_client']:>15.0f}{r['wakeups']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--trades-per-second", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,86 @@
+"""
+Tick recorder cost: per-message aggTrade handler time with and without a
+TickRecorder attached, whether the event loop keeps up with a paced 10k
+msg/s feed while the writer thread flushes, and how long reading a recorded
+day back takes via memmap.
+
+    cd backend && python -m benchmarks.bench_recorder
+"""
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+
+from binance_client import BinanceClient
+from market_state import MarketState
+from recorder import TickRecorder, load, _day
+
+SYMBOL = "BTCUSDT"
+T0 = 1_700_000_000_000
+
+
+def frames(n: int):
+    return [
+        {"stream": "btcusdt@aggTrade",
+         "data": {"e": "aggTrade", "E": T0 + i, "s": SYMBOL, "p": f"{65000 + i % 50}.1",
+                  "q": "0.015", "m": bool(i & 1)}}
+        for i in range(n)
+    ]
+
+
+def client(recorder=None) -> BinanceClient:
+    c = BinanceClient(recorder=recorder)
+    c.states[SYMBOL] = MarketState(symbol=SYMBOL)
+    return c
+
+
+def handler_ns(c: BinanceClient, msgs) -> float:
+    t0 = time.perf_counter()
+    for m in msgs:
+        c._handle_stream_message(m)
+    return (time.perf_counter() - t0) / len(msgs) * 1e9
+
+
+async def paced(c: BinanceClient, msgs, rate: int) -> float:
+    """Feeds msgs in 10ms batches at `rate` msg/s; returns worst batch lateness (ms)."""
+    c.recorder.start()
+    per_batch = rate // 100
+    start = time.perf_counter()
+    worst = 0.0
+    for b in range(0, len(msgs), per_batch):
+        due = start + b / rate
+        worst = max(worst, time.perf_counter() - due)
+        for m in msgs[b:b + per_batch]:
+            c._handle_stream_message(m)
+        await asyncio.sleep(max(0.0, due + 0.01 - time.perf_counter()))
+    await c.recorder.stop()
+    return worst * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--rate", type=int, default=10_000)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="ticks-")
+    try:
+        msgs = frames(args.messages)
+        base = min(handler_ns(client(), msgs) for _ in range(3))
+        rec = min(handler_ns(client(TickRecorder(root)), msgs) for _ in range(3))
+        print(f"handler ns/msg   without recorder {base:8.0f}   with recorder {rec:8.0f}")
+
+        shutil.rmtree(root)
+        recorder = TickRecorder(root, flush_interval=0.5)
+        paced_msgs = msgs[: args.rate * 5]
+        lag = asyncio.run(paced(client(recorder), paced_msgs, args.rate))
+        print(f"paced {args.rate} msg/s for {len(paced_msgs) // args.rate}s   "
+              f"worst batch lateness {lag:.2f} ms   records written {recorder.records_written}")
+
+        t0 = time.perf_counter()
+        trades = load(root, _day(T0), SYMBOL, "trade")
+        vwap = float((trades["price"] * trades["qty"]).sum() / trades["qty"].sum())
+        print(f"memmap load + vwap over {len(trades)} trades   {(time.perf_counter() - t0) * 1000:.2f} ms   vwap {vwap:.2f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,32 @@
+"""
+Ingestion regression benchmark: a seeded synthetic market replayed as fast as
+possible through BinanceClient._handle_stream_message and SignalScanner.detect.
+Frames are generated up front so only the live code paths are timed.
+
+    cd backend && python -m benchmarks.bench_replay
+"""
+import argparse
+import asyncio
+import json
+
+from replay import ReplayEngine, synthetic
+from scanner import SignalScanner
+
+
+async def run(symbols: int, minutes: int, seed: int) -> dict:
+    frames = list(synthetic(symbols, minutes, seed=seed))
+    scanner = SignalScanner(state=None, db_path=":memory:")
+    await scanner.store.open()
+    engine = ReplayEngine(scanner=scanner)
+    stats = await engine.run(frames)
+    await scanner.stop()
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--minutes", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.symbols, args.minutes, args.seed)), indent=2))
@@ -0,0 +1,68 @@
+"""
+Scanner frame cost: one all-ticker frame (every USDT perp) applied to
+UniverseIndicators and scanned for RSI/volume signals, plus the per-event
+cost of the kline_1m updates that feed the minute volumes.
+
+    cd backend && python -m benchmarks.bench_scanner
+"""
+import argparse
+import random
+import statistics
+import time
+
+from indicators import UniverseIndicators
+
+
+def make_frames(symbols: int, frames: int, seed: int):
+    rng = random.Random(seed)
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    price = [rng.uniform(0.01, 50000) for _ in names]
+    volume = [rng.uniform(1e5, 1e8) for _ in names]
+    minute_volume = [0.0] * symbols
+    out = []
+    for f in range(frames):
+        items, klines = [], []
+        if f % 60 == 0:
+            minute_volume = [0.0] * symbols
+        for i, name in enumerate(names):
+            price[i] *= 1 + rng.gauss(0, 0.002)
+            traded = rng.uniform(0, 1e3)
+            volume[i] += traded
+            minute_volume[i] += traded
+            items.append({"e": "24hrTicker", "E": f * 1000, "s": name, "c": f"{price[i]:.6f}",
+                          "o": f"{price[i] * 0.97:.6f}", "v": f"{volume[i]:.3f}"})
+            klines.append({"e": "kline", "E": f * 1000, "s": name,
+                           "k": {"t": f // 60 * 60_000, "v": f"{minute_volume[i]:.3f}"}})
+        out.append((items, klines))
+    return out
+
+
+def run(symbols: int, frames: int, seed: int):
+    data = make_frames(symbols, frames, seed)
+    ind = UniverseIndicators()
+    update_t, scan_t, kline_t, hits = [], [], [], 0
+    for items, klines in data:
+        t0 = time.perf_counter()
+        for event in klines:
+            ind.update_kline(event["s"], int(event["k"]["t"]), float(event["k"]["v"]))
+        kline_t.append((time.perf_counter() - t0) / len(klines))
+        t0 = time.perf_counter()
+        ind.update(items, items[0]["E"])
+        t1 = time.perf_counter()
+        hits += len(ind.scan(2.5, 65, 35))
+        t2 = time.perf_counter()
+        update_t.append(t1 - t0)
+        scan_t.append(t2 - t1)
+    print(f"{symbols} symbols, {frames} frames ({frames // 60} simulated minutes), {hits} hits")
+    print(f"  update (parse + vectorized apply): p50 {statistics.median(update_t) * 1e6:8.1f} us")
+    print(f"  scan (RSI + volume + thresholds):  p50 {statistics.median(scan_t) * 1e6:8.1f} us")
+    print(f"  kline_1m update, per event:        p50 {statistics.median(kline_t) * 1e6:8.1f} us")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=300)
+    parser.add_argument("--frames", type=int, default=1800)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    run(args.symbols, args.frames, args.seed)
@@ -0,0 +1,107 @@
+"""
+Time-series store benchmark: history ingest, rollups and chart queries.
+
+Feeds --days of synthetic history for --symbols symbols through SeriesStore
+the way the live feed does (funding and basis with every markPrice, OI and
+the three long/short shares every 5 minutes), group-committing once per
+simulated `--flush-every` seconds, then applies retention. Then times chart
+queries as /series runs them: a day, a week and a month of every metric at
+the resolution the store picks, and a week at each fixed resolution.
+Reports samples/s, rows and database size, and query latency. Backfill is
+skipped (the symbols are marked as done), so it runs offline.
+
+    cd backend && python -m benchmarks.bench_series
+    cd backend && python -m benchmarks.bench_series --symbols 20 --days 90
+"""
+import argparse
+import asyncio
+import math
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from series_store import SeriesStore, METRICS, RESOLUTIONS, DAY_MS, now_ms
+
+
+async def fill(store: SeriesStore, symbols, days: int, mark_interval: int, flush_every: int, seed: int):
+    rng = random.Random(seed)
+    end = now_ms()
+    start = end - days * DAY_MS
+    state = {s: {"oi": rng.uniform(1e4, 1e7), "long": rng.uniform(0.4, 0.7), "funding": 0.0001,
+                 "basis": rng.uniform(-5, 5)} for s in symbols}
+    next_flush = start + flush_every * 1000
+    for ts in range(start, end, mark_interval * 1000):
+        poll = ts % 300_000 < mark_interval * 1000
+        for symbol, s in state.items():
+            s["funding"] = min(0.003, max(-0.003, s["funding"] + rng.gauss(0, 2e-6)))
+            s["basis"] += rng.gauss(0, 0.05)
+            store.add(symbol, "funding", ts, s["funding"])
+            store.add(symbol, "basis", ts, s["basis"])
+            if poll:
+                s["oi"] *= math.exp(rng.gauss(0, 0.002))
+                s["long"] = min(0.9, max(0.1, s["long"] + rng.gauss(0, 0.005)))
+                store.add(symbol, "oi", ts, s["oi"])
+                for metric in ("global_long", "top_accounts_long", "top_positions_long"):
+                    store.add(symbol, metric, ts, s["long"] + rng.gauss(0, 0.01))
+        if ts >= next_flush:
+            await store.flush()
+            next_flush += flush_every * 1000
+    await store.flush()
+
+
+async def timed(store: SeriesStore, rounds: int, **query) -> tuple:
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        result = await store.query(**query)
+        times.append((time.perf_counter() - start) * 1000)
+    points = sum(len(points) for points in result["series"].values())
+    return statistics.median(times), max(times), result["resolution"], points
+
+
+async def main(args):
+    path = os.path.join(tempfile.mkdtemp(), "bench-series.db")
+    store = SeriesStore(path, flush_interval=3600)  # flushed explicitly below
+    await store.open()
+    symbols = [f"SYM{i}USDT" for i in range(args.symbols)]
+    for symbol in symbols:
+        store._backfills[symbol] = asyncio.create_task(asyncio.sleep(0))
+
+    start = time.perf_counter()
+    await fill(store, symbols, args.days, args.mark_interval, args.flush_every, args.seed)
+    elapsed = time.perf_counter() - start
+    await store._run(store._prune)
+    rows = await store._run(lambda: store._conn.execute("SELECT res, COUNT(*) FROM series GROUP BY res").fetchall())
+    await store._run(lambda: store._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)"))
+    size = os.path.getsize(path)
+    print(f"{args.symbols} symbols x {args.days} days: {store.samples:,} samples in {elapsed:.1f}s "
+          f"({store.samples / elapsed:,.0f}/s, flushes included), {store.rows_written:,} row upserts")
+    by_res = {bucket: count for bucket, count in rows}
+    print("  rows after retention: " + ", ".join(f"{res} {by_res.get(bucket, 0):,}"
+                                                  for res, (bucket, _) in RESOLUTIONS.items())
+          + f"; {size / 2 ** 20:.1f} MB on disk")
+
+    now = now_ms()
+    symbol = symbols[0]
+    print(f"queries, all {len(METRICS)} metrics (ms over {args.rounds} runs)")
+    print(f"  {'range':<16}{'res':>5}{'points':>8}{'p50':>8}{'max':>8}")
+    cases = [(f"{days}d auto", days, None) for days in (1, 7, 30)]
+    cases += [(f"7d at {res}", 7, res) for res in RESOLUTIONS]
+    for label, days, res in cases:
+        p50, worst, picked, points = await timed(store, args.rounds, symbol=symbol, metrics=METRICS,
+                                                 start=now - days * DAY_MS, end=now, resolution=res)
+        print(f"  {label:<16}{picked:>5}{points:>8}{p50:>8.2f}{worst:>8.2f}")
+    await store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=3)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--mark-interval", type=int, default=3, help="seconds between funding/basis samples")
+    parser.add_argument("--flush-every", type=int, default=600, help="simulated seconds between commits")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,41 @@
+"""
+Trade tape insert cost: list.append + pop(0) of per-trade dicts (previous
+MarketState.add_trade) vs. the array-backed TradeTape ring buffer, at several
+tape depths.
+
+    cd backend && python -m benchmarks.bench_tapes
+"""
+import argparse
+import time
+
+from ring_buffer import TradeTape
+
+
+def list_tape(depth: int, n: int) -> float:
+    tape = []
+    t0 = time.perf_counter()
+    for i in range(n):
+        tape.append({"price": 65000.0, "quantity": 0.1, "side": "BUY", "timestamp": i})
+        if len(tape) > depth:
+            tape.pop(0)
+    return time.perf_counter() - t0
+
+
+def ring_tape(depth: int, n: int) -> float:
+    tape = TradeTape(depth)
+    t0 = time.perf_counter()
+    for i in range(n):
+        tape.append(65000.0, 0.1, False, i)
+    return time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--trades", type=int, default=200_000)
+    parser.add_argument("--depths", type=int, nargs="+", default=[50, 5000, 50000])
+    args = parser.parse_args()
+    print(f"{'depth':>8}{'list ns/trade':>16}{'ring ns/trade':>16}")
+    for depth in args.depths:
+        a = list_tape(depth, args.trades) / args.trades * 1e9
+        b = ring_tape(depth, args.trades) / args.trades * 1e9
+        print(f"{depth:>8}{a:>16.0f}{b:>16.0f}")
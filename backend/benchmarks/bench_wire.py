@@ -0,0 +1,82 @@
+"""
+Wire format benchmark: bytes and encode/decode time per /ws format.
+
+Replays the bench_broadcast market (snapshot on connect, then a patch per
+channel per tick) through every available WireFormat and reports raw bytes,
+bytes after permessage-deflate (one zlib stream per connection with context
+takeover, as browsers negotiate it) and encode/decode time. Decode time is
+Python's json/msgpack, a proxy for client parse cost.
+
+    cd backend && python -m benchmarks.bench_wire
+"""
+import argparse
+import json
+import random
+import time
+import zlib
+
+from market_state import DEFAULT_CHANNELS
+from wire_format import ENCODINGS, LAYOUTS, WireFormat, msgpack
+from benchmarks.bench_broadcast import build_state, mutate, TICK_SECONDS
+
+
+def decoder(fmt: WireFormat):
+    return msgpack.unpackb if fmt.encoding == "msgpack" else json.loads
+
+
+def messages(ticks: int, seed: int):
+    """Snapshot messages, then the patch messages of every tick."""
+    rng = random.Random(seed)
+    state = build_state()
+    snapshots = [state.snapshot(channel) for channel in sorted(DEFAULT_CHANNELS)]
+    patches = []
+    for _ in range(ticks):
+        mutate(state, rng)
+        for channel in sorted(DEFAULT_CHANNELS):
+            patch = state.collect_patch(channel)
+            if patch:
+                patches.append(patch)
+    return snapshots, patches
+
+
+def measure(fmt: WireFormat, batch):
+    deflate = zlib.compressobj(wbits=-15)
+    decode = decoder(fmt)
+    raw = compressed = 0
+    encode_time = decode_time = 0.0
+    for message in batch:
+        t0 = time.perf_counter()
+        frame = fmt.encode(message)
+        encode_time += time.perf_counter() - t0
+        data = frame if isinstance(frame, bytes) else frame.encode()
+        raw += len(data)
+        compressed += len(deflate.compress(data) + deflate.flush(zlib.Z_SYNC_FLUSH)) - 4  # trailer is not sent
+        t0 = time.perf_counter()
+        decode(frame)
+        decode_time += time.perf_counter() - t0
+    return raw, compressed, encode_time, decode_time
+
+
+def run(ticks: int, seed: int):
+    snapshots, patches = messages(ticks, seed)
+    seconds = ticks * TICK_SECONDS
+    formats = [WireFormat(encoding, layout) for encoding in ENCODINGS for layout in LAYOUTS]
+    print(f"{ticks} ticks ({seconds:.0f}s of market time), default channels")
+    if msgpack is None:
+        print("(msgpack not installed; MessagePack rows skipped)")
+    print(f"{'format':<18}{'snapshot B':>11}{'deflated':>10}{'patch B/s':>11}{'deflated':>10}"
+          f"{'enc us/msg':>12}{'dec us/msg':>12}")
+    for fmt in formats:
+        snap_raw, snap_z, _, _ = measure(fmt, snapshots)
+        raw, z, enc, dec = measure(fmt, patches)
+        n = len(patches)
+        print(f"{fmt.encoding + '/' + fmt.layout:<18}{snap_raw:>11}{snap_z:>10}{raw / seconds:>11.0f}{z / seconds:>10.0f}"
+              f"{enc / n * 1e6:>12.1f}{dec / n * 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--ticks", type=int, default=4000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    run(args.ticks, args.seed)
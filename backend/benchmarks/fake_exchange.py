@@ -0,0 +1,517 @@
+"""
+Fake Binance exchange for offline benchmarks: synthetic streams and REST.
+
+Serves everything the backend uses from Binance on one local port, at rates
+set on the command line: the combined /stream socket (SUBSCRIBE/UNSUBSCRIBE
+of <symbol>@aggTrade, @forceOrder, @markPrice, @depth@100ms, @kline_1m,
+spot @miniTicker and !forceOrder@arr), the raw /ws/!ticker@arr all-market
+ticker, and the REST endpoints (klines, depth, open interest and its
+history, long/short ratio histories, 24h tickers, exchangeInfo, spot
+prices). Prices follow a random walk per symbol. Each symbol keeps a real
+book, so depth diffs chain (pu is the previous u) and REST snapshots bridge
+them. GET /fake/stats counts what was sent. Point the backend at it with
+
+    BINANCE_FAPI_URL=http://127.0.0.1:9000 BINANCE_SPOT_URL=http://127.0.0.1:9000
+    BINANCE_FSTREAM_URL=ws://127.0.0.1:9000 BINANCE_SPOT_STREAM_URL=ws://127.0.0.1:9000
+
+    cd backend && python -m benchmarks.fake_exchange --port 9000
+    cd backend && python -m benchmarks.fake_exchange --symbols 400 --trades-per-second 2000
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+from typing import Dict, List, Set
+
+from aiohttp import WSMsgType, web
+
+from wire_format import orjson
+
+NAMES = ["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT", "XRPUSDT", "DOGEUSDT", "ADAUSDT", "AVAXUSDT"]
+BOOK_LEVELS = 200        # levels per side a book is seeded with and pruned back to
+DIFF_LEVELS = 12         # levels touched per depth diff
+TRADE_TICK = 0.01        # seconds between trade generation rounds
+SPOT_BASIS = 0.9995      # spot trades a little under the perpetual
+
+if orjson is not None:
+    def dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    def dumps(obj) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class Market:
+    """One symbol: a random-walk price, 24h figures and an order book on a tick grid."""
+
+    def __init__(self, name: str, rng: random.Random):
+        self.name = name
+        self.rng = rng
+        self.price = 60000.0 if name == "BTCUSDT" else 10 ** rng.uniform(-2, 4)
+        exponent = math.floor(math.log10(self.price)) - 4
+        self.tick = 10.0 ** exponent
+        self.decimals = max(0, -exponent)
+        self.open_24h = self.price * rng.uniform(0.9, 1.1)
+        self.high_24h = max(self.price, self.open_24h)
+        self.low_24h = min(self.price, self.open_24h)
+        self.volume_24h = rng.uniform(1e5, 1e8) / self.price
+        self.open_interest = self.volume_24h * rng.uniform(0.2, 2)
+        self.funding_rate = rng.uniform(-0.0003, 0.0005)
+        self.long_account = rng.uniform(0.35, 0.75)
+        self.trade_id = 1
+        self.update_id = 1
+        self.kline_start = now_ms() // 60_000 * 60_000
+        self.kline = [self.price, self.price, self.price, self.price, 0.0]  # open, high, low, close, volume
+        self.closed_kline = None  # final update of the last kline, sent once
+        mid = self.mid_index()
+        self.bids: Dict[int, float] = {mid - i: self.level_qty() for i in range(1, BOOK_LEVELS + 1)}
+        self.asks: Dict[int, float] = {mid + i: self.level_qty() for i in range(1, BOOK_LEVELS + 1)}
+
+    def fmt(self, price: float) -> str:
+        return f"{price:.{self.decimals}f}"
+
+    def mid_index(self) -> int:
+        return round(self.price / self.tick)
+
+    def level_qty(self) -> float:
+        return round(self.rng.expovariate(1.0) * 2000 / self.price, 3) + 0.001
+
+    def walk(self, volatility: float):
+        self.price *= math.exp(self.rng.gauss(0, volatility))
+        self.high_24h = max(self.high_24h, self.price)
+        self.low_24h = min(self.low_24h, self.price)
+        self.trade_volume(0.0)
+
+    def trade_volume(self, qty: float):
+        """Adds traded base volume to the 24h figure and the live 1m kline."""
+        ts = now_ms()
+        start = ts - ts % 60_000
+        if start != self.kline_start:
+            self.closed_kline = self.kline_event(ts, closed=True)
+            self.kline_start = start
+            self.kline = [self.price, self.price, self.price, self.price, 0.0]
+        kline = self.kline
+        kline[1], kline[2], kline[3] = max(kline[1], self.price), min(kline[2], self.price), self.price
+        kline[4] += qty
+        self.volume_24h += qty
+
+    def kline_event(self, ts: int, closed: bool = False) -> dict:
+        o, h, l, c, v = self.kline
+        return {"e": "kline", "E": ts, "s": self.name,
+                "k": {"t": self.kline_start, "T": self.kline_start + 59_999, "s": self.name, "i": "1m",
+                      "o": self.fmt(o), "c": self.fmt(c), "h": self.fmt(h), "l": self.fmt(l),
+                      "v": f"{v:.3f}", "q": f"{v * c:.2f}", "x": closed}}
+
+    def kline_updates(self, ts: int) -> List[dict]:
+        """The pending final update of the previous kline, if any, then the live one."""
+        self.trade_volume(0.0)
+        events = [self.closed_kline] if self.closed_kline else []
+        self.closed_kline = None
+        return events + [self.kline_event(ts)]
+
+    def agg_trade(self, ts: int) -> dict:
+        self.walk(0.00005)
+        qty = round(self.rng.expovariate(1.0) * 500 / self.price, 3) + 0.001
+        self.trade_volume(qty)
+        self.trade_id += 1
+        return {"e": "aggTrade", "E": ts, "a": self.trade_id, "s": self.name, "p": self.fmt(self.price),
+                "q": f"{qty:.3f}", "f": self.trade_id, "l": self.trade_id, "T": ts,
+                "m": self.rng.random() < 0.5}
+
+    def force_order(self, ts: int) -> dict:
+        side = "SELL" if self.rng.random() < 0.6 else "BUY"
+        qty = f"{self.rng.expovariate(1.0) * 5000 / self.price:.3f}"
+        slip = 0.999 if side == "SELL" else 1.001
+        return {"e": "forceOrder", "E": ts,
+                "o": {"s": self.name, "S": side, "o": "LIMIT", "f": "IOC", "q": qty,
+                      "p": self.fmt(self.price * slip), "ap": self.fmt(self.price), "X": "FILLED",
+                      "l": qty, "z": qty, "T": ts}}
+
+    def mark_price(self, ts: int) -> dict:
+        return {"e": "markPriceUpdate", "E": ts, "s": self.name, "p": self.fmt(self.price),
+                "i": self.fmt(self.price * 0.9999), "P": self.fmt(self.price * 0.9998),
+                "r": f"{self.funding_rate:.8f}", "T": (ts // 28_800_000 + 1) * 28_800_000}
+
+    def mini_ticker(self, ts: int) -> dict:
+        spot = self.price * SPOT_BASIS
+        return {"e": "24hrMiniTicker", "E": ts, "s": self.name, "c": self.fmt(spot),
+                "o": self.fmt(self.open_24h * SPOT_BASIS), "h": self.fmt(self.high_24h * SPOT_BASIS),
+                "l": self.fmt(self.low_24h * SPOT_BASIS), "v": f"{self.volume_24h / 3:.3f}",
+                "q": f"{self.volume_24h * spot / 3:.2f}"}
+
+    def ticker(self, ts: int) -> dict:
+        change = self.price - self.open_24h
+        return {"e": "24hrTicker", "E": ts, "s": self.name, "p": self.fmt(change),
+                "P": f"{change / self.open_24h * 100:.3f}", "w": self.fmt((self.high_24h + self.low_24h) / 2),
+                "c": self.fmt(self.price), "Q": "1.000", "o": self.fmt(self.open_24h),
+                "h": self.fmt(self.high_24h), "l": self.fmt(self.low_24h), "v": f"{self.volume_24h:.3f}",
+                "q": f"{self.volume_24h * self.price:.2f}", "O": ts - 86_400_000, "C": ts,
+                "F": 1, "L": self.trade_id, "n": self.trade_id}
+
+    def ticker_24hr(self) -> dict:
+        """The REST shape of `ticker`."""
+        t = self.ticker(now_ms())
+        return {"symbol": self.name, "priceChange": t["p"], "priceChangePercent": t["P"],
+                "weightedAvgPrice": t["w"], "lastPrice": t["c"], "lastQty": t["Q"], "openPrice": t["o"],
+                "highPrice": t["h"], "lowPrice": t["l"], "volume": t["v"], "quoteVolume": t["q"],
+                "openTime": t["O"], "closeTime": t["C"], "firstId": t["F"], "lastId": t["L"], "count": t["n"]}
+
+    def depth_diff(self, ts: int) -> dict:
+        """Moves the book to the current price and returns the changed levels as a depthUpdate."""
+        rng, bids, asks = self.rng, self.bids, self.asks
+        mid = self.mid_index()
+        changed_bids: Dict[int, float] = {}
+        changed_asks: Dict[int, float] = {}
+        for i in [i for i in bids if i >= mid]:
+            del bids[i]
+            changed_bids[i] = 0.0
+        for i in [i for i in asks if i <= mid]:
+            del asks[i]
+            changed_asks[i] = 0.0
+        for side, changed, sign in ((bids, changed_bids, -1), (asks, changed_asks, 1)):
+            for _ in range(DIFF_LEVELS // 2):
+                i = mid + sign * int(rng.expovariate(0.1) + 1)
+                qty = 0.0 if rng.random() < 0.25 and i in side else self.level_qty()
+                if qty:
+                    side[i] = qty
+                else:
+                    side.pop(i, None)
+                changed[i] = qty
+            if len(side) > BOOK_LEVELS * 2:
+                for i in sorted(side, key=lambda i: abs(i - mid))[BOOK_LEVELS:]:
+                    del side[i]
+                    changed[i] = 0.0
+        first = self.update_id + 1
+        self.update_id += len(changed_bids) + len(changed_asks)
+        return {"e": "depthUpdate", "E": ts, "T": ts, "s": self.name, "U": first, "u": self.update_id,
+                "pu": first - 1, "b": [[self.fmt(i * self.tick), f"{q:.3f}"] for i, q in changed_bids.items()],
+                "a": [[self.fmt(i * self.tick), f"{q:.3f}"] for i, q in changed_asks.items()]}
+
+    def depth_snapshot(self, limit: int) -> dict:
+        ts = now_ms()
+        return {"lastUpdateId": self.update_id, "E": ts, "T": ts,
+                "bids": [[self.fmt(i * self.tick), f"{self.bids[i]:.3f}"] for i in sorted(self.bids, reverse=True)[:limit]],
+                "asks": [[self.fmt(i * self.tick), f"{self.asks[i]:.3f}"] for i in sorted(self.asks)[:limit]]}
+
+    def klines(self, interval_ms: int, limit: int) -> List[list]:
+        """`limit` candles walking back from the current price; the last one is the open one."""
+        rng = random.Random(hash((self.name, interval_ms, limit)))
+        end = now_ms() // interval_ms * interval_ms
+        close = self.price
+        rows = []
+        for n in range(limit):
+            open_ = close * math.exp(rng.gauss(0, 0.002))
+            high, low = max(open_, close) * (1 + rng.random() * 0.001), min(open_, close) * (1 - rng.random() * 0.001)
+            volume = rng.expovariate(1.0) * 1e5 / close
+            buy = volume * rng.uniform(0.3, 0.7)
+            start = end - n * interval_ms
+            rows.append([start, self.fmt(open_), self.fmt(high), self.fmt(low), self.fmt(close), f"{volume:.3f}",
+                         start + interval_ms - 1, f"{volume * close:.2f}", rng.randint(10, 5000),
+                         f"{buy:.3f}", f"{buy * close:.2f}", "0"])
+            close = open_
+        rows.reverse()
+        return rows
+
+
+INTERVALS_MS = {"1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+                "1h": 3_600_000, "4h": 14_400_000, "1d": 86_400_000}
+
+
+class FakeExchange:
+    """
+    Markets plus the sockets subscribed to their streams. Streams are only
+    generated while somebody listens, except the all-market ticker and
+    price walk, which run regardless like the real exchange.
+    """
+
+    def __init__(self, symbols: int = 200, trades_per_second: float = 50, liquidations_per_second: float = 0.5,
+                 mark_interval: float = 3.0, ticker_interval: float = 1.0, seed: int = 1):
+        rng = random.Random(seed)
+        names = NAMES[:symbols] + [f"SYM{i}USDT" for i in range(max(0, symbols - len(NAMES)))]
+        self.markets: Dict[str, Market] = {name: Market(name, rng) for name in names}
+        self.by_lower = {name.lower(): m for name, m in self.markets.items()}
+        self.rng = rng
+        self.trades_per_second = trades_per_second
+        self.liquidations_per_second = liquidations_per_second
+        self.mark_interval = mark_interval
+        self.ticker_interval = ticker_interval
+        # stream -> sockets; combined sockets get {"stream", "data"}, raw ones only the data
+        self.combined: Dict[str, Set[web.WebSocketResponse]] = {}
+        self.raw: Dict[str, Set[web.WebSocketResponse]] = {}
+        self.sent: Dict[str, int] = {}
+        self.requests: Dict[str, int] = {}
+        self.started = time.time()
+
+    # Streams
+
+    def listening(self, stream: str) -> bool:
+        return stream in self.combined or stream in self.raw
+
+    def watched(self, kind: str) -> List[Market]:
+        return [m for lower, m in self.by_lower.items() if f"{lower}@{kind}" in self.combined]
+
+    async def publish(self, stream: str, data):
+        kind = stream.split("@", 1)[-1] if not stream.startswith("!") else stream
+        sockets = self.combined.get(stream, ())
+        if sockets:
+            text = dumps({"stream": stream, "data": data})
+            for ws in list(sockets):
+                await self._send(ws, text, kind)
+        sockets = self.raw.get(stream, ())
+        if sockets:
+            text = dumps(data)
+            for ws in list(sockets):
+                await self._send(ws, text, kind)
+
+    async def _send(self, ws: web.WebSocketResponse, text: str, kind: str):
+        if ws.closed:
+            return
+        try:
+            await ws.send_str(text)
+        except ConnectionError:
+            return
+        self.sent[kind] = self.sent.get(kind, 0) + 1
+
+    async def _trades(self):
+        loop = asyncio.get_running_loop()
+        last = loop.time()
+        owed: Dict[str, float] = {}
+        while True:
+            await asyncio.sleep(TRADE_TICK)
+            now = loop.time()
+            elapsed, last = now - last, now
+            ts = now_ms()
+            for market in self.watched("aggTrade"):
+                due = owed.get(market.name, 0.0) + self.trades_per_second * elapsed
+                count = int(due)
+                owed[market.name] = due - count
+                for _ in range(count):
+                    await self.publish(f"{market.name.lower()}@aggTrade", market.agg_trade(ts))
+            # Liquidations arrive at random (Poisson) times
+            every_symbol = self.listening("!forceOrder@arr")
+            for market in self.markets.values() if every_symbol else self.watched("forceOrder"):
+                if self.rng.random() < self.liquidations_per_second * elapsed:
+                    data = market.force_order(ts)
+                    await self.publish(f"{market.name.lower()}@forceOrder", data)
+                    await self.publish("!forceOrder@arr", data)
+
+    async def _depth(self):
+        while True:
+            await asyncio.sleep(0.1)
+            ts = now_ms()
+            for market in self.watched("depth@100ms"):
+                await self.publish(f"{market.name.lower()}@depth@100ms", market.depth_diff(ts))
+
+    async def _marks(self):
+        while True:
+            await asyncio.sleep(self.mark_interval)
+            ts = now_ms()
+            for market in self.watched("markPrice"):
+                await self.publish(f"{market.name.lower()}@markPrice", market.mark_price(ts))
+
+    async def _tickers(self):
+        while True:
+            await asyncio.sleep(self.ticker_interval)
+            ts = now_ms()
+            for market in self.markets.values():
+                market.walk(0.0005 * math.sqrt(self.ticker_interval))
+                # Unwatched symbols trade too, as far as volumes are concerned
+                market.trade_volume(self.rng.expovariate(1.0) * market.volume_24h / 86_400 * self.ticker_interval)
+            for market in self.watched("kline_1m"):
+                for event in market.kline_updates(ts):
+                    await self.publish(f"{market.name.lower()}@kline_1m", event)
+            for market in self.watched("miniTicker"):
+                await self.publish(f"{market.name.lower()}@miniTicker", market.mini_ticker(ts))
+            if self.listening("!ticker@arr"):
+                await self.publish("!ticker@arr", [m.ticker(ts) for m in self.markets.values()])
+
+    async def stream_socket(self, request: web.Request) -> web.WebSocketResponse:
+        """Combined stream: /stream?streams=a/b plus SUBSCRIBE/UNSUBSCRIBE requests."""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams: Set[str] = set()
+
+        def subscribe(names):
+            for name in names:
+                self.combined.setdefault(name, set()).add(ws)
+                streams.add(name)
+
+        def unsubscribe(names):
+            for name in names:
+                sockets = self.combined.get(name)
+                if sockets is not None:
+                    sockets.discard(ws)
+                    if not sockets:
+                        del self.combined[name]
+                streams.discard(name)
+
+        subscribe(s for s in request.query.get("streams", "").split("/") if s)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    req = json.loads(msg.data)
+                    method, params, request_id = req["method"], req.get("params", []), req.get("id")
+                except (ValueError, KeyError, TypeError):
+                    await ws.send_str(dumps({"error": {"code": 2, "msg": "Invalid request"}}))
+                    continue
+                result = None
+                if method == "SUBSCRIBE":
+                    subscribe(params)
+                elif method == "UNSUBSCRIBE":
+                    unsubscribe(params)
+                elif method == "LIST_SUBSCRIPTIONS":
+                    result = sorted(streams)
+                await ws.send_str(dumps({"result": result, "id": request_id}))
+        finally:
+            unsubscribe(list(streams))
+        return ws
+
+    async def raw_socket(self, request: web.Request) -> web.WebSocketResponse:
+        """Raw stream: /ws/<stream>, data only."""
+        stream = request.match_info["stream"]
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.raw.setdefault(stream, set()).add(ws)
+        try:
+            async for _ in ws:
+                pass
+        finally:
+            sockets = self.raw[stream]
+            sockets.discard(ws)
+            if not sockets:
+                del self.raw[stream]
+        return ws
+
+    # REST
+
+    @web.middleware
+    async def count_requests(self, request: web.Request, handler):
+        self.requests[request.path] = self.requests.get(request.path, 0) + 1
+        return await handler(request)
+
+    def market(self, request: web.Request) -> Market:
+        market = self.markets.get(request.query.get("symbol", ""))
+        if market is None:
+            raise web.HTTPBadRequest(text=dumps({"code": -1121, "msg": "Invalid symbol."}),
+                                     content_type="application/json")
+        return market
+
+    async def klines(self, request: web.Request) -> web.Response:
+        interval = INTERVALS_MS.get(request.query.get("interval", "1m"), 60_000)
+        limit = min(int(request.query.get("limit", 500)), 1500)
+        return web.json_response(self.market(request).klines(interval, limit), dumps=dumps)
+
+    async def depth(self, request: web.Request) -> web.Response:
+        limit = min(int(request.query.get("limit", 500)), 1000)
+        return web.json_response(self.market(request).depth_snapshot(limit), dumps=dumps)
+
+    async def open_interest(self, request: web.Request) -> web.Response:
+        market = self.market(request)
+        market.open_interest *= math.exp(self.rng.gauss(0, 0.001))
+        return web.json_response({"symbol": market.name, "openInterest": f"{market.open_interest:.3f}",
+                                  "time": now_ms()}, dumps=dumps)
+
+    async def futures_data(self, request: web.Request) -> web.Response:
+        """openInterestHist and the long/short ratio histories."""
+        market = self.market(request)
+        limit = min(int(request.query.get("limit", 30)), 500)
+        period = INTERVALS_MS.get(request.query.get("period", "5m"), 300_000)
+        end = min(now_ms(), int(request.query.get("endTime", now_ms()))) // period * period
+        rows = []
+        for n in range(limit):
+            ts = end - n * period
+            if request.match_info["endpoint"] == "openInterestHist":
+                oi = market.open_interest * (1 + self.rng.gauss(0, 0.01))
+                rows.append({"symbol": market.name, "sumOpenInterest": f"{oi:.3f}",
+                             "sumOpenInterestValue": f"{oi * market.price:.2f}", "timestamp": ts})
+            else:
+                long = min(0.95, max(0.05, market.long_account + self.rng.gauss(0, 0.01)))
+                rows.append({"symbol": market.name, "longShortRatio": f"{long / (1 - long):.4f}",
+                             "longAccount": f"{long:.4f}", "shortAccount": f"{1 - long:.4f}", "timestamp": ts})
+        rows.reverse()
+        return web.json_response(rows, dumps=dumps)
+
+    async def ticker_24hr(self, request: web.Request) -> web.Response:
+        if "symbol" in request.query:
+            return web.json_response(self.market(request).ticker_24hr(), dumps=dumps)
+        return web.json_response([m.ticker_24hr() for m in self.markets.values()], dumps=dumps)
+
+    async def exchange_info(self, request: web.Request) -> web.Response:
+        symbols = [{"symbol": m.name, "pair": m.name, "contractType": "PERPETUAL", "status": "TRADING",
+                    "baseAsset": m.name[:-4], "quoteAsset": "USDT", "pricePrecision": m.decimals}
+                   for m in self.markets.values()]
+        return web.json_response({"timezone": "UTC", "serverTime": now_ms(), "symbols": symbols}, dumps=dumps)
+
+    async def spot_prices(self, request: web.Request) -> web.Response:
+        return web.json_response([{"symbol": m.name, "price": m.fmt(m.price * SPOT_BASIS)}
+                                  for m in self.markets.values()], dumps=dumps)
+
+    async def stats(self, request: web.Request) -> web.Response:
+        return web.json_response({
+            "uptime": round(time.time() - self.started, 1),
+            "symbols": len(self.markets),
+            "frames": self.sent,
+            "streams": sorted(set(self.combined) | set(self.raw)),
+            "requests": self.requests,
+        }, dumps=dumps)
+
+    # App
+
+    async def _generators(self, app: web.Application):
+        tasks = [asyncio.create_task(coro) for coro in (self._trades(), self._depth(), self._marks(), self._tickers())]
+        yield
+        for task in tasks:
+            task.cancel()
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self.count_requests])
+        app.router.add_get("/stream", self.stream_socket)
+        app.router.add_get("/ws/{stream}", self.raw_socket)
+        app.router.add_get("/fapi/v1/klines", self.klines)
+        app.router.add_get("/fapi/v1/depth", self.depth)
+        app.router.add_get("/fapi/v1/openInterest", self.open_interest)
+        app.router.add_get("/futures/data/{endpoint}", self.futures_data)
+        app.router.add_get("/fapi/v1/ticker/24hr", self.ticker_24hr)
+        app.router.add_get("/fapi/v1/exchangeInfo", self.exchange_info)
+        app.router.add_get("/api/v3/ticker/price", self.spot_prices)
+        app.router.add_get("/fake/stats", self.stats)
+        app.cleanup_ctx.append(self._generators)
+        return app
+
+
+def env_for(url: str) -> Dict[str, str]:
+    """The backend's environment variables pointing every Binance base at `url` (http://host:port)."""
+    ws_url = "ws" + url[len("http"):]
+    return {"BINANCE_FAPI_URL": url, "BINANCE_SPOT_URL": url,
+            "BINANCE_FSTREAM_URL": ws_url, "BINANCE_SPOT_STREAM_URL": ws_url}
+
+
+def main(args):
+    exchange = FakeExchange(args.symbols, args.trades_per_second, args.liquidations_per_second,
+                            args.mark_interval, args.ticker_interval, args.seed)
+    url = f"http://{args.host}:{args.port}"
+    print(f"fake exchange on {url}: {args.symbols} symbols, {args.trades_per_second:g} trades/s per watched symbol")
+    for name, value in env_for(url).items():
+        print(f"  {name}={value}")
+    web.run_app(exchange.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--symbols", type=int, default=200, help="perpetuals listed (and in !ticker@arr)")
+    parser.add_argument("--trades-per-second", type=float, default=50, help="aggTrades per watched symbol")
+    parser.add_argument("--liquidations-per-second", type=float, default=0.5, help="per symbol with a listener")
+    parser.add_argument("--mark-interval", type=float, default=3.0, help="seconds between markPrice updates")
+    parser.add_argument("--ticker-interval", type=float, default=1.0, help="seconds between !ticker@arr frames")
+    parser.add_argument("--seed", type=int, default=1)
+    main(parser.parse_args())
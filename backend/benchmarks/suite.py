@@ -0,0 +1,369 @@
+"""
+End-to-end benchmark suite: the real backend against the fake exchange.
+
+Starts benchmarks.fake_exchange and the backend (uvicorn main:app, run from
+a scratch directory so its SQLite files stay out of the tree) pointed at it
+through the BINANCE_* URLs, then runs the scenarios in one session, reading
+the backend's own /metrics between phases:
+
+  ingest     stream frames applied per second and backend CPU per 1k frames,
+             with one idle dashboard on each of the --watch symbols
+  broadcast  event-to-socket latency and frames per dashboard with --clients
+             dashboards spread over those symbols, plus event-loop lag
+  scanner    all-ticker frame time (universe, indicators, rule scan)
+  memory     resident memory sampled every second and its growth rate over
+             the broadcast phase
+
+Latency quantiles are interpolated within /metrics' power-of-two buckets;
+the means are exact. The dashboards run in this process, so on a small
+machine they compete with the backend for CPU like real browsers would not.
+Results go to --out as JSON; with --baseline (an earlier --out) every
+tracked figure is compared and the exit status is 1 on a regression beyond
+--tolerance.
+
+    cd backend && python -m benchmarks.suite
+    cd backend && python -m benchmarks.suite --clients 500 --out after.json --baseline before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import socket
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from benchmarks.fake_exchange import env_for
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# (result path, which direction is better, slack below which a change is noise)
+CHECKS = [
+    ("ingest.cpu_ms_per_1k_frames", "lower", 2.0),
+    ("ingest.applied_ratio", "higher", 0.02),
+    ("broadcast.socket_ms.mean", "lower", 2.0),
+    ("broadcast.socket_ms.p99", "lower", 5.0),
+    ("broadcast.frames_per_client_per_second", "higher", 0.5),
+    ("broadcast.loop_lag_ms.p99", "lower", 5.0),
+    ("scanner.frame_ms.mean", "lower", 0.5),
+    ("memory.rss_end_mb", "lower", 10.0),
+    ("memory.growth_mb_per_min", "lower", 2.0),
+]
+
+Metrics = Dict[str, List[Tuple[Dict[str, str], float]]]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def parse_metrics(text: str) -> Metrics:
+    """Prometheus text format into name -> [(labels, value)]."""
+    metrics: Metrics = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        head, _, value = line.rpartition(" ")
+        name, _, labels = head.partition("{")
+        metrics.setdefault(name, []).append((dict(LABEL.findall(labels)), float(value)))
+    return metrics
+
+
+def total(metrics: Metrics, name: str, **labels: str) -> float:
+    return sum(v for l, v in metrics.get(name, ()) if all(l.get(k) == want for k, want in labels.items()))
+
+
+def histogram_delta(before: Metrics, after: Metrics, name: str, **labels: str) -> dict:
+    """Bucket counts, count and sum observed between two scrapes."""
+    buckets: Dict[float, float] = {}
+    for metrics, sign in ((after, 1), (before, -1)):
+        for l, v in metrics.get(f"{name}_bucket", ()):
+            if all(l.get(k) == want for k, want in labels.items()):
+                le = float(l["le"])
+                buckets[le] = buckets.get(le, 0.0) + sign * v
+    return {"buckets": sorted(buckets.items()),
+            "count": total(after, f"{name}_count", **labels) - total(before, f"{name}_count", **labels),
+            "sum": total(after, f"{name}_sum", **labels) - total(before, f"{name}_sum", **labels)}
+
+
+def quantile(buckets: List[Tuple[float, float]], q: float) -> float:
+    """Like PromQL's histogram_quantile: linear within the bucket the rank falls in."""
+    if not buckets or buckets[-1][1] <= 0:
+        return 0.0
+    rank = q * buckets[-1][1]
+    lower, below = 0.0, 0.0
+    for le, cumulative in buckets:
+        if cumulative >= rank:
+            if le == float("inf"):
+                return lower
+            return lower + (le - lower) * (rank - below) / max(cumulative - below, 1e-12)
+        lower, below = le, cumulative
+    return lower
+
+
+def summarize_ms(h: dict) -> dict:
+    return {"count": int(h["count"]),
+            "mean": round(h["sum"] / h["count"] * 1000, 3) if h["count"] else 0.0,
+            "p50": round(quantile(h["buckets"], 0.5) * 1000, 3),
+            "p99": round(quantile(h["buckets"], 0.99) * 1000, 3)}
+
+
+def slope_per_minute(samples: List[Tuple[float, float]]) -> float:
+    """Least-squares slope of (seconds, value) samples, per minute."""
+    if len(samples) < 2:
+        return 0.0
+    n = len(samples)
+    mean_t = sum(t for t, _ in samples) / n
+    mean_v = sum(v for _, v in samples) / n
+    var = sum((t - mean_t) ** 2 for t, _ in samples)
+    return sum((t - mean_t) * (v - mean_v) for t, v in samples) / var * 60 if var else 0.0
+
+
+class Dashboard:
+    """A /ws client that only counts what it receives."""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def run(self, session: aiohttp.ClientSession, url: str, symbol: str):
+        async with session.ws_connect(url, max_msg_size=0) as ws:
+            await ws.send_json({"action": "subscribe", "symbol": symbol})
+            async for msg in ws:
+                self.frames += 1
+                self.bytes += len(msg.data)
+
+
+class Suite:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="cryptoterminal-suite-")
+        self.procs: List[asyncio.subprocess.Process] = []
+        self.tasks: List[asyncio.Task] = []
+        self.rss: List[Tuple[float, float]] = []  # (monotonic seconds, MB)
+
+    async def spawn(self, name: str, args: List[str], env: dict, cwd: str) -> asyncio.subprocess.Process:
+        log = open(os.path.join(self.workdir, f"{name}.log"), "wb")
+        proc = await asyncio.create_subprocess_exec(sys.executable, *args, cwd=cwd, env=env,
+                                                    stdout=log, stderr=asyncio.subprocess.STDOUT)
+        self.procs.append(proc)
+        return proc
+
+    async def wait_ready(self, url: str, name: str, timeout: float = 60.0):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(p.returncode is not None for p in self.procs):
+                break
+            try:
+                async with self.session.get(url) as resp:
+                    if resp.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.25)
+        raise RuntimeError(f"{name} did not come up; see {os.path.join(self.workdir, name + '.log')}")
+
+    async def scrape(self) -> Tuple[float, Metrics]:
+        async with self.session.get(f"{self.backend}/metrics") as resp:
+            text = await resp.text()
+        return time.monotonic(), parse_metrics(text)
+
+    async def exchange_frames(self) -> int:
+        async with self.session.get(f"{self.exchange}/fake/stats") as resp:
+            frames = (await resp.json())["frames"]
+        # The all-market ticker and the klines feed the scanner, not the ingest path
+        return sum(n for kind, n in frames.items() if kind not in ("!ticker@arr", "kline_1m"))
+
+    async def sample_memory(self):
+        while True:
+            _, metrics = await self.scrape()
+            self.rss.append((time.monotonic(), total(metrics, "process_resident_memory_bytes") / 2 ** 20))
+            await asyncio.sleep(1.0)
+
+    def connect(self, symbols: List[str], count: int) -> List[Dashboard]:
+        dashboards = [Dashboard() for _ in range(count)]
+        for i, dashboard in enumerate(dashboards):
+            self.tasks.append(asyncio.create_task(
+                dashboard.run(self.session, f"{self.ws_url}/ws", symbols[i % len(symbols)])))
+        return dashboards
+
+    async def start(self):
+        args = self.args
+        exchange_port, backend_port = free_port(), free_port()
+        self.exchange = f"http://127.0.0.1:{exchange_port}"
+        self.backend = f"http://127.0.0.1:{backend_port}"
+        self.ws_url = f"ws://127.0.0.1:{backend_port}"
+        env = {**os.environ, "PYTHONPATH": BACKEND_DIR, "SERVICE_MODE": "all", "METRICS_ENABLED": "1"}
+        await self.spawn("exchange", [
+            "-m", "benchmarks.fake_exchange", "--port", str(exchange_port), "--symbols", str(args.symbols),
+            "--trades-per-second", str(args.trades_per_second),
+            "--liquidations-per-second", str(args.liquidations_per_second)], env, BACKEND_DIR)
+        await self.wait_ready(f"{self.exchange}/fake/stats", "exchange")
+        await self.spawn("backend", [
+            "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(backend_port),
+            "--log-level", "warning"], {**env, **env_for(self.exchange)}, self.workdir)
+        await self.wait_ready(f"{self.backend}/health", "backend")
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        await self.session.close()
+        for proc in reversed(self.procs):
+            if proc.returncode is None:
+                proc.terminate()
+                try:
+                    await asyncio.wait_for(proc.wait(), 10)
+                except asyncio.TimeoutError:
+                    proc.kill()
+                    await proc.wait()
+
+    async def run(self) -> dict:
+        args = self.args
+        self.session = aiohttp.ClientSession()
+        try:
+            await self.start()
+            async with self.session.get(f"{self.exchange}/fapi/v1/exchangeInfo") as resp:
+                symbols = [s["symbol"] for s in (await resp.json())["symbols"]][:args.watch]
+            print(f"backend up, {len(symbols)} watched symbols, logs in {self.workdir}")
+            self.connect(symbols, len(symbols))  # one idle dashboard holds each symbol
+            self.tasks.append(asyncio.create_task(self.sample_memory()))
+            await asyncio.sleep(args.warmup)
+            first_at, first = await self.scrape()
+
+            # ingest
+            offered = await self.exchange_frames()
+            start_at, start = first_at, first
+            await asyncio.sleep(args.seconds)
+            end_at, end = await self.scrape()
+            offered = await self.exchange_frames() - offered
+            elapsed = end_at - start_at
+            frames = total(end, "cryptoterminal_ingest_frames_total") - total(start, "cryptoterminal_ingest_frames_total")
+            cpu = total(end, "process_cpu_seconds_total") - total(start, "process_cpu_seconds_total")
+            ingest = {
+                "exchange_frames_per_second": round(offered / elapsed, 1),
+                "frames_per_second": round(frames / elapsed, 1),
+                "applied_ratio": round(frames / offered, 3) if offered else 0.0,
+                "cpu_percent": round(cpu / elapsed * 100, 1),
+                "cpu_ms_per_1k_frames": round(cpu / frames * 1e6, 2) if frames else 0.0,
+                "batch_ms": summarize_ms(histogram_delta(start, end, "cryptoterminal_ingest_batch_seconds")),
+                "event_to_applied_ms": summarize_ms(
+                    histogram_delta(start, end, "cryptoterminal_event_latency_seconds", stage="ingest")),
+            }
+            print(f"ingest     {ingest['frames_per_second']:,.0f} frames/s of {ingest['exchange_frames_per_second']:,.0f} "
+                  f"offered, {ingest['cpu_ms_per_1k_frames']} ms CPU per 1k, {ingest['cpu_percent']}% busy")
+
+            # broadcast
+            dashboards = self.connect(symbols, args.clients)
+            await asyncio.sleep(args.connect_wait)
+            received = sum(d.frames for d in dashboards)
+            start_at, start = await self.scrape()
+            rss_from = len(self.rss)
+            await asyncio.sleep(args.seconds)
+            end_at, end = await self.scrape()
+            elapsed = end_at - start_at
+            connected = int(total(end, "cryptoterminal_ws_connections"))
+            cpu = total(end, "process_cpu_seconds_total") - total(start, "process_cpu_seconds_total")
+            broadcast = {
+                "clients": args.clients,
+                "connected": connected,
+                "frames_per_client_per_second": round(
+                    (sum(d.frames for d in dashboards) - received) / max(args.clients, 1) / elapsed, 2),
+                "kb_per_client_per_second": round(sum(d.bytes for d in dashboards) / max(args.clients, 1)
+                                                  / elapsed / 1e3, 2),
+                "cpu_percent": round(cpu / elapsed * 100, 1),
+                "socket_ms": summarize_ms(
+                    histogram_delta(start, end, "cryptoterminal_event_latency_seconds", stage="socket")),
+                "flush_ms": summarize_ms(
+                    histogram_delta(start, end, "cryptoterminal_event_latency_seconds", stage="flush")),
+                "loop_lag_ms": summarize_ms(histogram_delta(start, end, "cryptoterminal_event_loop_lag_seconds")),
+            }
+            socket_ms = broadcast["socket_ms"]
+            print(f"broadcast  {connected} dashboards, event to socket mean {socket_ms['mean']} ms, "
+                  f"p99 ~{socket_ms['p99']} ms, {broadcast['frames_per_client_per_second']} frames/s each, "
+                  f"{broadcast['cpu_percent']}% busy")
+
+            # scanner, over the whole run
+            frame = histogram_delta(first, end, "cryptoterminal_scanner_frame_seconds")
+            scanner = {
+                "frame_ms": summarize_ms(frame),
+                "signals": int(total(end, "cryptoterminal_scanner_signals_total")
+                               - total(first, "cryptoterminal_scanner_signals_total")),
+            }
+            print(f"scanner    {scanner['frame_ms']['count']} all-ticker frames, mean {scanner['frame_ms']['mean']} ms, "
+                  f"p99 ~{scanner['frame_ms']['p99']} ms, {scanner['signals']} signals")
+
+            # memory
+            samples = self.rss[rss_from:]
+            memory = {
+                "rss_start_mb": round(self.rss[0][1], 1) if self.rss else 0.0,
+                "rss_end_mb": round(self.rss[-1][1], 1) if self.rss else 0.0,
+                "rss_peak_mb": round(max(v for _, v in self.rss), 1) if self.rss else 0.0,
+                "growth_mb_per_min": round(slope_per_minute(samples), 2),
+            }
+            print(f"memory     RSS {memory['rss_start_mb']} -> {memory['rss_end_mb']} MB "
+                  f"(peak {memory['rss_peak_mb']}), {memory['growth_mb_per_min']:+} MB/min under load")
+        finally:
+            await self.stop()
+        return {"config": {k: v for k, v in vars(args).items() if k not in ("out", "baseline", "tolerance")},
+                "ingest": ingest, "broadcast": broadcast, "scanner": scanner, "memory": memory}
+
+
+def lookup(result: dict, path: str) -> Optional[float]:
+    for key in path.split("."):
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> bool:
+    """Prints each tracked figure against the baseline; False if any got worse beyond tolerance and slack."""
+    if result.get("config") != baseline.get("config"):
+        print("warning: baseline was run with a different configuration")
+    ok = True
+    print(f"\n{'vs. baseline':<42}{'before':>10}{'after':>10}")
+    for path, better, slack in CHECKS:
+        new, old = lookup(result, path), lookup(baseline, path)
+        if new is None or old is None:
+            continue
+        worse = new - old if better == "lower" else old - new
+        regressed = worse > max(tolerance * abs(old), slack)
+        ok &= not regressed
+        print(f"  {path:<40}{old:>10}{new:>10}  {'REGRESSED' if regressed else 'ok'}")
+    return ok
+
+
+def main(args) -> int:
+    result = asyncio.run(Suite(args).run())
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            if not compare(result, json.load(f), args.tolerance):
+                return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--symbols", type=int, default=200, help="perpetuals on the fake exchange")
+    parser.add_argument("--watch", type=int, default=4, help="symbols with dashboards (and streams)")
+    parser.add_argument("--trades-per-second", type=float, default=200, help="aggTrades per watched symbol")
+    parser.add_argument("--liquidations-per-second", type=float, default=0.5, help="per watched symbol")
+    parser.add_argument("--clients", type=int, default=100, help="dashboards in the broadcast phase")
+    parser.add_argument("--seconds", type=float, default=20.0, help="length of each measured phase")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds before measuring (book sync, klines)")
+    parser.add_argument("--connect-wait", type=float, default=3.0, help="seconds for dashboards to connect")
+    parser.add_argument("--out", help="write the results here as JSON")
+    parser.add_argument("--baseline", help="an earlier --out to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative change counted as a regression")
+    sys.exit(main(parser.parse_args()))
@@ -1,232 +1,446 @@
 import asyncio
-import json
 import logging
+import os
+import time
 import aiohttp
-from typing import Callable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Set
 from market_state import MarketState, MarketMetric, LiquidationEvent
+from liquidation_heatmap import MarketLiquidations
+from broadcaster import LatencyStats, EVENT_LATENCY
+from metrics import REGISTRY
+from wire_format import decode_message
+from recorder import TickRecorder
+from series_store import SeriesStore
+from rest_scheduler import RestScheduler
+from spot_symbols import SpotSymbolMap
 
 logger = logging.getLogger("BinanceClient")
 
+DEPTH_SNAPSHOT_LIMIT = 1000  # levels per side in the REST snapshot behind each local book
+# Subscribe to !forceOrder@arr (every symbol's liquidations) instead of per-symbol @forceOrder
+LIQUIDATIONS_ALL_MARKET = os.getenv("LIQUIDATIONS_ALL_MARKET", "0") == "1"
+ALL_MARKET_LIQUIDATIONS_STREAM = "!forceOrder@arr"
+# WebSocket bases, overridable like rest_scheduler's REST ones
+FSTREAM_URL = os.getenv("BINANCE_FSTREAM_URL", "wss://fstream.binance.com")
+SPOT_STREAM_URL = os.getenv("BINANCE_SPOT_STREAM_URL", "wss://stream.binance.com:9443")
+
+INGEST_BATCH_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_ingest_batch_seconds", "Decoding and applying one batch of exchange stream frames").labels()
+
 class BinanceClient:
-    BASE_URL = "https://fapi.binance.com"
-    SPOT_URL = "https://api.binance.com"
-    WS_URL = "wss://fstream.binance.com/ws"
+    """
+    Binance Futures feed for any number of symbols over one combined-stream
+    WebSocket. Symbols are added and removed with SUBSCRIBE / UNSUBSCRIBE
+    requests on the open socket, so switching never reconnects. A second
+    combined-stream socket to spot carries the matching spot miniTicker for
+    basis and premium. Each symbol's order book is kept from the 100 ms depth
+    diffs, re-synced from a REST snapshot whenever the diff chain breaks.
+    With LIQUIDATIONS_ALL_MARKET, liquidations come from the all-market
+    stream instead, so `liquidations` covers every symbol, not only watched ones.
+    """
+    WS_URL = f"{FSTREAM_URL}/stream"
+    SPOT_WS_URL = f"{SPOT_STREAM_URL}/stream"
+    STREAMS = ("aggTrade", "forceOrder", "markPrice", "depth@100ms")
+    SPOT_STREAM = "miniTicker"
     
-    def __init__(self, symbol: str, state: MarketState):
-        self.symbol = symbol.upper()
-        self.state = state
-        self.session: Optional[aiohttp.ClientSession] = None
+    def __init__(self, rest: Optional[RestScheduler] = None, recorder: Optional[TickRecorder] = None,
+                 all_market_liquidations: bool = LIQUIDATIONS_ALL_MARKET, series: Optional[SeriesStore] = None):
+        self.states: Dict[str, MarketState] = {}
+        self.all_market_liquidations = all_market_liquidations
+        # Rolling liquidation totals per symbol, for every symbol the feed reports
+        self.liquidations = MarketLiquidations()
+        # Weight-aware REST access shared with the scanner; the WebSocket rides
+        # on the same pooled HTTP session
+        self.rest = rest or RestScheduler()
+        # Optional raw tick capture for post-mortems and replay
+        self.recorder = recorder
+        # Optional persistent OI / ratio / funding / basis history
+        self.series = series
         self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.spot_ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.spot_map = SpotSymbolMap()
         self._running = False
-        self._tasks: List[asyncio.Task] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._book_syncs: Set[str] = set()
+        self._request_id = 0
+        # Event type -> handler; aggTrades are batched separately (see _handle_batch)
+        self._handlers: Dict[str, Callable[[dict], None]] = {
+            "forceOrder": self._on_force_order,
+            "depthUpdate": self._on_depth_update,
+            "24hrMiniTicker": self._on_mini_ticker,
+            "markPriceUpdate": self._on_mark_price,
+        }
+        self.frames = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.lag = LatencyStats(histogram=EVENT_LATENCY.labels("ingest"))
 
     async def start(self):
         if self._running:
             return
         
         self._running = True
-        self.session = aiohttp.ClientSession()
-        
-        # Initial Fetch
-        await self._fetch_initial_history()
         
         # Start Tasks
-        self._tasks.append(asyncio.create_task(self._poll_rest_data()))
-        self._tasks.append(asyncio.create_task(self._poll_spot_price()))
-        self._tasks.append(asyncio.create_task(self._connect_websocket()))
+        self._spawn(self._poll_rest_data())
+        self._spawn(self._connect_websocket())
+        self._spawn(self._connect_websocket(spot=True))
+        self._spawn(self._refresh_spot_map())
+        if self.recorder:
+            self.recorder.start()
 
     async def stop(self):
         self._running = False
-        for task in self._tasks:
+        for task in list(self._tasks):
             task.cancel()
-        self._tasks = []
+        self._tasks.clear()
         
-        if self.ws:
-            await self.ws.close()
-            self.ws = None
+        for ws in (self.ws, self.spot_ws):
+            if ws:
+                await ws.close()
+        self.ws = self.spot_ws = None
             
-        if self.session:
-            await self.session.close()
-            self.session = None
-
-    async def refresh_symbol(self, new_symbol: str):
-        logger.info(f"Switching symbol FROM {self.symbol} TO {new_symbol}")
-        await self.stop()
-        self.symbol = new_symbol.upper()
-        self.state.symbol = self.symbol
-        # Reset State Data (optional but cleaner)
-        self.state.liquidations = []
-        self.state.recent_trades = []
-        self.state.cvd = 0
-        await self.start()
-
-    async def _fetch_initial_history(self):
+        if self.recorder:
+            await self.recorder.stop()
+
+    async def add_symbol(self, symbol: str, state: MarketState):
+        """Warms up history for a symbol, then subscribes its streams."""
+        symbol = symbol.upper()
+        self.states[symbol] = state
+        await self._fetch_initial_history(symbol, state)
+        await self._send_ws("SUBSCRIBE", self._streams_for(symbol))
+        await self._send_ws("SUBSCRIBE", self._spot_streams_for(symbol), spot=True)
+        self._spawn(self._fetch_rest_data(symbol, state))
+        self._resync_book(symbol, state)
+        if self.series:
+            self._spawn(self.series.backfill(symbol))
+
+    async def remove_symbol(self, symbol: str):
+        symbol = symbol.upper()
+        if self.states.pop(symbol, None) is not None:
+            await self._send_ws("UNSUBSCRIBE", self._streams_for(symbol))
+            # Another watched contract may share the spot market (e.g. PEPE for 1000PEPE)
+            spot = self.spot_map.spot_symbol(symbol)
+            if not any(self.spot_map.spot_symbol(other) == spot for other in self.states):
+                await self._send_ws("UNSUBSCRIBE", self._spot_streams_for(symbol), spot=True)
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def _streams_for(self, symbol: str) -> List[str]:
+        return [
+            f"{symbol.lower()}@{stream}" for stream in self.STREAMS
+            if not (stream == "forceOrder" and self.all_market_liquidations)
+        ]
+
+    def _spot_streams_for(self, symbol: str) -> List[str]:
+        spot = self.spot_map.spot_symbol(symbol)
+        return [f"{spot.lower()}@{self.SPOT_STREAM}"] if spot else []
+
+    async def _send_ws(self, method: str, params: List[str], spot: bool = False):
+        # Streams for symbols added while disconnected are sent on (re)connect
+        ws = self.spot_ws if spot else self.ws
+        if not params or not ws or ws.closed:
+            return
+        self._request_id += 1
+        await ws.send_json({"method": method, "params": params, "id": self._request_id})
+
+    def _resync_book(self, symbol: str, state: MarketState):
+        """Fetches a depth snapshot for `symbol` unless one is already on its way."""
+        if symbol in self._book_syncs:
+            return
+        self._book_syncs.add(symbol)
+        task = self._spawn(self._fetch_depth_snapshot(symbol, state))
+        task.add_done_callback(lambda _: self._book_syncs.discard(symbol))
+
+    async def _fetch_depth_snapshot(self, symbol: str, state: MarketState):
+        # Diffs keep buffering in the book meanwhile; a snapshot older than
+        # all of them cannot be bridged, so try again with a newer one
+        for attempt in range(5):
+            try:
+                snapshot = await self.rest.depth(symbol, DEPTH_SNAPSHOT_LIMIT)
+            except Exception as e:
+                logger.error(f"Error fetching depth snapshot for {symbol}: {e}")
+                await asyncio.sleep(2 ** attempt)
+                continue
+            if self.states.get(symbol) is not state:
+                return  # removed meanwhile
+            if state.load_depth_snapshot(snapshot):
+                logger.info(f"Order book for {symbol} synced at update {snapshot['lastUpdateId']}")
+                return
+            await asyncio.sleep(1)
+        logger.warning(f"Order book for {symbol} not synced; retrying on the next diff")
+
+    async def _fetch_initial_history(self, symbol: str, state: MarketState):
         try:
-            # Fetch Klines (Price History) - 1m interval, last 60 candles
-            url = f"{self.BASE_URL}/fapi/v1/klines"
-            params = {"symbol": self.symbol, "interval": "1m", "limit": 60}
-            async with self.session.get(url, params=params) as resp:
-                data = await resp.json()
-                # [time, open, high, low, close, volume, ...]
-                self.state.price_history = [
-                    {"time": d[0], "close": float(d[4])} for d in data
-                ]
-                # Initialize CVD baseline from last candles (approx)
-                # This is a simplification; accurate CVD requires tick history
+            # One-off warm-up of the 1m candles (price + CVD history); live
+            # aggTrades keep them rolling from here on
+            state.seed_candles(await self.rest.klines(symbol, "1m", limit=60))
         except Exception as e:
-            logger.error(f"Error fetching history: {e}")
+            logger.error(f"Error fetching history for {symbol}: {e}")
 
-    async def _connect_websocket(self):
-        streams = [
-            f"{self.symbol.lower()}@aggTrade",
-            f"{self.symbol.lower()}@forceOrder",
-            f"{self.symbol.lower()}@markPrice"
-        ]
-        stream_url = f"{self.WS_URL}/{'/'.join(streams)}"
-        
+    async def _connect_websocket(self, spot: bool = False):
+        streams_for = self._spot_streams_for if spot else self._streams_for
         while self._running:
             try:
-                # Ensure session exists
-                if not self.session or self.session.closed:
-                     self.session = aiohttp.ClientSession()
-
-                async with self.session.ws_connect(stream_url) as ws:
-                    self.ws = ws
-                    logger.info(f"Connected to Binance WebSocket for {self.symbol}")
+                if spot and self.spot_map.stale:
+                    await self._load_spot_map()
+                async with self.rest.http.session.ws_connect(self.SPOT_WS_URL if spot else self.WS_URL) as ws:
+                    if spot:
+                        self.spot_ws = ws
+                    else:
+                        self.ws = ws
+                    streams = [s for symbol in self.states for s in streams_for(symbol)]
+                    if not spot and self.all_market_liquidations:
+                        streams.append(ALL_MARKET_LIQUIDATIONS_STREAM)
+                    await self._send_ws("SUBSCRIBE", streams, spot=spot)
+                    logger.info(f"Connected to Binance {'spot' if spot else 'futures'} WebSocket for {len(self.states)} symbols")
+                    batch: List[str] = []
                     async for msg in ws:
                         if not self._running: break
                         if msg.type == aiohttp.WSMsgType.TEXT:
-                            data = json.loads(msg.data)
-                            self._handle_stream_message(data)
+                            self._queue_frame(batch, msg.data)
                         elif msg.type == aiohttp.WSMsgType.ERROR:
                             break
             except Exception as e:
                 if self._running:
-                    logger.error(f"WebSocket error: {e}")
+                    logger.error(f"{'Spot' if spot else 'Futures'} WebSocket error: {e}")
                     await asyncio.sleep(5)
 
-    def _handle_stream_message(self, data: dict):
-        event_type = data.get("e")
-        if event_type == "aggTrade":
-            price = float(data["p"])
-            qty = float(data["q"])
-            is_buyer_maker = data["m"]
-            self.state.add_trade(price, qty, is_buyer_maker)
-            
-            # Real-time chart update (throttle this in frontend or backend if needed)
-            ts = data["E"]
-            # Append to CVD History if new minute or update last
-            # For simplicity, we just push to volatile state, frontend handles charting points
-            
-        elif event_type == "forceOrder":
-            order = data["o"]
-            liq_event = LiquidationEvent(
-                symbol=self.symbol,
-                side=order["S"], 
-                price=float(order["ap"]),
-                quantity=float(order["q"]),
-                timestamp=data["E"]
-            )
-            self.state.add_liquidation(liq_event)
-            
-        elif event_type == "markPriceUpdate":
-            self.state.update_price(float(data["p"]))
-            self.state.funding_rate = float(data["r"])
-            self.state.index_price = float(data["P"])
+    async def _load_spot_map(self):
+        # Symbols without a spot market simply get no spot stream
+        await self.spot_map.load(self.rest)
+        for symbol, state in list(self.states.items()):
+            state.spot_price = self.spot_map.spot_price(symbol)
 
-    async def _poll_spot_price(self):
+    async def _refresh_spot_map(self):
+        """
+        Reloads the spot map once it goes stale and moves the open spot socket
+        over to the new mapping, so newly listed spot pairs get their stream
+        without waiting for a reconnect.
+        """
         while self._running:
+            await asyncio.sleep(max(self.spot_map.loaded_at + self.spot_map.max_age - time.time(), 60))
+            if not self.spot_map.stale:
+                continue  # a reconnect reloaded it meanwhile
+            before = {s for symbol in self.states for s in self._spot_streams_for(symbol)}
             try:
-                url = f"{self.SPOT_URL}/api/v3/ticker/price"
-                params = {"symbol": self.symbol} 
-                # Note: Some futures symbols might not map 1:1 to spot (e.g. 1000PEPE vs PEPE)
-                # We assume 1:1 for main pairs (BTC, ETH, SOL)
-                async with self.session.get(url, params=params) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        self.state.spot_price = float(data["price"])
-                await asyncio.sleep(5) 
-            except Exception:
-                # Silently fail if spot pair doesn't exist or error
-                pass
+                await self._load_spot_map()
+            except Exception as e:
+                logger.error(f"Error refreshing spot symbol map: {e}")
+                continue
+            after = {s for symbol in self.states for s in self._spot_streams_for(symbol)}
+            await self._send_ws("UNSUBSCRIBE", sorted(before - after), spot=True)
+            await self._send_ws("SUBSCRIBE", sorted(after - before), spot=True)
+            if after != before:
+                logger.info(f"Spot map refreshed: {len(after - before)} streams added, {len(before - after)} dropped")
+
+    def _queue_frame(self, batch: List[str], raw: str):
+        """
+        Queues a raw frame for the next batch. aiohttp hands over frames that
+        are already buffered without yielding, so everything that arrived in
+        one event-loop turn lands in the same batch.
+        """
+        if not batch:
+            asyncio.get_running_loop().call_soon(self._drain_batch, batch)
+        batch.append(raw)
+
+    def _drain_batch(self, batch: List[str]):
+        frames = batch[:]
+        batch.clear()
+        start = time.perf_counter()
+        try:
+            self._handle_batch([decode_message(raw) for raw in frames])
+        except Exception as e:
+            logger.error(f"Error applying a batch of {len(frames)} frames: {e}")
+        INGEST_BATCH_SECONDS.observe(time.perf_counter() - start)
+
+    def _handle_stream_message(self, message: dict):
+        self._handle_batch((message,))
+
+    def _handle_batch(self, messages: Iterable[dict]):
+        """
+        Applies combined-stream frames in order, dispatching on the event
+        type. A symbol's consecutive aggTrades are collected and applied in
+        one MarketState.add_trades call, flushed before any other event for
+        that symbol so per-symbol ordering is kept.
+        """
+        # Combined stream frames are {"stream": ..., "data": {...}}; replies to
+        # SUBSCRIBE requests ({"result": null, "id": n}) carry no data
+        handlers = self._handlers
+        trades: Dict[str, List[dict]] = {}
+        count = 0
+        newest = 0
+        for message in messages:
+            data = message.get("data")
+            if data is None:
+                continue
+            count += 1
+            newest = data.get("E", newest)
+            event_type = data.get("e")
+            if event_type == "aggTrade":
+                run = trades.get(data["s"])
+                if run is None:
+                    trades[data["s"]] = [data]
+                else:
+                    run.append(data)
+                continue
+            run = trades.pop(data.get("s"), None)
+            if run is not None:
+                self._on_agg_trades(run)
+            handler = handlers.get(event_type)
+            if handler is not None:
+                handler(data)
+        for run in trades.values():
+            self._on_agg_trades(run)
+        if count:
+            self.frames += count
+            self.batches += 1
+            self.max_batch = max(self.max_batch, count)
+            self.lag.add(time.time() * 1000 - newest)
+
+    def _on_agg_trades(self, events: List[dict]):
+        symbol = events[0]["s"]
+        state = self.states.get(symbol)
+        if state is None:
+            return
+        trades = [(float(data["p"]), float(data["q"]), data["m"], data["E"]) for data in events]
+        # Also rolls the taker windows and the live 1m price/CVD candle
+        state.add_trades(trades)
+        if self.recorder:
+            for price, qty, is_buyer_maker, ts in trades:
+                self.recorder.record_trade(symbol, ts, price, qty, is_buyer_maker)
+
+    def _on_force_order(self, data: dict):
+        order = data["o"]
+        self.liquidations.add(order["s"], order["S"], float(order["ap"]), float(order["q"]), data["E"])
+        state = self.states.get(order["s"])
+        if state is None:
+            return
+        liq_event = LiquidationEvent(
+            symbol=order["s"],
+            side=order["S"],
+            price=float(order["ap"]),
+            quantity=float(order["q"]),
+            timestamp=data["E"]
+        )
+        state.add_liquidation(liq_event)
+        if self.recorder:
+            self.recorder.record_liquidation(order["s"], data["E"], liq_event.price, liq_event.quantity, liq_event.side)
+
+    def _on_depth_update(self, data: dict):
+        state = self.states.get(data["s"])
+        if state is None:
+            return
+        if not state.apply_depth(data):
+            logger.warning(f"Order book gap for {data['s']} at update {data['U']}; resyncing")
+        if not state.order_book.synced:
+            self._resync_book(data["s"], state)
+
+    def _on_mini_ticker(self, data: dict):
+        # Spot stream: one spot market can back several contracts
+        close = float(data["c"])
+        for futures_symbol, multiplier in self.spot_map.futures_for(data["s"]):
+            state = self.states.get(futures_symbol)
+            if state is not None:
+                state.spot_price = close * multiplier
+
+    def _on_mark_price(self, data: dict):
+        state = self.states.get(data["s"])
+        if state is None:
+            return
+        state.update_price(float(data["p"]), data["E"])
+        state.funding_rate = float(data["r"])
+        state.index_price = float(data["P"])
+        state.roll_windows(data["E"])
+        if self.recorder:
+            self.recorder.record_mark(data["s"], data["E"], state.mark_price, state.index_price, state.funding_rate)
+        if self.series:
+            self.series.add(data["s"], "funding", data["E"], state.funding_rate)
+            if state.spot_price > 0:
+                self.series.add(data["s"], "basis", data["E"], state.basis)
+
+    def stats(self) -> dict:
+        """Ingestion counters for /health; `lag_ms` is wall clock minus the newest event time per batch."""
+        return {
+            "frames": self.frames,
+            "batches": self.batches,
+            "avg_batch": round(self.frames / self.batches, 1) if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "lag_ms": self.lag.to_dict(),
+        }
 
     async def _poll_rest_data(self):
         while self._running:
-            try:
-                await self._fetch_open_interest()
-                await self._fetch_long_short_ratio()
-                await asyncio.sleep(300) 
-            except Exception as e:
-                logger.error(f"REST polling error: {e}")
-                await asyncio.sleep(60)
-
-    async def _fetch_open_interest(self):
-        url = f"{self.BASE_URL}/fapi/v1/openInterest"
-        async with self.session.get(url, params={"symbol": self.symbol}) as resp:
-            data = await resp.json()
-            self.state.open_interest = float(data["openInterest"])
-            # Add to OI history (timestamp, value)
-            self.state.oi_history.append({
-                "time": int(data["time"]),
-                "oi": float(data["openInterest"])
-            })
-            if len(self.state.oi_history) > 60:
-                self.state.oi_history.pop(0)
-
-    async def _fetch_long_short_ratio(self):
-        # Global Long/Short
-        url = f"{self.BASE_URL}/futures/data/globalLongShortAccountRatio"
-        params = {"symbol": self.symbol, "period": "5m", "limit": 1}
-        async with self.session.get(url, params=params) as resp:
-            data = await resp.json()
-            if data:
-                latest = data[0]
-                self.state.global_ratio.long_ratio = float(latest["longAccount"])
-                self.state.global_ratio.short_ratio = float(latest["shortAccount"])
-        
-        # Top Trader Account Ratio
-        url = f"{self.BASE_URL}/futures/data/topLongShortAccountRatio"
-        async with self.session.get(url, params=params) as resp:
-            data = await resp.json()
-            if data:
-                latest = data[0]
-                self.state.top_accounts_ratio.long_ratio = float(latest["longAccount"])
-                self.state.top_accounts_ratio.short_ratio = float(latest["shortAccount"])
-
-        # Top Trader Position Ratio
-        url = f"{self.BASE_URL}/futures/data/topLongShortPositionRatio"
-        async with self.session.get(url, params=params) as resp:
-            data = await resp.json()
-            if data:
+            await asyncio.sleep(300)
+            # All symbols at once; the scheduler paces them against the weight budget
+            await asyncio.gather(*(
+                self._fetch_rest_data(symbol, state) for symbol, state in list(self.states.items())
+            ))
+
+    async def _fetch_rest_data(self, symbol: str, state: MarketState):
+        results = await asyncio.gather(
+            self._fetch_open_interest(symbol, state),
+            self._fetch_long_short_ratio(symbol, state),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"REST polling error for {symbol}: {result}")
+
+    async def _fetch_open_interest(self, symbol: str, state: MarketState):
+        data = await self.rest.open_interest(symbol)
+        # Add to OI history (timestamp, value)
+        state.add_open_interest(int(data["time"]), float(data["openInterest"]))
+        if self.series:
+            self.series.add(symbol, "oi", int(data["time"]), float(data["openInterest"]))
+
+    async def _fetch_long_short_ratio(self, symbol: str, state: MarketState):
+        # Global, top-trader account and top-trader position long/short, concurrently
+        global_ratio, top_accounts, top_positions = await asyncio.gather(
+            self.rest.ratio("globalLongShortAccountRatio", symbol),
+            self.rest.ratio("topLongShortAccountRatio", symbol),
+            self.rest.ratio("topLongShortPositionRatio", symbol),
+            return_exceptions=True,
+        )
+        for name, metric, data in (("global_long", state.global_ratio, global_ratio),
+                                   ("top_accounts_long", state.top_accounts_ratio, top_accounts),
+                                   ("top_positions_long", state.top_positions_ratio, top_positions)):
+            # One failed ratio must not throw away the other two
+            if isinstance(data, Exception):
+                logger.error(f"REST polling error for {symbol} {name}: {data}")
+            elif data:
                 latest = data[0]
-                self.state.top_positions_ratio.long_ratio = float(latest["longAccount"])
-                self.state.top_positions_ratio.short_ratio = float(latest["shortAccount"])
+                metric.long_ratio = float(latest["longAccount"])
+                metric.short_ratio = float(latest["shortAccount"])
+                if self.series:
+                    self.series.add(symbol, name, int(latest["timestamp"]), metric.long_ratio)
+
+        state.mark_dirty("ratios")
 
     async def get_available_symbols(self) -> List[dict]:
         """
         Fetches all trading pairs and their 24h ticker data.
         Returns sorted list by Volume (descending).
         """
-        if not self.session:
-             self.session = aiohttp.ClientSession()
-             
         try:
-            url = f"{self.BASE_URL}/fapi/v1/ticker/24hr"
-            async with self.session.get(url) as resp:
-                data = await resp.json()
-                # Filter for USDT pairs only for simplicity
-                symbols = [
-                    {
-                        "symbol": item["symbol"],
-                        "price": float(item["lastPrice"]),
-                        "change": float(item["priceChangePercent"]),
-                        "volume": float(item["quoteVolume"]) # Quote volume is in USDT
-                    }
-                    for item in data if item["symbol"].endswith("USDT")
-                ]
-                # Sort by Volume desc
-                symbols.sort(key=lambda x: x["volume"], reverse=True)
-                return symbols
+            data = await self.rest.ticker_24hr()
+            # Filter for USDT pairs only for simplicity
+            symbols = [
+                {
+                    "symbol": item["symbol"],
+                    "price": float(item["lastPrice"]),
+                    "change": float(item["priceChangePercent"]),
+                    "volume": float(item["quoteVolume"]) # Quote volume is in USDT
+                }
+                for item in data if item["symbol"].endswith("USDT")
+            ]
+            # Sort by Volume desc
+            symbols.sort(key=lambda x: x["volume"], reverse=True)
+            return symbols
         except Exception as e:
             logger.error(f"Error fetching symbols: {e}")
             return []
@@ -0,0 +1,361 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from market_state import CHANNELS, CHANNEL_INTERVALS, DEFAULT_CHANNELS
+from metrics import REGISTRY, Histogram
+from ring_buffer import RingBuffer
+from wire_format import DEFAULT_FORMAT, WireFormat, encode_message
+
+logger = logging.getLogger("Broadcaster")
+
+SEND_QUEUE_SIZE = 8  # frames buffered per client before it is coalesced to a snapshot
+LATENCY_SAMPLES = 1024
+# Socket writes happen per client, so only every Nth one feeds the /metrics histogram
+SOCKET_HISTOGRAM_EVERY = 16
+
+Frame = Union[str, bytes]  # text (JSON) or binary (MessagePack) WebSocket frame
+
+EVENT_LATENCY = REGISTRY.histogram(
+    "cryptoterminal_event_latency_seconds",
+    "Exchange event time (E) to a pipeline stage: ingest (applied), flush (patch rendered), "
+    "bus (sent to API workers), socket (written to a dashboard; 1 in 16 writes sampled)", ("stage",))
+SERIALIZE_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_serialize_seconds", "Rendering one channel's patch from MarketState", ("channel",))
+BROADCAST_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_broadcast_seconds",
+    "Encoding one channel flush and queueing it for every subscriber, snapshots included", ("channel",))
+_SERIALIZE = {channel: SERIALIZE_SECONDS.labels(channel) for channel in CHANNELS}
+_BROADCAST = {channel: BROADCAST_SECONDS.labels(channel) for channel in CHANNELS}
+
+
+class LatencyStats:
+    """
+    Recent latency samples (ms) with percentiles for /health, optionally also
+    fed to a /metrics histogram, every `histogram_every`th sample only.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES, histogram: Optional[Histogram] = None,
+                 histogram_every: int = 1):
+        self.samples = RingBuffer(samples)
+        self.count = 0
+        self.histogram = histogram
+        self.histogram_every = histogram_every
+
+    def add(self, ms: float):
+        self.samples.append(ms)
+        self.count += 1
+        if self.histogram is not None and not self.count % self.histogram_every:
+            self.histogram.observe(ms / 1000)
+
+    def to_dict(self) -> dict:
+        samples = sorted(self.samples)
+        if not samples:
+            return {"count": 0}
+
+        def pick(q: float) -> float:
+            return round(samples[min(len(samples) - 1, int(q * len(samples)))], 1)
+
+        return {"count": self.count, "p50": pick(0.5), "p95": pick(0.95), "p99": pick(0.99), "max": round(samples[-1], 1)}
+
+
+class ChangeNotifier:
+    """
+    Wakes the broadcast loop. `notify` is a cheap, synchronous call made by
+    MarketState when a channel first goes pending and by the connection
+    manager when a client needs a snapshot; the loop sleeps in `wait` until
+    then, or until the end of a coalescing window.
+    """
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self.notifications = 0
+        self.wakeups = 0
+
+    def notify(self):
+        self.notifications += 1
+        self._event.set()
+
+    async def wait(self, timeout: Optional[float] = None):
+        if not self._event.is_set():
+            try:
+                await asyncio.wait_for(self._event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._event.clear()
+        self.wakeups += 1
+
+
+class ClientConnection:
+    """
+    One dashboard socket with its own bounded send queue and writer task,
+    so a slow consumer never blocks the broadcast loop or other clients.
+    It is subscribed to one symbol and a set of channels; each channel is
+    in sync independently and `needs_snapshot` holds the ones that are not.
+
+    Frames carry the exchange time of their oldest change, so the writer can
+    record event-to-socket latency once the frame is actually written.
+    """
+
+    def __init__(self, websocket, symbol: str, channels: Iterable[str], max_queue: int = SEND_QUEUE_SIZE,
+                 on_resync: Optional[Callable[[], None]] = None, latency: Optional[LatencyStats] = None,
+                 fmt: WireFormat = DEFAULT_FORMAT):
+        self.websocket = websocket
+        self.symbol = symbol
+        self.fmt = fmt
+        self.channels: Set[str] = set(channels)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.needs_snapshot: Set[str] = set(self.channels)
+        self.on_resync = on_resync
+        self.latency = latency
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, frame: Frame, event_time: int = 0):
+        """
+        Queues a frame without blocking. Patches depend on every earlier patch,
+        so on overflow the backlog is dropped and the client is coalesced onto
+        the next snapshots instead.
+        """
+        try:
+            self.queue.put_nowait((frame, event_time))
+        except asyncio.QueueFull:
+            self.resync()
+            self.frames_dropped += 1
+
+    def resync(self, channel: Optional[str] = None):
+        if channel is not None:
+            # Only that channel's seq broke; the queued frames of others are fine
+            if channel in self.channels:
+                self.needs_snapshot.add(channel)
+        else:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.frames_dropped += 1
+            self.needs_snapshot = set(self.channels)
+        if self.on_resync:
+            self.on_resync()
+
+    def wants(self, channel: str) -> bool:
+        """Subscribed and in sync, i.e. ready for patches."""
+        return channel in self.channels and channel not in self.needs_snapshot
+
+    async def writer(self):
+        while True:
+            frame, event_time = await self.queue.get()
+            if isinstance(frame, bytes):
+                await self.websocket.send_bytes(frame)
+            else:
+                await self.websocket.send_text(frame)
+            self.frames_sent += 1
+            self.bytes_sent += len(frame)
+            if event_time and self.latency is not None:
+                self.latency.add(time.time() * 1000 - event_time)
+
+
+class ConnectionManager:
+    """
+    Dashboard sockets, indexed by the symbol each one is watching. Owns the
+    broadcast loop's `notifier` and its latency stats: `flush` is exchange
+    event to patch encoded, `socket` exchange event to frame written (both
+    include network delay from Binance and any clock offset).
+    """
+
+    def __init__(self, max_queue: int = SEND_QUEUE_SIZE):
+        self.max_queue = max_queue
+        self.clients: Dict[object, ClientConnection] = {}
+        self.by_symbol: Dict[str, Set[ClientConnection]] = {}
+        self.notifier = ChangeNotifier()
+        self.latency = {"flush": LatencyStats(histogram=EVENT_LATENCY.labels("flush")),
+                        "socket": LatencyStats(histogram=EVENT_LATENCY.labels("socket"),
+                                               histogram_every=SOCKET_HISTOGRAM_EVERY)}
+        self.flushes = 0
+        self.coalesced = 0
+        self._last_flush: Dict[Tuple[str, str], float] = {}
+
+    @property
+    def active_connections(self) -> List:
+        return list(self.clients)
+
+    def symbols(self) -> List[str]:
+        """Symbols with at least one watching client."""
+        return list(self.by_symbol)
+
+    def has_subscribers(self, symbol: str, channel: str) -> bool:
+        return any(channel in c.channels for c in self.by_symbol.get(symbol, ()))
+
+    def awaiting_snapshot(self, symbol: str, channel: str) -> bool:
+        return any(channel in c.needs_snapshot for c in self.by_symbol.get(symbol, ()))
+
+    async def connect(self, websocket, symbol: str, channels: Iterable[str] = DEFAULT_CHANNELS,
+                      fmt: WireFormat = DEFAULT_FORMAT):
+        await websocket.accept()
+        client = ClientConnection(websocket, symbol, channels, self.max_queue,
+                                  on_resync=self.notifier.notify, latency=self.latency["socket"], fmt=fmt)
+        client.offer(encode_message(fmt.hello()))
+        client.task = asyncio.create_task(self._run_writer(client))
+        self.clients[websocket] = client
+        self.by_symbol.setdefault(symbol, set()).add(client)
+        self.notifier.notify()
+
+    def disconnect(self, websocket):
+        client = self.clients.pop(websocket, None)
+        if client is None:
+            return
+        self._unindex(client)
+        if client.task and client.task is not asyncio.current_task():
+            client.task.cancel()
+
+    def set_symbol(self, websocket, symbol: str):
+        """Moves a client to another symbol; it gets that symbol's snapshots next."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        self._unindex(client)
+        client.symbol = symbol
+        self.by_symbol.setdefault(symbol, set()).add(client)
+        client.resync()
+
+    def set_channels(self, websocket, channels: Iterable[str]):
+        """Replaces a client's channel subscriptions; newly added ones start with a snapshot."""
+        client = self.clients.get(websocket)
+        if client is None:
+            return
+        channels = set(channels)
+        client.needs_snapshot = (client.needs_snapshot & channels) | (channels - client.channels)
+        client.channels = channels
+        if client.needs_snapshot:
+            self.notifier.notify()
+
+    def _unindex(self, client: ClientConnection):
+        watchers = self.by_symbol.get(client.symbol)
+        if watchers is not None:
+            watchers.discard(client)
+            if not watchers:
+                del self.by_symbol[client.symbol]
+
+    def request_snapshot(self, websocket, channel: Optional[str] = None):
+        client = self.clients.get(websocket)
+        if client:
+            client.resync(channel)
+
+    async def _run_writer(self, client: ClientConnection):
+        try:
+            await client.writer()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error brodcasting: {e}")
+            self.disconnect(client.websocket)
+
+    def broadcast(self, message: dict, symbol: str, channel: str, event_time: int = 0) -> int:
+        """
+        Encodes a patch once per wire format in use and queues it for every
+        in-sync subscriber of `channel` on `symbol`; returns how many clients got it.
+        """
+        frames: Dict[WireFormat, Frame] = {}
+        sent = 0
+        for client in self.by_symbol.get(symbol, ()):
+            if not client.wants(channel):
+                continue
+            frame = frames.get(client.fmt)
+            if frame is None:
+                frame = frames[client.fmt] = client.fmt.encode(message)
+            client.offer(frame, event_time)
+            sent += 1
+        self.flushes += 1
+        if sent and event_time:
+            self.latency["flush"].add(time.time() * 1000 - event_time)
+        return sent
+
+    def send_snapshots(self, snapshot: dict, symbol: str, channel: str):
+        """Queues a channel snapshot for clients on `symbol` that are new to it or resyncing."""
+        frames: Dict[WireFormat, Frame] = {}
+        for client in self.by_symbol.get(symbol, ()):
+            if channel in client.needs_snapshot:
+                client.needs_snapshot.discard(channel)
+                frame = frames.get(client.fmt)
+                if frame is None:
+                    frame = frames[client.fmt] = client.fmt.encode(snapshot)
+                client.offer(frame)
+
+    async def run(self, states):
+        """
+        Event-driven snapshot-plus-patch broadcast for every watched symbol
+        (`states.get(symbol)` returns its MarketState).
+
+        Sleeps until a state reports a channel going pending or a client
+        needs a snapshot. A channel that has been quiet for its
+        CHANNEL_INTERVALS window is flushed at once; a busy one is coalesced
+        until its window ends, so idle periods cost nothing and bursts are
+        capped at one patch per window. Channels nobody subscribes to are
+        never rendered and never wake the loop. New or resyncing subscribers
+        get the channel snapshot right after its patch is drained, so it
+        already includes everything in it.
+        """
+        while True:
+            wake_at = self.flush_due(states, time.monotonic())
+            await self.notifier.wait(None if wake_at is None else max(0.0, wake_at - time.monotonic()))
+
+    def flush_due(self, states, now: float) -> Optional[float]:
+        """One pass of `run`; returns when the earliest coalesced channel is due, if any."""
+        wake_at = None
+        symbols = self.symbols()
+        for symbol in symbols:
+            state = states.get(symbol)
+            if state is None:
+                continue
+            state.unwatched = frozenset(c for c in CHANNELS if not self.has_subscribers(symbol, c))
+            for channel in CHANNELS:
+                if channel in state.unwatched:
+                    state.discard_changes(channel)
+                    continue
+                awaiting = self.awaiting_snapshot(symbol, channel)
+                if not awaiting and not state.has_changes(channel):
+                    continue
+                due = self._last_flush.get((symbol, channel), 0.0) + CHANNEL_INTERVALS[channel]
+                if now < due and not awaiting:
+                    self.coalesced += 1
+                    wake_at = due if wake_at is None else min(wake_at, due)
+                    continue
+                self._last_flush[(symbol, channel)] = now
+                event_time = state.pending_since(channel)
+                started = time.perf_counter()
+                patch = state.collect_patch(channel)
+                rendered = time.perf_counter()
+                if patch:
+                    self.broadcast(patch, symbol, channel, event_time)
+                if awaiting:
+                    self.send_snapshots(state.snapshot(channel), symbol, channel)
+                _SERIALIZE[channel].observe(rendered - started)
+                _BROADCAST[channel].observe(time.perf_counter() - rendered)
+        watched = set(symbols)
+        for key in [k for k in self._last_flush if k[0] not in watched]:
+            del self._last_flush[key]
+        return wake_at
+
+    def stats(self) -> dict:
+        channels: Dict[str, int] = {}
+        formats: Dict[str, int] = {}
+        for client in self.clients.values():
+            for channel in client.channels:
+                channels[channel] = channels.get(channel, 0) + 1
+            name = f"{client.fmt.encoding}/{client.fmt.layout}"
+            formats[name] = formats.get(name, 0) + 1
+        return {
+            "connections": len(self.clients),
+            "symbols": len(self.by_symbol),
+            "channels": channels,
+            "formats": formats,
+            "queued": sum(c.queue.qsize() for c in self.clients.values()),
+            "sent": sum(c.frames_sent for c in self.clients.values()),
+            "bytes_sent": sum(c.bytes_sent for c in self.clients.values()),
+            "dropped": sum(c.frames_dropped for c in self.clients.values()),
+            "flushes": self.flushes,
+            "coalesced": self.coalesced,
+            "wakeups": self.notifier.wakeups,
+            "latency_ms": {name: stats.to_dict() for name, stats in self.latency.items()},
+        }
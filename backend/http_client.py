@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Collection, Dict, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from metrics import REGISTRY
+from ring_buffer import RingBuffer
+
+logger = logging.getLogger("HttpClient")
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+LATENCY_SAMPLES = 256  # per host
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_http_request_seconds", "Successful outbound REST requests, per attempt", ("host",))
+
+
+def _percentile_ms(samples: list, q: float) -> Optional[float]:
+    if not samples:
+        return None
+    return round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 1)
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, url: str):
+        super().__init__(f"HTTP {status} from {url}")
+        self.status = status
+        self.url = url
+
+
+class HostStats:
+    __slots__ = ("requests", "errors", "retries", "latencies", "histogram")
+
+    def __init__(self, host: str = ""):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.latencies = RingBuffer(LATENCY_SAMPLES)  # seconds
+        self.histogram = REQUEST_SECONDS.labels(host)
+
+    def to_dict(self) -> dict:
+        samples = sorted(self.latencies)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "p50_ms": _percentile_ms(samples, 0.5),
+            "p95_ms": _percentile_ms(samples, 0.95),
+        }
+
+
+class HttpClient:
+    """
+    One aiohttp session for the whole app: every poller and endpoint shares its
+    keep-alive connection pools (capped per host) and DNS cache, so only the
+    first request to a host pays for DNS and the TLS handshake.
+
+    `get_json` applies a default timeout and retries connection errors,
+    timeouts, 429 and 5xx with exponential backoff (honouring Retry-After);
+    callers that rate-limit themselves pass their own `retry_statuses`.
+    Connection reuse comes from aiohttp tracing; latency is kept per host.
+    """
+
+    def __init__(self, limit: int = 100, limit_per_host: int = 10, dns_ttl: int = 300,
+                 timeout: float = 10.0, retries: int = 2, backoff: float = 0.5):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_ttl = dns_ttl
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=min(5.0, timeout))
+        self.retries = retries
+        self.backoff = backoff
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.hosts: Dict[str, HostStats] = {}
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.dns_hits = 0
+        self.dns_misses = 0
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """Created lazily so it binds to the running event loop."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=self.timeout, trace_configs=[self._trace_config()]
+            )
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace = aiohttp.TraceConfig()
+
+        async def created(session, ctx, params):
+            self.connections_created += 1
+
+        async def reused(session, ctx, params):
+            self.connections_reused += 1
+
+        async def dns_hit(session, ctx, params):
+            self.dns_hits += 1
+
+        async def dns_miss(session, ctx, params):
+            self.dns_misses += 1
+
+        trace.on_connection_create_end.append(created)
+        trace.on_connection_reuseconn.append(reused)
+        trace.on_dns_cache_hit.append(dns_hit)
+        trace.on_dns_cache_miss.append(dns_miss)
+        return trace
+
+    def _host(self, url: str) -> HostStats:
+        host = urlsplit(url).netloc
+        stats = self.hosts.get(host)
+        if stats is None:
+            stats = self.hosts[host] = HostStats(host)
+        return stats
+
+    async def get_json(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                       timeout: Optional[float] = None, retries: Optional[int] = None,
+                       on_response: Optional[Callable[[aiohttp.ClientResponse], None]] = None,
+                       retry_statuses: Collection[int] = RETRY_STATUSES) -> Any:
+        """
+        GET and decode JSON; raises HttpError on a non-2xx status once retries
+        are spent. `on_response` sees every response, e.g. to read rate-limit headers.
+        """
+        stats = self._host(url)
+        attempts = (self.retries if retries is None else retries) + 1
+        request_timeout = aiohttp.ClientTimeout(total=timeout) if timeout else None
+        for attempt in range(attempts):
+            delay = self.backoff * 2 ** attempt
+            stats.requests += 1
+            start = time.perf_counter()
+            try:
+                async with self.session.get(url, params=params, headers=headers, timeout=request_timeout) as resp:
+                    if on_response:
+                        on_response(resp)
+                    if resp.status < 300:
+                        data = await resp.json(content_type=None)
+                        elapsed = time.perf_counter() - start
+                        stats.latencies.append(elapsed)
+                        stats.histogram.observe(elapsed)
+                        return data
+                    stats.errors += 1
+                    if resp.status not in retry_statuses or attempt == attempts - 1:
+                        raise HttpError(resp.status, url)
+                    retry_after = resp.headers.get("Retry-After")
+                    if retry_after and retry_after.isdigit():
+                        delay = max(delay, float(retry_after))
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                stats.errors += 1
+                if attempt == attempts - 1:
+                    raise
+                logger.debug(f"Retrying {url} after {type(e).__name__}")
+            stats.retries += 1
+            await asyncio.sleep(delay)
+
+    def stream(self, url: str, sock_read: float = 300, **kwargs):
+        """Long-lived GET (e.g. SSE): no total timeout, only a read-idle one."""
+        return self.session.get(url, timeout=aiohttp.ClientTimeout(total=None, sock_read=sock_read), **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "dns_cache_hits": self.dns_hits,
+            "dns_cache_misses": self.dns_misses,
+            "hosts": {host: stats.to_dict() for host, stats in self.hosts.items()},
+        }
@@ -0,0 +1,220 @@
+import math
+from typing import Dict, List, Optional
+
+import numpy as np
+
+RSI_PERIOD = 14
+VOLUME_LOOKBACK = 3  # closed 1m volumes kept per symbol
+MINUTE_MS = 60_000
+
+
+class UniverseIndicators:
+    """
+    Incremental 1m indicator state for every symbol in the all-ticker stream,
+    held in NumPy arrays indexed by symbol so each ticker frame is applied in a
+    single vectorized pass.
+
+    Per symbol it keeps Wilder's RSI averages over closed 1m closes and the
+    base volume of the live 1m kline plus the last few closed ones. Volumes
+    come from the `<symbol>@kline_1m` streams (`update_kline`) and from REST
+    klines in `seed`, so both are the exchange's own 1m kline volume; the
+    ticker clock rolls a symbol's live minute over when its stream is quiet.
+    Klines are only fetched once per symbol to warm the RSI up; otherwise it
+    warms itself after RSI_PERIOD minutes of stream.
+    """
+
+    def __init__(self, capacity: int = 512, period: int = RSI_PERIOD):
+        self.period = period
+        self.index: Dict[str, int] = {}
+        self.symbols: List[str] = []
+        self.minute: Optional[int] = None  # open time of the live minute
+        self._alloc(capacity)
+
+    def _alloc(self, capacity: int):
+        nan = np.full(capacity, np.nan)
+        self.close = nan.copy()            # last price
+        self.open_24h = nan.copy()
+        self.prev_close = nan.copy()       # close of the last closed minute
+        self.avg_gain = nan.copy()         # Wilder averages over closed minutes
+        self.avg_loss = nan.copy()
+        self.kline_open = nan.copy()       # open time of the live 1m kline, epoch ms
+        self.live_volume = nan.copy()      # its base volume so far
+        self.volumes = np.full((capacity, VOLUME_LOOKBACK), np.nan)  # oldest first
+        self.closes_seen = np.zeros(capacity, dtype=np.int64)
+        self.warm = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        old = len(self.close)
+        fields = ("close", "open_24h", "prev_close", "avg_gain", "avg_loss",
+                  "kline_open", "live_volume", "volumes", "closes_seen", "warm")
+        previous = {name: getattr(self, name) for name in fields}
+        self._alloc(old * 2)
+        for name, values in previous.items():
+            getattr(self, name)[:old] = values
+
+    def slot(self, symbol: str) -> int:
+        i = self.index.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i == len(self.close):
+                self._grow()
+            self.index[symbol] = i
+            self.symbols.append(symbol)
+        return i
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def cold_symbols(self) -> List[str]:
+        """Symbols whose RSI is not warmed up yet (candidates for a kline seed)."""
+        n = len(self.symbols)
+        return [self.symbols[i] for i in np.flatnonzero(~self.warm[:n])]
+
+    def update(self, items: List[dict], event_time_ms: int):
+        """Applies one all-ticker frame (list of 24hrTicker payloads)."""
+        minute = event_time_ms - event_time_ms % MINUTE_MS
+        if self.minute is None:
+            self.minute = minute
+        elif minute > self.minute:
+            self._close_minute(minute)
+            self.minute = minute
+
+        n = len(items)
+        idx = np.fromiter((self.slot(item["s"]) for item in items), dtype=np.int64, count=n)
+        self.close[idx] = np.fromiter((float(item["c"]) for item in items), dtype=float, count=n)
+        self.open_24h[idx] = np.fromiter((float(item["o"]) for item in items), dtype=float, count=n)
+        # First sighting: measure price changes from here
+        fresh = idx[np.isnan(self.prev_close[idx])]
+        self.prev_close[fresh] = self.close[fresh]
+
+    def update_kline(self, symbol: str, open_ms: int, volume: float):
+        """Applies one `kline_1m` stream update: the live kline's open time and base volume."""
+        i = self.slot(symbol)
+        current = self.kline_open[i]
+        if open_ms == current:
+            self.live_volume[i] = volume
+        elif math.isnan(current) or open_ms > current:
+            if not math.isnan(current):
+                # Minutes without any update had no trades
+                skipped = min(int(open_ms - current) // MINUTE_MS - 1, VOLUME_LOOKBACK)
+                self._push_volumes(i, [self.live_volume[i]] + [0.0] * skipped)
+            self.kline_open[i] = open_ms
+            self.live_volume[i] = volume
+        elif open_ms == current - MINUTE_MS:
+            # The final update of a kline the ticker clock already rolled over
+            self.volumes[i, -1] = volume
+
+    def _push_volumes(self, i: int, volumes: List[float]):
+        volumes = volumes[-VOLUME_LOOKBACK:]
+        row = self.volumes[i]
+        row[:] = np.concatenate((row[len(volumes):], volumes))
+
+    def _close_minute(self, minute: int):
+        """Rolls every symbol's live minute into its closed-minute state."""
+        n = len(self.symbols)
+        close = self.close[:n]
+        prev = self.prev_close[:n]
+        delta = close - prev
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        p = self.period
+        has_avg = ~np.isnan(self.avg_gain[:n])
+        self.avg_gain[:n] = np.where(has_avg, (self.avg_gain[:n] * (p - 1) + gain) / p, self.avg_gain[:n])
+        self.avg_loss[:n] = np.where(has_avg, (self.avg_loss[:n] * (p - 1) + loss) / p, self.avg_loss[:n])
+        # Without a kline seed, bootstrap the averages from the first closed minute
+        start = ~has_avg & ~np.isnan(delta)
+        self.avg_gain[:n][start] = gain[start]
+        self.avg_loss[:n][start] = loss[start]
+
+        valid = ~np.isnan(close)
+        self.closes_seen[:n] += valid
+        self.warm[:n] |= self.closes_seen[:n] >= p
+        self.prev_close[:n] = np.where(valid, close, prev)
+
+        # Klines whose stream has not moved on yet are closed here; a late
+        # final update still lands in update_kline
+        stale = np.flatnonzero(self.kline_open[:n] < minute)
+        self.volumes[stale, :-1] = self.volumes[stale, 1:]
+        self.volumes[stale, -1] = self.live_volume[stale]
+        self.live_volume[stale] = 0.0
+        self.kline_open[stale] = minute
+
+    def seed(self, symbol: str, klines: List[list]):
+        """
+        Warms RSI and volume state from 1m klines; the last kline is taken to
+        be the live minute and is skipped.
+        """
+        closed = klines[:-1]
+        if len(closed) <= self.period:
+            return
+        i = self.slot(symbol)
+        closes = np.array([float(k[4]) for k in closed])
+        delta = np.diff(closes)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        p = self.period
+        avg_gain, avg_loss = gain[:p].mean(), loss[:p].mean()
+        for g, l in zip(gain[p:], loss[p:]):
+            avg_gain = (avg_gain * (p - 1) + g) / p
+            avg_loss = (avg_loss * (p - 1) + l) / p
+        self.avg_gain[i], self.avg_loss[i] = avg_gain, avg_loss
+        self.prev_close[i] = closes[-1]
+        self.closes_seen[i] = len(closes)
+        self.warm[i] = True
+        # Volumes only if the kline stream is not already past these klines
+        live_open = int(klines[-1][0])
+        current = self.kline_open[i]
+        if math.isnan(current) or current <= live_open:
+            self.volumes[i] = [float(k[5]) for k in closed[-VOLUME_LOOKBACK:]]
+            if current != live_open:
+                self.kline_open[i] = live_open
+                self.live_volume[i] = float(klines[-1][5])
+
+    def rsi(self) -> np.ndarray:
+        """Live Wilder RSI, counting the open minute as the newest close."""
+        n = len(self.symbols)
+        delta = self.close[:n] - self.prev_close[:n]
+        p = self.period
+        avg_gain = (self.avg_gain[:n] * (p - 1) + np.where(delta > 0, delta, 0.0)) / p
+        avg_loss = (self.avg_loss[:n] * (p - 1) + np.where(delta < 0, -delta, 0.0)) / p
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rsi = 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+        return np.where(avg_loss == 0, 100.0, rsi)
+
+    def change_pct(self) -> np.ndarray:
+        n = len(self.symbols)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return (self.close[:n] - self.open_24h[:n]) / self.open_24h[:n] * 100
+
+    def volume_decreasing(self) -> np.ndarray:
+        """Live minute volume below the last closed one, which is below the one before."""
+        n = len(self.symbols)
+        live = self.live_volume[:n]
+        v = self.volumes[:n]
+        return (live < v[:, -1]) & (v[:, -1] < v[:, -2])
+
+    def scan(self, min_move_pct: float, overbought: float, oversold: float) -> List[dict]:
+        """
+        Symbols moving more than `min_move_pct` on 24h with fading volume and
+        RSI beyond the thresholds in the direction of the move.
+        """
+        n = len(self.symbols)
+        if n == 0:
+            return []
+        change = self.change_pct()
+        rsi = self.rsi()
+        with np.errstate(invalid="ignore"):
+            moving = np.abs(change) > min_move_pct
+            short = moving & (change > 0) & (rsi > overbought)
+            long = moving & (change < 0) & (rsi < oversold)
+        hits = np.flatnonzero((short | long) & self.warm[:n] & self.volume_decreasing())
+        return [
+            {
+                "symbol": self.symbols[i],
+                "price": float(self.close[i]),
+                "change": float(change[i]),
+                "rsi": float(rsi[i]),
+                "side": "SHORT" if short[i] else "LONG",
+            }
+            for i in hits
+        ]
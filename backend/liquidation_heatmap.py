@@ -0,0 +1,235 @@
+import heapq
+import math
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from aggregator import RollingWindow
+
+# Rolling liquidation totals: label -> (span ms, bucket ms)
+LIQUIDATION_WINDOWS = {
+    "1m": (60_000, 1_000),
+    "5m": (300_000, 5_000),
+    "1h": (3_600_000, 60_000),
+}
+HEATMAP_BUCKET_MS = 60_000   # one heatmap row per minute...
+HEATMAP_BUCKETS = 60         # ...for the last hour
+HEATMAP_BIN_BPS = float(os.getenv("LIQ_HEATMAP_BIN_BPS", "10"))  # price bin width, log-spaced
+HEATMAP_BINS = 400           # 400 x 10 bps covers about ±20% around the newest liquidation
+HEATMAP_VIEW_BINS = 50       # wire view merges neighbouring bins down to at most this many
+
+LONG, SHORT = 0, 1
+
+
+def liquidated_side(order_side: str) -> int:
+    """A forced SELL closes a long, a forced BUY closes a short."""
+    return LONG if order_side == "SELL" else SHORT
+
+
+class LiquidationTotals:
+    """Liquidated notional per side over the trailing LIQUIDATION_WINDOWS."""
+
+    __slots__ = ("windows", "count", "last")
+
+    def __init__(self):
+        self.windows = {label: RollingWindow(span, bucket) for label, (span, bucket) in LIQUIDATION_WINDOWS.items()}
+        self.count = 0
+        self.last = 0
+
+    def add(self, notional: float, side: int, ts: int):
+        # RollingWindow's sell column holds longs, its buy column shorts
+        for window in self.windows.values():
+            window.add(notional, side == LONG, ts)
+        self.count += 1
+        self.last = ts
+
+    def advance(self, ts: int) -> bool:
+        """True if any window evicted a bucket that held liquidations."""
+        aged = False
+        for window in self.windows.values():
+            if window.advance(ts):
+                aged = True
+        return aged
+
+    def total(self, label: str) -> float:
+        window = self.windows[label]
+        return max(window.buy_total, 0.0) + max(window.sell_total, 0.0)
+
+    def to_dict(self) -> Dict:
+        return {
+            label: {"long": max(w.sell_total, 0.0), "short": max(w.buy_total, 0.0)}
+            for label, w in self.windows.items()
+        }
+
+
+class LiquidationHeatmap:
+    """
+    Rolling 2-D histogram of liquidated notional: time buckets x log-spaced
+    price bins x side, in one fixed NumPy array. Rows form a ring that is
+    zeroed as time moves past them; columns cover a window of bins that is
+    re-centred on the newest liquidation when one lands outside it, dropping
+    whatever falls off the far edge. Memory is fixed at construction and an
+    add is O(1) however large the cascade, and the wire view is cropped to the
+    occupied price range and sent as sparse cells.
+    """
+
+    def __init__(self, bucket_ms: int = HEATMAP_BUCKET_MS, buckets: int = HEATMAP_BUCKETS,
+                 bins: int = HEATMAP_BINS, bin_bps: float = HEATMAP_BIN_BPS):
+        self.bucket_ms = bucket_ms
+        self.buckets = buckets
+        self.bins = bins
+        self.bin_bps = bin_bps
+        self.step = math.log1p(bin_bps / 1e4)
+        self.grid = np.zeros((buckets, bins, 2))
+        self.origin: Optional[int] = None  # absolute log-price bin of column 0
+        self._head: Optional[int] = None   # newest time bucket (ts // bucket_ms)
+        self.recenters = 0
+
+    def __bool__(self) -> bool:
+        return self._head is not None
+
+    def reset(self):
+        self.grid[:] = 0.0
+        self.origin = None
+        self._head = None
+
+    def advance(self, ts: int) -> bool:
+        """Zeroes the rows that fall out of the window ending at `ts`; True if any was occupied."""
+        idx = ts // self.bucket_ms
+        head = self._head
+        if head is None or idx <= head:
+            return False
+        if idx - head >= self.buckets:
+            aged = bool(self.grid.any())
+            self.grid[:] = 0.0
+        else:
+            rows = [b % self.buckets for b in range(head + 1, idx + 1)]
+            aged = bool(self.grid[rows].any())
+            self.grid[rows] = 0.0
+        self._head = idx
+        return aged
+
+    def add(self, price: float, notional: float, side: int, ts: int):
+        if price <= 0:
+            return
+        idx = ts // self.bucket_ms
+        if self._head is None:
+            self._head = idx
+        else:
+            self.advance(ts)
+            if idx <= self._head - self.buckets:
+                return  # older than the window
+        col = math.floor(math.log(price) / self.step)
+        if self.origin is None:
+            self.origin = col - self.bins // 2
+        elif not self.origin <= col < self.origin + self.bins:
+            self._recenter(col)
+        self.grid[idx % self.buckets, col - self.origin, side] += notional
+
+    def _recenter(self, col: int):
+        origin = col - self.bins // 2
+        shift = origin - self.origin
+        grid = self.grid
+        if abs(shift) >= self.bins:
+            grid[:] = 0.0
+        elif shift > 0:
+            grid[:, :-shift] = grid[:, shift:]
+            grid[:, -shift:] = 0.0
+        else:
+            grid[:, -shift:] = grid[:, :shift].copy()
+            grid[:, :-shift] = 0.0
+        self.origin = origin
+        self.recenters += 1
+
+    def price(self, col: float) -> float:
+        """Lower edge of (absolute, possibly fractional) log-price bin `col`."""
+        return math.exp(col * self.step)
+
+    def to_dict(self, max_bins: int = HEATMAP_VIEW_BINS) -> Dict:
+        """
+        Wire view: `rows` are minutes from `start` (oldest first), `bins`
+        index `prices` (lower bin edges, ascending), and `long`/`short` hold
+        the rounded USD notional of each occupied cell.
+        """
+        view = {"start": 0, "bucketMs": self.bucket_ms, "prices": [], "rows": [], "bins": [], "long": [], "short": []}
+        if self._head is None:
+            return view
+        # Oldest row first
+        grid = np.roll(self.grid, -((self._head + 1) % self.buckets), axis=0)
+        occupied = np.flatnonzero(grid.sum(axis=(0, 2)))
+        if not occupied.size:
+            return view
+        lo, hi = int(occupied[0]), int(occupied[-1]) + 1
+        merge = -(-(hi - lo) // max_bins)
+        width = -(-(hi - lo) // merge)
+        cropped = np.zeros((self.buckets, width * merge, 2))
+        cropped[:, :hi - lo] = grid[:, lo:hi]
+        cells = cropped.reshape(self.buckets, width, merge, 2).sum(axis=2)
+        rows, bins = np.nonzero(cells.sum(axis=2))
+        base = self.origin + lo
+        view.update(
+            start=(self._head - self.buckets + 1) * self.bucket_ms,
+            prices=[self.price(base + i * merge) for i in range(width + 1)],
+            rows=rows.tolist(),
+            bins=bins.tolist(),
+            long=np.rint(cells[rows, bins, LONG]).astype(np.int64).tolist(),
+            short=np.rint(cells[rows, bins, SHORT]).astype(np.int64).tolist(),
+        )
+        return view
+
+
+class LiquidationMap:
+    """One symbol's liquidation aggregates: rolling side totals plus the heatmap."""
+
+    def __init__(self):
+        self.totals = LiquidationTotals()
+        self.heatmap = LiquidationHeatmap()
+
+    def add(self, order_side: str, price: float, quantity: float, ts: int):
+        side = liquidated_side(order_side)
+        notional = price * quantity
+        self.totals.add(notional, side, ts)
+        self.heatmap.add(price, notional, side, ts)
+
+    def advance(self, ts: int) -> bool:
+        """Ages both on a clock tick; True if a bucket or row that held liquidations aged out."""
+        if not self.totals.count:
+            return False
+        totals_aged = self.totals.advance(ts)
+        heatmap_aged = self.heatmap.advance(ts)
+        return totals_aged or heatmap_aged
+
+    def reset(self):
+        self.totals = LiquidationTotals()
+        self.heatmap.reset()
+
+    def to_dict(self) -> Dict:
+        return {"totals": self.totals.to_dict(), "count": self.totals.count, "heatmap": self.heatmap.to_dict()}
+
+
+class MarketLiquidations:
+    """
+    Rolling liquidation totals for every symbol seen, watched or not; fed
+    from the all-market `!forceOrder@arr` stream when it is enabled. Only
+    the cheap totals are kept per symbol, heatmaps stay with watched states.
+    """
+
+    def __init__(self):
+        self.symbols: Dict[str, LiquidationTotals] = {}
+
+    def add(self, symbol: str, order_side: str, price: float, quantity: float, ts: int):
+        totals = self.symbols.get(symbol)
+        if totals is None:
+            totals = self.symbols[symbol] = LiquidationTotals()
+        totals.add(price * quantity, liquidated_side(order_side), ts)
+
+    def top(self, window: str, limit: int, now: int) -> List[Dict]:
+        """Symbols with the most liquidated notional over `window`, largest first."""
+        for totals in self.symbols.values():
+            totals.advance(now)
+        ranked = heapq.nlargest(limit, self.symbols.items(), key=lambda item: item[1].total(window))
+        return [
+            {"symbol": symbol, **totals.to_dict()[window], "total": totals.total(window), "last": totals.last}
+            for symbol, totals in ranked if totals.total(window) > 0
+        ]
@@ -1,19 +1,38 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import List
+from typing import Optional
 import asyncio
 import json
 import logging
-import time
 import os
-from market_state import MarketState
+import time
+from market_state import MarketState, CHANNELS
 from binance_client import BinanceClient
+from symbol_registry import SymbolRegistry
+from recorder import TickRecorder
+from http_client import HttpClient, HttpError
+from async_cache import AsyncCache
+from rest_scheduler import RestScheduler
 from scanner import SignalScanner
+from universe import SymbolUniverse, FIELDS, SORTS
+from broadcaster import ConnectionManager
+from wire_format import WireFormat
+from liquidation_heatmap import LIQUIDATION_WINDOWS
+from state_bus import StatePublisher, StateSubscriber, BusUnavailable
+from series_store import SeriesStore, METRICS as SERIES_METRICS
+from metrics import REGISTRY, CONTENT_TYPE, merge, render, sample_loop_lag, with_labels
 
 # Configuration
 INITIAL_SYMBOL = "BTCUSDT"
 LUNARCRUSH_API_KEY = os.getenv("LUNARCRUSH_API_KEY", "lklp3a1wipds9h7t9yu7tibe2rmlohmn6tnjfm9ro")
 LUNARCRUSH_SSE_URL = f"https://lunarcrush.ai/sse?key={LUNARCRUSH_API_KEY}"
+RECORD_TICKS_DIR = os.getenv("RECORD_TICKS_DIR")  # set to capture raw ticks to disk
+SERIES_DB = os.getenv("SERIES_DB", "market_series.db")  # OI / ratio / funding / basis history
+# "all": one process does everything. Split deployment: one "ingest" process
+# (exchange feeds, scanner, pollers; publishes on the state bus) plus any
+# number of stateless "api" workers (uvicorn --workers N) serving /ws and REST.
+SERVICE_MODE = os.getenv("SERVICE_MODE", "all")
+UNIVERSE_PUBLISH_SECONDS = 1.0
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("Main")
@@ -26,6 +45,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
 
 @app.get("/")
@@ -38,167 +58,283 @@ async def root():
         "endpoints": ["/ws", "/symbols", "/signals", "/news"]
     }
 
-# Global State
-market_state = MarketState(symbol=INITIAL_SYMBOL)
-binance_client = BinanceClient(symbol=INITIAL_SYMBOL, state=market_state)
-scanner = SignalScanner(state=market_state)
-
-# News cache
-_news_cache = {"data": [], "ts": 0}
-NEWS_CACHE_TTL = 300  # 5 minutes
-
-# Connection Manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+universe = SymbolUniverse()  # /symbols, kept live from the scanner's all-ticker stream
 
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
+if SERVICE_MODE == "api":
+    # Stateless worker: symbols, channel patches and queries all come over the state bus
+    manager = ConnectionManager()
+    registry = bus = StateSubscriber(manager, universe)
+else:
+    # Global State: one MarketState per watched symbol, all on one Binance connection
+    http_client = HttpClient()  # one keep-alive pool for Binance, news and social pollers
+    binance_rest = RestScheduler(http_client)  # one Binance weight budget for the client and the scanner
+    series = SeriesStore(SERIES_DB, binance_rest)  # persistent, downsampled history behind /series
+    binance_client = BinanceClient(rest=binance_rest, recorder=TickRecorder(RECORD_TICKS_DIR) if RECORD_TICKS_DIR else None,
+                                   series=series)
+    # In ingest mode the broadcaster also publishes to the API workers
+    manager = StatePublisher() if SERVICE_MODE == "ingest" else ConnectionManager()
+    registry = SymbolRegistry(binance_client, on_added=lambda state: on_symbol_added(state),
+                              on_change=manager.notifier.notify)
+    scanner = SignalScanner(state=registry, rest=binance_rest, universe=universe)
 
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
+    # News/social caches, one per source: per-coin keys, single-flight loads,
+    # stale values served while a refresh runs
+    caches = {
+        "fear_greed": AsyncCache("fear_greed", ttl=300, stale_ttl=3600, max_entries=1),
+        "trending": AsyncCache("trending", ttl=300, stale_ttl=3600, max_entries=1),
+        "global_news": AsyncCache("global_news", ttl=300, stale_ttl=3600, max_entries=1),
+        "asset_news": AsyncCache("asset_news", ttl=300, stale_ttl=3600),
+        "lunarcrush": AsyncCache("lunarcrush", ttl=300, stale_ttl=3600),
+    }
+    # Cold-start /symbols seed: concurrent first requests share one ticker fetch.
+    # Short-lived, since a failed fetch comes back as an empty list
+    symbols_seed = AsyncCache("symbols", ttl=5, max_entries=1)
 
-    async def broadcast(self, message: dict):
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"Error brodcasting: {e}")
-                self.disconnect(connection)
+# /metrics gauges and counters the components already keep, read at scrape time
+REGISTRY.collector("cryptoterminal_ws_connections", "gauge", "Open /ws dashboard connections",
+                   lambda: len(manager.clients))
+REGISTRY.collector("cryptoterminal_ws_send_queue_frames", "gauge", "Frames waiting in /ws client send queues",
+                   lambda: sum(c.queue.qsize() for c in manager.clients.values()))
+if SERVICE_MODE == "api":
+    REGISTRY.collector("cryptoterminal_bus_connected", "gauge", "1 while connected to the ingest process",
+                       lambda: int(bus.connected))
+    REGISTRY.collector("cryptoterminal_bus_messages_total", "counter", "Channel messages received over the state bus",
+                       lambda: bus.messages)
+    REGISTRY.collector("cryptoterminal_bus_gaps_total", "counter", "Seq gaps that forced a channel resync",
+                       lambda: bus.gaps)
+else:
+    REGISTRY.collector("cryptoterminal_symbols", "gauge", "Symbols streaming from the exchange",
+                       lambda: len(registry.states))
+    REGISTRY.collector("cryptoterminal_ingest_frames_total", "counter", "Exchange stream frames applied",
+                       lambda: binance_client.frames)
+    REGISTRY.collector("cryptoterminal_ingest_batches_total", "counter", "Batches the frames were applied in",
+                       lambda: binance_client.batches)
+    REGISTRY.collector("cryptoterminal_scanner_queue_depth", "gauge", "Scanner candidates waiting for a worker",
+                       lambda: len(scanner.candidates))
+    REGISTRY.collector("cryptoterminal_scanner_signals_total", "counter", "Signals the scanner emitted",
+                       lambda: scanner.signals_emitted)
+    REGISTRY.collector("cryptoterminal_http_requests_total", "counter", "Outbound REST attempts per host",
+                       lambda: {host: s.requests for host, s in http_client.hosts.items()}, ("host",))
+    REGISTRY.collector("cryptoterminal_http_errors_total", "counter", "Failed outbound REST attempts per host",
+                       lambda: {host: s.errors for host, s in http_client.hosts.items()}, ("host",))
+    REGISTRY.collector("cryptoterminal_binance_weight_used", "gauge", "Binance request weight used this minute",
+                       lambda: {name: b.used for name, b in binance_rest.budgets.items()}, ("budget",))
+    REGISTRY.collector("cryptoterminal_cache_lookups_total", "counter", "News/social cache lookups by outcome",
+                       lambda: {(name, outcome): getattr(cache, outcome) for name, cache in caches.items()
+                                for outcome in ("hits", "stale_hits", "misses")}, ("cache", "outcome"))
+if SERVICE_MODE == "ingest":
+    REGISTRY.collector("cryptoterminal_bus_workers", "gauge", "API workers connected to the state bus",
+                       lambda: len(manager.workers))
+    REGISTRY.collector("cryptoterminal_bus_queue_frames", "gauge", "Frames waiting in API worker queues",
+                       lambda: sum(w.queue.qsize() for w in manager.workers))
+    REGISTRY.collector("cryptoterminal_bus_frames_sent_total", "counter", "Frames sent to API workers",
+                       lambda: manager.stats()["workers"]["sent"])
 
-manager = ConnectionManager()
 
 @app.on_event("startup")
 async def startup_event():
+    asyncio.create_task(sample_loop_lag())
+    if SERVICE_MODE == "api":
+        asyncio.create_task(bus.run())
+        return
+    await scanner.store.open()
+    await series.open()
     await binance_client.start()
-    asyncio.create_task(broadcast_state())
+    # Load initial scanner signals
+    registry.load_scanner_signals(await scanner.get_recent_signals(limit=30))
+    # The default symbol is held by the server itself so it is always warm
+    await registry.acquire(INITIAL_SYMBOL)
+
+    asyncio.create_task(manager.run(registry))  # event-driven /ws broadcast
     asyncio.create_task(lunarcrush_poll_task())
     asyncio.create_task(lunarcrush_sse_listener())
     asyncio.create_task(global_news_poll_task())
     asyncio.create_task(asset_news_poll_task())
+    if SERVICE_MODE == "ingest":
+        await manager.serve(registry, QUERIES)
+        asyncio.create_task(universe_publish_task())
     
-    # Load initial scanner signals
-    market_state.scanner_signals = scanner.get_recent_signals(limit=30)
     await scanner.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    if SERVICE_MODE == "api":
+        return
+    if SERVICE_MODE == "ingest":
+        await manager.close()
     await binance_client.stop()
     await scanner.stop()
+    await series.close()
+    await http_client.close()
 
 @app.get("/symbols")
-async def get_symbols():
-    return await binance_client.get_available_symbols()
+async def get_symbols(request: Request, sort: str = "volume", offset: int = 0,
+                      limit: Optional[int] = None, fields: Optional[str] = None):
+    """USDT perps from memory; `sort` is volume|gainers|losers, `fields` a comma list."""
+    if not universe and SERVICE_MODE != "api":
+        # Before the first all-ticker frame, seed once from REST
+        universe.seed(await symbols_seed.get("all", binance_client.get_available_symbols))
+    if sort not in SORTS:
+        sort = "volume"
+    selected = tuple(f for f in fields.split(",") if f in FIELDS) if fields else None
+    etag = universe.etag
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    body, total = universe.page(sort, max(offset, 0), None if limit is None else max(limit, 0), selected or None)
+    return Response(body, media_type="application/json",
+                    headers={"ETag": etag, "X-Total-Count": str(total), "Cache-Control": "no-cache"})
+
+async def universe_publish_task():
+    """Ingest mode: pushes the symbol universe to the API workers whenever it changed."""
+    version = None
+    while True:
+        await asyncio.sleep(UNIVERSE_PUBLISH_SECONDS)
+        if universe.version != version:
+            version = universe.version
+            manager.publish_doc("universe", {"version": version, "rows": list(universe.rows.values())})
+
+async def query(name: str, **args):
+    """Runs a query here, or on the ingestion process when this is an API worker."""
+    if SERVICE_MODE != "api":
+        return await QUERIES[name](**args)
+    try:
+        return await bus.query(name, **args)
+    except BusUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
 @app.get("/signals")
-async def get_signals():
-    return scanner.get_recent_signals()
+async def get_signals(symbol: Optional[str] = None, limit: int = 20):
+    return await query("signals", symbol=symbol.upper() if symbol else None, limit=min(limit, 500))
+
+async def recent_signals(symbol: Optional[str], limit: int):
+    return await scanner.get_recent_signals(limit=limit, symbol=symbol)
+
+@app.get("/liquidations")
+async def get_liquidations(window: str = "5m", limit: int = 20):
+    """Symbols with the most liquidated notional over `window` (1m|5m|1h), largest first."""
+    if window not in LIQUIDATION_WINDOWS:
+        window = "5m"
+    return await query("liquidations", window=window, limit=min(max(limit, 1), 200))
+
+async def top_liquidations(window: str, limit: int):
+    return {
+        "window": window,
+        "allMarket": binance_client.all_market_liquidations,
+        "symbols": binance_client.liquidations.top(window, limit, int(time.time() * 1000)),
+    }
+
+@app.get("/series/{symbol}")
+async def get_series(symbol: str, metrics: Optional[str] = None, start: Optional[int] = None,
+                     end: Optional[int] = None, resolution: Optional[str] = None):
+    """
+    Stored history of oi, global_long, top_accounts_long, top_positions_long,
+    funding and basis (`metrics`, a comma list; all by default) between
+    `start` and `end` in epoch ms (the last 7 days by default), at
+    `resolution` 1m|5m|1h|1d or the finest that fits.
+    """
+    symbol = symbol.upper()
+    if universe and symbol not in universe.rows:
+        raise HTTPException(status_code=404, detail=f"Unknown symbol {symbol}")
+    selected = [m for m in metrics.split(",") if m in SERIES_METRICS] if metrics else list(SERIES_METRICS)
+    return await query("series", symbol=symbol, metrics=selected, start=start, end=end,
+                       resolution=resolution)
+
+async def series_history(symbol: str, metrics: list, start: Optional[int], end: Optional[int],
+                         resolution: Optional[str]):
+    return await series.query(symbol, metrics, start, end, resolution)
 
 @app.get("/news")
 async def get_news():
     """Fetch Fear & Greed Index + CoinGecko trending coins (free, no key needed)."""
-    global _news_cache
-    now = time.time()
-    if now - _news_cache["ts"] < NEWS_CACHE_TTL and _news_cache["data"]:
-        return _news_cache["data"]
+    return await query("news")
 
-    result = {"fearGreed": None, "trending": []}
-    try:
-        async with aiohttp.ClientSession() as session:
-            # Fear & Greed Index
-            try:
-                async with session.get(
-                    "https://api.alternative.me/fng/?limit=7",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        raw = await resp.json()
-                        fng_data = raw.get("data", [])
-                        if fng_data:
-                            current = fng_data[0]
-                            result["fearGreed"] = {
-                                "value": int(current["value"]),
-                                "label": current["value_classification"],
-                                "history": [
-                                    {"value": int(d["value"]), "label": d["value_classification"],
-                                     "timestamp": int(d["timestamp"])}
-                                    for d in fng_data
-                                ]
-                            }
-            except Exception as e:
-                logger.error(f"Fear & Greed error: {e}")
+async def market_news():
+    fear_greed, trending = await asyncio.gather(
+        caches["fear_greed"].get("fng", load_fear_greed),
+        caches["trending"].get("trending", load_trending),
+        return_exceptions=True,
+    )
+    return {
+        "fearGreed": None if isinstance(fear_greed, Exception) else fear_greed,
+        "trending": [] if isinstance(trending, Exception) else trending,
+    }
 
-            # CoinGecko Trending
-            try:
-                async with session.get(
-                    "https://api.coingecko.com/api/v3/search/trending",
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as resp:
-                    if resp.status == 200:
-                        raw = await resp.json()
-                        for coin in (raw.get("coins", []))[:10]:
-                            item = coin.get("item", {})
-                            price_data = item.get("data", {})
-                            pct_24h = price_data.get("price_change_percentage_24h", {})
-                            change_usd = pct_24h.get("usd", 0) if isinstance(pct_24h, dict) else 0
-                            result["trending"].append({
-                                "name": item.get("name", ""),
-                                "symbol": item.get("symbol", ""),
-                                "rank": item.get("market_cap_rank"),
-                                "price": price_data.get("price", 0),
-                                "change24h": round(change_usd, 2),
-                                "thumb": item.get("thumb", ""),
-                            })
-            except Exception as e:
-                logger.error(f"CoinGecko trending error: {e}")
+async def load_fear_greed():
+    raw = await http_client.get_json("https://api.alternative.me/fng/?limit=7")
+    fng_data = raw.get("data", [])
+    if not fng_data:
+        return None
+    current = fng_data[0]
+    return {
+        "value": int(current["value"]),
+        "label": current["value_classification"],
+        "history": [
+            {"value": int(d["value"]), "label": d["value_classification"],
+             "timestamp": int(d["timestamp"])}
+            for d in fng_data
+        ]
+    }
 
-        _news_cache = {"data": result, "ts": now}
-        return result
-    except Exception as e:
-        logger.error(f"Error fetching news: {e}")
-        return result
+async def load_trending():
+    raw = await http_client.get_json("https://api.coingecko.com/api/v3/search/trending")
+    trending = []
+    for coin in (raw.get("coins", []))[:10]:
+        item = coin.get("item", {})
+        price_data = item.get("data", {})
+        pct_24h = price_data.get("price_change_percentage_24h", {})
+        change_usd = pct_24h.get("usd", 0) if isinstance(pct_24h, dict) else 0
+        trending.append({
+            "name": item.get("name", ""),
+            "symbol": item.get("symbol", ""),
+            "rank": item.get("market_cap_rank"),
+            "price": price_data.get("price", 0),
+            "change24h": round(change_usd, 2),
+            "thumb": item.get("thumb", ""),
+        })
+    return trending
 
-async def broadcast_state():
-    while True:
-        await asyncio.sleep(0.25)
-        if manager.active_connections:
-            data = market_state.to_dict()
-            await manager.broadcast(data)
+def on_symbol_added(state: MarketState):
+    """Immediate social/news refresh for a newly watched symbol."""
+    asyncio.create_task(fetch_lunarcrush(state))
+    asyncio.create_task(fetch_asset_news(state))
 
 async def lunarcrush_poll_task():
-    """Periodically fetch Galaxy Score and AltRank for the current symbol."""
+    """Periodically fetch Galaxy Score and AltRank for every active symbol."""
     while True:
-        try:
-            # Strip USDT to get base symbol
-            coin = market_state.symbol.replace("USDT", "")
-            url = f"https://lunarcrush.com/api4/public/coins/{coin}/v1"
-            headers = {"Authorization": f"Bearer {LUNARCRUSH_API_KEY}"}
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=10) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        coin_data = data.get("data", {})
-                        market_state.galaxy_score = coin_data.get("galaxy_score", 0)
-                        market_state.alt_rank = coin_data.get("alt_rank", 0)
-                        market_state.social_sentiment = coin_data.get("sentiment", 50)
-                        
-                        s = market_state.social_sentiment
-                        if s > 75: market_state.social_sentiment_label = "Extremely Bullish"
-                        elif s > 60: market_state.social_sentiment_label = "Bullish"
-                        elif s < 25: market_state.social_sentiment_label = "Extremely Bearish"
-                        elif s < 40: market_state.social_sentiment_label = "Bearish"
-                        else: market_state.social_sentiment_label = "Neutral"
-                        
-                        logger.info(f"Updated LunarCrush data for {coin}: GS={market_state.galaxy_score}")
-                    else:
-                        logger.warning(f"LunarCrush REST error: {resp.status}")
-        except Exception as e:
-            logger.error(f"Error in lunarcrush_poll: {e}")
-            
         await asyncio.sleep(600)
+        for state in registry:
+            await fetch_lunarcrush(state, refresh=True)
+
+async def fetch_lunarcrush(state: MarketState, refresh: bool = False):
+    """Cached per coin, so switching back to a symbol does not refetch."""
+    try:
+        # Strip USDT to get base symbol
+        coin = state.symbol.replace("USDT", "")
+        url = f"https://lunarcrush.com/api4/public/coins/{coin}/v1"
+        headers = {"Authorization": f"Bearer {LUNARCRUSH_API_KEY}"}
+
+        async def load():
+            data = await http_client.get_json(url, headers=headers)
+            return data.get("data", {})
+
+        cache = caches["lunarcrush"]
+        coin_data = await (cache.refresh if refresh else cache.get)(coin, load)
+        state.galaxy_score = coin_data.get("galaxy_score", 0)
+        state.alt_rank = coin_data.get("alt_rank", 0)
+        state.social_sentiment = coin_data.get("sentiment", 50)
+        
+        s = state.social_sentiment
+        if s > 75: state.social_sentiment_label = "Extremely Bullish"
+        elif s > 60: state.social_sentiment_label = "Bullish"
+        elif s < 25: state.social_sentiment_label = "Extremely Bearish"
+        elif s < 40: state.social_sentiment_label = "Bearish"
+        else: state.social_sentiment_label = "Neutral"
+        
+        logger.info(f"Updated LunarCrush data for {coin}: GS={state.galaxy_score}")
+    except HttpError as e:
+        logger.warning(f"LunarCrush REST error: {e.status}")
+    except Exception as e:
+        logger.error(f"Error in lunarcrush_poll: {e}")
 
 async def global_news_poll_task():
     """Periodic task for global news."""
@@ -206,47 +342,48 @@ async def global_news_poll_task():
         await fetch_global_news()
         await asyncio.sleep(900)
 
+def _headlines(data: dict, limit: int) -> list:
+    return [
+        {"title": n.get("title"), "url": n.get("url"), "source": n.get("source")}
+        for n in data.get("Data", [])[:limit]
+    ]
+
 async def fetch_global_news():
     try:
         url = "https://min-api.cryptocompare.com/data/v2/news/?lang=EN"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    raw_news = data.get("Data", [])
-                    market_state.global_news = [
-                        {"title": n.get("title"), "url": n.get("url"), "source": n.get("source")}
-                        for n in raw_news[:15]
-                    ]
-                    logger.info(f"Updated Global News: {len(market_state.global_news)} items")
+
+        async def load():
+            return _headlines(await http_client.get_json(url), 15)
+
+        registry.set_global_news(await caches["global_news"].refresh("global", load))
+        logger.info(f"Updated Global News: {len(registry.global_news)} items")
     except Exception as e:
         logger.error(f"Error fetching global news: {e}")
 
 async def asset_news_poll_task():
-    """Periodic task for asset news."""
+    """Periodic task for asset news of every active symbol."""
     while True:
-        await fetch_asset_news()
         await asyncio.sleep(600)
+        for state in registry:
+            await fetch_asset_news(state, refresh=True)
 
-async def fetch_asset_news():
+async def fetch_asset_news(state: MarketState, refresh: bool = False):
+    """Cached per coin, so switching back to a symbol does not refetch."""
     try:
-        coin = market_state.symbol.replace("USDT", "")
+        coin = state.symbol.replace("USDT", "")
         # CryptoCompare uses comma-separated categories. 
         # Adding 'market' as fallback or just the coin symbol.
         url = f"https://min-api.cryptocompare.com/data/v2/news/?lang=EN&categories={coin}"
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, timeout=10) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    raw_news = data.get("Data", [])
-                    market_state.asset_news = [
-                        {"title": n.get("title"), "url": n.get("url"), "source": n.get("source")}
-                        for n in raw_news[:10]
-                    ]
-                    # If empty, try fetching with just the coin name as a keyword vs category
-                    if not market_state.asset_news:
-                        logger.warning(f"No specific news for {coin}, keeping empty or using global fallback?")
-                    logger.info(f"Updated Asset News for {coin}: {len(market_state.asset_news)} items")
+
+        async def load():
+            return _headlines(await http_client.get_json(url), 10)
+
+        cache = caches["asset_news"]
+        state.asset_news = await (cache.refresh if refresh else cache.get)(coin, load)
+        # If empty, try fetching with just the coin name as a keyword vs category
+        if not state.asset_news:
+            logger.warning(f"No specific news for {coin}, keeping empty or using global fallback?")
+        logger.info(f"Updated Asset News for {coin}: {len(state.asset_news)} items")
     except Exception as e:
         logger.error(f"Error fetching asset news: {e}")
 
@@ -254,55 +391,112 @@ async def lunarcrush_sse_listener():
     """Listen to real-time social context from LunarCrush SSE."""
     while True:
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None, sock_read=300)) as session:
-                async with session.get(LUNARCRUSH_SSE_URL) as resp:
-                    if resp.status != 200:
-                        logger.error(f"LunarCrush SSE error: {resp.status}")
-                        await asyncio.sleep(10)
-                        continue
-                        
-                    async for line in resp.content:
-                        if not line: continue
-                        decoded = line.decode('utf-8').strip()
-                        if decoded.startswith("data:"):
-                            raw_data = decoded[5:].strip()
-                            try:
-                                data = json.loads(raw_data)
-                                if isinstance(data, dict):
-                                    msg = data.get("message") or data.get("text")
-                                    if msg:
-                                        coin = market_state.symbol.replace("USDT", "")
-                                        if coin.lower() in msg.lower() or "market" in msg.lower():
-                                            market_state.add_social_message(msg, data.get("sentiment", "neutral"))
-                            except json.JSONDecodeError:
-                                pass
+            async with http_client.stream(LUNARCRUSH_SSE_URL, sock_read=300) as resp:
+                if resp.status != 200:
+                    logger.error(f"LunarCrush SSE error: {resp.status}")
+                    await asyncio.sleep(10)
+                    continue
+                    
+                async for line in resp.content:
+                    if not line: continue
+                    decoded = line.decode('utf-8').strip()
+                    if decoded.startswith("data:"):
+                        raw_data = decoded[5:].strip()
+                        try:
+                            data = json.loads(raw_data)
+                            if isinstance(data, dict):
+                                msg = data.get("message") or data.get("text")
+                                if msg:
+                                    lowered = msg.lower()
+                                    for state in registry:
+                                        coin = state.symbol.replace("USDT", "")
+                                        if coin.lower() in lowered or "market" in lowered:
+                                            state.add_social_message(msg, data.get("sentiment", "neutral"))
+                        except json.JSONDecodeError:
+                            pass
         except Exception as e:
             logger.debug(f"SSE listener error (expected if connection closed): {e}")
             await asyncio.sleep(5)
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    # Each dashboard holds a reference on the symbol it watches
+    symbol = INITIAL_SYMBOL
+    # Wire format is negotiated at connect, e.g. /ws?encoding=msgpack&layout=columnar
+    fmt = WireFormat.negotiate(websocket.query_params.get("encoding"), websocket.query_params.get("layout"))
+    await manager.connect(websocket, symbol, fmt=fmt)
+    acquired = False  # a failed acquire() has already undone itself
     try:
+        await registry.acquire(symbol)
+        acquired = True
         while True:
             data = await websocket.receive_text()
             try:
                 message = json.loads(data)
-                if message.get("action") == "subscribe":
-                    new_symbol = message.get("symbol")
-                    if new_symbol and new_symbol != market_state.symbol:
-                        await binance_client.refresh_symbol(new_symbol)
-                        # Immediate refresh for new symbol
-                        asyncio.create_task(lunarcrush_poll_task())
-                        asyncio.create_task(fetch_asset_news()) # CALL FUNCTION, NOT TASK LOOP
+                if message.get("action") == "resync":
+                    # Client saw a seq gap on a channel (or all); next tick sends fresh snapshots
+                    manager.request_snapshot(websocket, message.get("channel"))
+                elif message.get("action") == "subscribe":
+                    channels = message.get("channels")
+                    if isinstance(channels, list):
+                        manager.set_channels(websocket, [c for c in channels if c in CHANNELS])
+                    new_symbol = (message.get("symbol") or "").upper()
+                    if new_symbol and new_symbol != symbol:
+                        # Instant if the symbol is already streaming for someone else
+                        await registry.acquire(new_symbol)
+                        manager.set_symbol(websocket, new_symbol)
+                        await registry.release(symbol)
+                        symbol = new_symbol
             except json.JSONDecodeError:
                 pass
             except Exception as e:
                 logger.error(f"Error processing message: {e}")
                 
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
+        if acquired:
+            await registry.release(symbol)
 
 @app.get("/health")
-def health_check():
-    return {"status": "ok", "symbol": market_state.symbol}
+async def health_check():
+    if SERVICE_MODE != "api":
+        return await ingest_health()
+    try:
+        ingest = await bus.query("health")
+    except BusUnavailable as e:
+        ingest = {"status": "unavailable", "error": str(e)}
+    return {"status": "ok", "mode": SERVICE_MODE, "bus": bus.stats(), "broadcast": manager.stats(), "ingest": ingest}
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text format; an API worker also includes the ingest process's metrics."""
+    families = REGISTRY.collect()
+    if SERVICE_MODE == "api":
+        try:
+            ingest = await bus.query("metrics")
+        except BusUnavailable:
+            ingest = []
+        families = merge(with_labels(ingest, process="ingest"), with_labels(families, process=f"api-{os.getpid()}"))
+    return Response(render(families), media_type=CONTENT_TYPE)
+
+async def collect_metrics():
+    return REGISTRY.collect()
+
+async def ingest_health():
+    return {"status": "ok", "mode": SERVICE_MODE, "symbols": list(registry.states), "scanner": scanner.stats(),
+            "http": http_client.stats(), "binance": binance_rest.stats(), "ingest": binance_client.stats(),
+            "caches": {name: cache.stats() for name, cache in caches.items()},
+            "series": series.stats(),
+            "broadcast": manager.stats()}
+
+# Queries an API worker forwards to the ingestion process over the state bus
+QUERIES = {
+    "signals": recent_signals,
+    "liquidations": top_liquidations,
+    "news": market_news,
+    "series": series_history,
+    "health": ingest_health,
+    "metrics": collect_metrics,
+}
@@ -1,6 +1,102 @@
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional
+from typing import Callable, Iterable, List, Dict, Optional, Sequence, Set, Tuple
+import os
 import time
+from ring_buffer import RingBuffer, TradeTape
+from aggregator import TradeAggregator
+from order_book import OrderBook
+from liquidation_heatmap import LiquidationMap
+
+# Dataclass field -> wire paths (dotted, as laid out by MarketState.to_dict) it feeds.
+# Assigning one of these fields marks its paths dirty for the next patch.
+FIELD_PATHS = {
+    "symbol": ("symbol",),
+    "mark_price": ("price", "basis", "premiumIndex"),
+    "spot_price": ("basis", "premiumIndex"),
+    "funding_rate": ("fundingRate",),
+    "global_ratio": ("ratios",),
+    "top_accounts_ratio": ("ratios",),
+    "top_positions_ratio": ("ratios",),
+    "open_interest": ("momentum",),
+    "cvd": ("momentum",),
+    "taker_buy_vol_5m": ("momentum",),
+    "taker_sell_vol_5m": ("momentum",),
+    "oi_history": ("history.oi",),
+    "liquidations": ("liquidations",),
+    "galaxy_score": ("social.galaxyScore",),
+    "alt_rank": ("social.altRank",),
+    "social_sentiment": ("social.sentiment",),
+    "social_sentiment_label": ("social.sentimentLabel",),
+    "social_pulse": ("social.pulse",),
+    "global_news": ("news.global",),
+    "asset_news": ("news.asset",),
+    "scanner_signals": ("scannerSignals",),
+    "scanner_status": ("scannerStatus",),
+}
+
+CANDLE_DEPTH = 60  # 1m candles behind history.price / history.cvd
+
+# Wire channels clients subscribe to, each with its own seq and cadence (seconds).
+# Every wire path belongs to exactly one channel.
+CHANNELS = {
+    "ticker": ("symbol", "price", "fundingRate", "basis", "premiumIndex", "momentum",
+               "history.price", "history.cvd", "history.oi"),
+    "tape": ("trades",),
+    "liquidations": ("liquidations",),
+    "heatmap": ("liquidationMap",),
+    "ratios": ("ratios",),
+    "book": ("book",),
+    "social": ("social.galaxyScore", "social.altRank", "social.sentiment",
+               "social.sentimentLabel", "social.pulse"),
+    "news": ("news.global", "news.asset"),
+    "scanner": ("scannerSignals", "scannerStatus"),
+}
+# Coalescing window per channel (seconds): a change to a channel that has been
+# quiet this long is pushed at once, while a busy channel is flushed at most
+# once per window. Override with e.g. WS_INTERVAL_TICKER=0.5.
+CHANNEL_INTERVALS = {
+    channel: float(os.getenv(f"WS_INTERVAL_{channel.upper()}", default))
+    for channel, default in {
+        "tape": 0.1,
+        "liquidations": 0.1,
+        "ticker": 0.25,
+        "book": 0.25,
+        "scanner": 0.5,
+        "ratios": 1.0,
+        "heatmap": 1.0,
+        "social": 1.0,
+        "news": 5.0,
+    }.items()
+}
+# The trade tape, order book and liquidation heatmap are opt-in; everything else
+# is what the dashboard shows
+DEFAULT_CHANNELS = frozenset(CHANNELS) - {"tape", "book", "heatmap"}
+CHANNEL_PATHS = {channel: frozenset(paths) for channel, paths in CHANNELS.items()}
+PATH_CHANNEL = {path: channel for channel, paths in CHANNELS.items() for path in paths}
+FIELD_CHANNELS = {name: tuple({PATH_CHANNEL[path] for path in paths}) for name, paths in FIELD_PATHS.items()}
+
+# Max entries kept per append-only tape path; clients trim to the same length.
+TAPE_LIMITS = {
+    "trades": 100,
+    "liquidations": 50,
+    "social.pulse": 30,
+    "scannerSignals": 30,
+    "history.price": CANDLE_DEPTH,
+    "history.cvd": CANDLE_DEPTH,
+}
+# Tapes whose newest entry is updated in place: clients replace the entry with
+# the same key instead of appending a duplicate.
+TAPE_KEYS = {
+    "history.price": "time",
+    "history.cvd": "time",
+}
+OI_HISTORY_DEPTH = 60
+# Only the newest TAPE_LIMITS["trades"] trades go out in to_dict; the rest stay
+# server-side, so the tape can be deep
+TRADE_TAPE_DEPTH = int(os.getenv("TRADE_TAPE_DEPTH", "5000"))
+
+def _ring(path: str):
+    return lambda: RingBuffer(TAPE_LIMITS[path])
 
 @dataclass
 class MarketMetric:
@@ -34,14 +130,18 @@ class MarketState:
     taker_buy_vol_5m: float = 0.0
     taker_sell_vol_5m: float = 0.0
     
-    # History (for Charts)
-    price_history: List[Dict] = field(default_factory=list) # [{"time": ts, "close": price}, ...]
-    oi_history: List[Dict] = field(default_factory=list)    # [{"time": ts, "oi": value}, ...]
-    cvd_history: List[Dict] = field(default_factory=list)   # [{"time": ts, "cvd": value}, ...]
+    # History (for Charts); price/CVD history is derived from live 1m candles
+    trade_agg: TradeAggregator = field(default_factory=lambda: TradeAggregator(CANDLE_DEPTH))
+    oi_history: RingBuffer = field(default_factory=lambda: RingBuffer(OI_HISTORY_DEPTH))  # [{"time": ts, "oi": value}, ...]
 
     # Pain
-    liquidations: List[LiquidationEvent] = field(default_factory=list)
-    recent_trades: List[Dict] = field(default_factory=list)
+    liquidations: RingBuffer = field(default_factory=_ring("liquidations"))  # of LiquidationEvent
+    recent_trades: TradeTape = field(default_factory=lambda: TradeTape(TRADE_TAPE_DEPTH))
+
+    # Liquidity: local L2 book from the depth diff stream
+    order_book: OrderBook = field(default_factory=OrderBook, repr=False, compare=False)
+    # Liquidations binned by price and minute, with 1m/5m/1h side totals
+    liquidation_map: LiquidationMap = field(default_factory=LiquidationMap, repr=False, compare=False)
     
     # Stress
     funding_rate: float = 0.0
@@ -51,14 +151,64 @@ class MarketState:
     alt_rank: int = 0
     social_sentiment: float = 0.0  # 0 to 100
     social_sentiment_label: str = "Neutral"
-    social_pulse: List[Dict] = field(default_factory=list) # Recent SSE messages
+    social_pulse: RingBuffer = field(default_factory=_ring("social.pulse")) # Recent SSE messages
     
     # News
     global_news: List[Dict] = field(default_factory=list)
     asset_news: List[Dict] = field(default_factory=list)
-    scanner_signals: List[Dict] = field(default_factory=list) # Signals from scanner.py
+    scanner_signals: RingBuffer = field(default_factory=_ring("scannerSignals")) # Signals from scanner.py
     scanner_status: str = "Initializing..."
 
+    # Change notification: `on_change` is called when a channel goes from clean
+    # to pending (not on every mutation), except for channels in `unwatched`.
+    # `event_time` is the exchange time (ms) of the event being applied, if any;
+    # it is untracked, so hot paths set it with object.__setattr__.
+    on_change: Optional[Callable[[], None]] = field(default=None, init=False, repr=False, compare=False)
+    unwatched: frozenset = field(default=frozenset(), init=False, repr=False, compare=False)
+    event_time: int = field(default=0, init=False, repr=False, compare=False)
+
+    # Delta protocol bookkeeping (see collect_patch), one seq per channel
+    seqs: Dict[str, int] = field(default_factory=lambda: dict.fromkeys(CHANNELS, 0), init=False, repr=False)
+    _pending: Dict[str, int] = field(default_factory=dict, init=False, repr=False)  # channel -> oldest event time
+    _dirty: Set[str] = field(default_factory=set, init=False, repr=False)
+    _appended: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        paths = FIELD_PATHS.get(name)
+        if paths is not None:
+            dirty = self.__dict__.get("_dirty")
+            if dirty is not None:
+                dirty.update(paths)
+                self._touch(FIELD_CHANNELS[name])
+
+    def mark_dirty(self, *paths: str):
+        """Flag wire paths changed by in-place mutation (e.g. ratio objects)."""
+        self._dirty.update(paths)
+        self._touch({PATH_CHANNEL[path] for path in paths})
+
+    def _mark_append(self, path: str, count: int = 1):
+        self._appended[path] = self._appended.get(path, 0) + count
+        self._touch((PATH_CHANNEL[path],))
+
+    def _touch(self, channels: Iterable[str]):
+        pending = self._pending
+        for channel in channels:
+            if pending.get(channel):
+                continue
+            wake = channel not in pending and channel not in self.unwatched
+            # Untimed changes (REST, local) record 0 until an exchange event fills it in
+            pending[channel] = self.event_time
+            if wake and self.on_change is not None:
+                self.on_change()
+
+    def has_changes(self, channel: str) -> bool:
+        return channel in self._pending
+
+    def pending_since(self, channel: str) -> int:
+        """Exchange time (ms) of the oldest unflushed change on `channel`, 0 if unknown."""
+        return self._pending.get(channel, 0)
+
     @property
     def basis(self) -> float:
         return self.mark_price - self.spot_price if self.spot_price > 0 else 0.0
@@ -68,8 +218,37 @@ class MarketState:
         # Simplified premium index: (Mark - Spot) / Spot
         return (self.mark_price - self.spot_price) / self.spot_price if self.spot_price > 0 else 0.0
         
-    def update_price(self, price: float):
+    @property
+    def price_history(self) -> List[Dict]:
+        return _price_history_view(self.trade_agg.candles.tail(CANDLE_DEPTH))
+
+    @property
+    def cvd_history(self) -> List[Dict]:
+        return _cvd_history_view(self.trade_agg.candles.tail(CANDLE_DEPTH))
+
+    def update_price(self, price: float, timestamp: int = 0):
+        object.__setattr__(self, "event_time", timestamp)
         self.mark_price = price
+        object.__setattr__(self, "event_time", 0)
+
+    def roll_windows(self, ts: int):
+        """Ages the rolling taker windows on a clock tick, even when no trades arrive."""
+        object.__setattr__(self, "event_time", ts)
+        self.trade_agg.advance(ts)
+        self._sync_taker_volume()
+        if self.liquidation_map.advance(ts):
+            self.mark_dirty("liquidationMap")
+        object.__setattr__(self, "event_time", 0)
+
+    def _sync_taker_volume(self):
+        window = self.trade_agg.windows["5m"]
+        self.taker_buy_vol_5m = max(window.buy_total, 0.0)
+        self.taker_sell_vol_5m = max(window.sell_total, 0.0)
+
+    def seed_candles(self, klines: List[list]):
+        """Warms price/CVD history from REST klines before live trades take over."""
+        self.cvd = self.trade_agg.candles.seed(klines)
+        self.mark_dirty("history.price", "history.cvd")
         
     def add_social_message(self, message: str, sentiment: str = "neutral"):
         self.social_pulse.append({
@@ -77,40 +256,159 @@ class MarketState:
             "sentiment": sentiment,
             "timestamp": int(time.time() * 1000)
         })
-        if len(self.social_pulse) > 30:
-            self.social_pulse.pop(0)
+        self._mark_append("social.pulse")
 
-    def add_trade(self, price: float, quantity: float, is_buyer_maker: bool):
+    def add_trade(self, price: float, quantity: float, is_buyer_maker: bool, timestamp: Optional[int] = None):
         # is_buyer_maker = True -> Seller was Taker (Sell Volume)
         # is_buyer_maker = False -> Buyer was Taker (Buy Volume)
         
         volume = price * quantity
         if is_buyer_maker:
-            self.taker_sell_vol_5m += volume
             self.cvd -= volume
         else:
-            self.taker_buy_vol_5m += volume
             self.cvd += volume
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        object.__setattr__(self, "event_time", timestamp)
+
+        opened = self.trade_agg.add_trade(price, volume, is_buyer_maker, timestamp, self.cvd)
+        self._sync_taker_volume()
+        # Live candle changed (plus the previous one if a new minute opened)
+        for path in ("history.price", "history.cvd"):
+            self._appended[path] = self._appended.get(path, 1) + opened
             
         # Keep trade for tape
-        self.recent_trades.append({
-            "price": price,
-            "quantity": quantity,
-            "side": "SELL" if is_buyer_maker else "BUY",
-            "timestamp": int(time.time() * 1000)
-        })
-        if len(self.recent_trades) > 50:
-            self.recent_trades.pop(0)
+        self.recent_trades.append(price, quantity, is_buyer_maker, timestamp)
+        self._mark_append("trades")
+        object.__setattr__(self, "event_time", 0)
+
+    def add_trades(self, trades: Sequence[Tuple[float, float, bool, int]]):
+        """
+        Applies a batch of (price, quantity, is_buyer_maker, ts) aggTrades in
+        order. CVD, windows, candles and the tape see every trade, but the
+        tracked fields are written and the paths marked once per batch.
+        """
+        if len(trades) <= 1:
+            for trade in trades:
+                self.add_trade(*trade)
+            return
+        # Latency is measured from the oldest event in the batch
+        object.__setattr__(self, "event_time", trades[0][3])
+        cvd, opened = self.trade_agg.add_trades(trades, self.cvd)
+        self.cvd = cvd
+        self._sync_taker_volume()
+        # Live candle changed (plus the previous ones if new minutes opened)
+        for path in ("history.price", "history.cvd"):
+            self._appended[path] = self._appended.get(path, 1) + opened
+
+        # Keep trades for tape
+        tape = self.recent_trades
+        for price, quantity, is_buyer_maker, timestamp in trades:
+            tape.append(price, quantity, is_buyer_maker, timestamp)
+        self._mark_append("trades", len(trades))
+        object.__setattr__(self, "event_time", 0)
 
     def add_liquidation(self, event: LiquidationEvent):
+        object.__setattr__(self, "event_time", event.timestamp)
         self.liquidations.append(event)
-        if len(self.liquidations) > 50:
-            self.liquidations.pop(0)
+        self._mark_append("liquidations")
+        self.liquidation_map.add(event.side, event.price, event.quantity, event.timestamp)
+        self.mark_dirty("liquidationMap")
+        object.__setattr__(self, "event_time", 0)
+
+    def apply_depth(self, event: dict) -> bool:
+        """Applies a depthUpdate diff; False if the book lost sync and needs a new snapshot."""
+        object.__setattr__(self, "event_time", event["E"])
+        ok = self.order_book.apply(event)
+        if self.order_book.synced:
+            self.mark_dirty("book")
+        object.__setattr__(self, "event_time", 0)
+        return ok
+
+    def load_depth_snapshot(self, snapshot: dict) -> bool:
+        ok = self.order_book.load_snapshot(snapshot)
+        self.mark_dirty("book")
+        return ok
 
     def add_scanner_signal(self, signal: Dict):
         self.scanner_signals.append(signal)
-        if len(self.scanner_signals) > 30:
-            self.scanner_signals.pop(0)
+        self._mark_append("scannerSignals")
+
+    def load_scanner_signals(self, signals: Iterable[Dict]):
+        """Replaces the signal tape, e.g. with history loaded from SQLite."""
+        self.scanner_signals.clear()
+        self.scanner_signals.extend(signals)
+        self.mark_dirty("scannerSignals")
+
+    def add_open_interest(self, ts: int, value: float):
+        self.open_interest = value
+        self.oi_history.append({"time": ts, "oi": value})
+        self.mark_dirty("history.oi")
+
+    def clear_tapes(self):
+        """Drops per-symbol trades, candles and liquidations, e.g. on a symbol switch."""
+        self.liquidations.clear()
+        self.liquidation_map.reset()
+        self.recent_trades.clear()
+        self.trade_agg.reset()
+        self._sync_taker_volume()
+        self.mark_dirty("trades", "liquidations", "liquidationMap", "history.price", "history.cvd")
+
+    def _view(self, path: str):
+        """Wire value for a single dotted path of to_dict()."""
+        return PATH_VIEWS[path](self)
+
+    def _tail(self, path: str, count: int) -> list:
+        """Last `count` entries of a tape path, without rendering the whole tape."""
+        return TAIL_VIEWS[path](self, count)
+
+    def snapshot(self, channel: str) -> dict:
+        """Full state of one channel, sent to a client on subscribe or resync."""
+        return {
+            "type": "snapshot",
+            "channel": channel,
+            "seq": self.seqs[channel],
+            "set": {path: self._view(path) for path in CHANNELS[channel]},
+        }
+
+    def collect_patch(self, channel: str) -> Optional[dict]:
+        """
+        Drains pending changes of one channel into a patch message, or None if
+        nothing changed. `set` replaces the value at each dotted path; `append`
+        carries new tape entries the client appends and trims to `max` items.
+        Each patch bumps the channel's `seq` so clients can detect a gap and
+        ask for a resync.
+        """
+        self._pending.pop(channel, None)
+        paths = CHANNEL_PATHS[channel]
+        dirty = self._dirty & paths
+        appended = [path for path in self._appended if path in paths]
+        if not dirty and not appended:
+            return None
+        patch = {"type": "patch", "channel": channel, "seq": self.seqs[channel] + 1}
+        if dirty:
+            patch["set"] = {path: self._view(path) for path in dirty}
+        appends = {}
+        for path in appended:
+            count = self._appended.pop(path)
+            if path in dirty:
+                continue  # already sent in full
+            appends[path] = {"items": self._tail(path, min(count, TAPE_LIMITS[path])), "max": TAPE_LIMITS[path]}
+            if path in TAPE_KEYS:
+                appends[path]["key"] = TAPE_KEYS[path]
+        if appends:
+            patch["append"] = appends
+        self._dirty -= dirty
+        self.seqs[channel] += 1
+        return patch
+
+    def discard_changes(self, channel: str):
+        """Drops pending changes of a channel nobody subscribes to, without rendering them."""
+        self._pending.pop(channel, None)
+        paths = CHANNEL_PATHS[channel]
+        self._dirty -= paths
+        for path in [p for p in self._appended if p in paths]:
+            del self._appended[path]
 
     def to_dict(self):
         return {
@@ -119,37 +417,94 @@ class MarketState:
             "fundingRate": self.funding_rate,
             "basis": self.basis,
             "premiumIndex": self.premium_index,
-            "ratios": {
-                "global": {"long": self.global_ratio.long_ratio, "short": self.global_ratio.short_ratio},
-                "topAccounts": {"long": self.top_accounts_ratio.long_ratio, "short": self.top_accounts_ratio.short_ratio},
-                "topPositions": {"long": self.top_positions_ratio.long_ratio, "short": self.top_positions_ratio.short_ratio}
-            },
-            "momentum": {
-                "cvd": self.cvd,
-                "openInterest": self.open_interest,
-                "takerBuy": self.taker_buy_vol_5m,
-                "takerSell": self.taker_sell_vol_5m
-            },
+            "ratios": _ratios_view(self),
+            "momentum": _momentum_view(self),
             "history": {
                 "price": self.price_history,
-                "oi": self.oi_history,
+                "oi": self.oi_history.to_list(),
                 "cvd": self.cvd_history
             },
-            "liquidations": [
-                {"price": l.price, "side": l.side, "qty": l.quantity, "ts": l.timestamp} 
-                for l in self.liquidations
-            ],
+            "liquidations": _liquidations_view(self.liquidations),
+            "liquidationMap": self.liquidation_map.to_dict(),
             "social": {
                 "galaxyScore": self.galaxy_score,
                 "altRank": self.alt_rank,
                 "sentiment": self.social_sentiment,
                 "sentimentLabel": self.social_sentiment_label,
-                "pulse": self.social_pulse
+                "pulse": self.social_pulse.to_list()
             },
             "news": {
                 "global": self.global_news,
                 "asset": self.asset_news
             },
-            "scannerSignals": self.scanner_signals,
+            "trades": self.recent_trades.tail(TAPE_LIMITS["trades"]),
+            "book": self.order_book.metrics(),
+            "scannerSignals": self.scanner_signals.to_list(),
             "scannerStatus": self.scanner_status
         }
+
+
+def _ratios_view(s: MarketState) -> dict:
+    return {
+        "global": {"long": s.global_ratio.long_ratio, "short": s.global_ratio.short_ratio},
+        "topAccounts": {"long": s.top_accounts_ratio.long_ratio, "short": s.top_accounts_ratio.short_ratio},
+        "topPositions": {"long": s.top_positions_ratio.long_ratio, "short": s.top_positions_ratio.short_ratio}
+    }
+
+def _momentum_view(s: MarketState) -> dict:
+    return {
+        "cvd": s.cvd,
+        "openInterest": s.open_interest,
+        "takerBuy": s.taker_buy_vol_5m,
+        "takerSell": s.taker_sell_vol_5m,
+        "windows": {label: w.to_dict() for label, w in s.trade_agg.windows.items()}
+    }
+
+def _liquidations_view(events: Iterable[LiquidationEvent]) -> List[Dict]:
+    return [
+        {"price": l.price, "side": l.side, "qty": l.quantity, "ts": l.timestamp}
+        for l in events
+    ]
+
+def _price_history_view(candles) -> List[Dict]:
+    return [{"time": c.time, "close": c.close} for c in candles]
+
+def _cvd_history_view(candles) -> List[Dict]:
+    return [{"time": c.time, "cvd": c.cvd} for c in candles]
+
+# Dotted wire path -> renderer, used to build patches without a full to_dict()
+PATH_VIEWS = {
+    "symbol": lambda s: s.symbol,
+    "price": lambda s: s.mark_price,
+    "fundingRate": lambda s: s.funding_rate,
+    "basis": lambda s: s.basis,
+    "premiumIndex": lambda s: s.premium_index,
+    "ratios": _ratios_view,
+    "momentum": _momentum_view,
+    "history.price": lambda s: s.price_history,
+    "history.oi": lambda s: s.oi_history.to_list(),
+    "history.cvd": lambda s: s.cvd_history,
+    "liquidations": lambda s: _liquidations_view(s.liquidations),
+    "liquidationMap": lambda s: s.liquidation_map.to_dict(),
+    "social.galaxyScore": lambda s: s.galaxy_score,
+    "social.altRank": lambda s: s.alt_rank,
+    "social.sentiment": lambda s: s.social_sentiment,
+    "social.sentimentLabel": lambda s: s.social_sentiment_label,
+    "social.pulse": lambda s: s.social_pulse.to_list(),
+    "news.global": lambda s: s.global_news,
+    "news.asset": lambda s: s.asset_news,
+    "trades": lambda s: s.recent_trades.tail(TAPE_LIMITS["trades"]),
+    "book": lambda s: s.order_book.metrics(),
+    "scannerSignals": lambda s: s.scanner_signals.to_list(),
+    "scannerStatus": lambda s: s.scanner_status,
+}
+
+# Tape path -> renderer for its newest `count` entries
+TAIL_VIEWS = {
+    "trades": lambda s, n: s.recent_trades.tail(n),
+    "liquidations": lambda s, n: _liquidations_view(s.liquidations.tail(n)),
+    "social.pulse": lambda s, n: s.social_pulse.tail(n),
+    "scannerSignals": lambda s, n: s.scanner_signals.tail(n),
+    "history.price": lambda s, n: _price_history_view(s.trade_agg.candles.tail(n)),
+    "history.cvd": lambda s, n: _cvd_history_view(s.trade_agg.candles.tail(n)),
+}
@@ -0,0 +1,267 @@
+"""
+Process metrics for /metrics, in the Prometheus text exposition format.
+
+Hot paths hold on to a pre-labelled Counter or Histogram and pay one
+`inc`/`observe` per event: an integer add and, for histograms, one bucket
+increment found from the float's binary exponent (no search, no lock, no
+allocation). Histogram buckets are powers of two from ~15 us to 64 s, so
+every bucket has the same 2x relative resolution across the whole range,
+HDR-style. Everything that already exists as a number somewhere (queue
+depths, connection counts, counters kept by the components themselves) is
+read by a collector callback at scrape time instead and costs nothing in
+between. METRICS_ENABLED=0 turns every inc and observe into a no-op.
+
+`collect()` returns plain lists and dicts, so an API worker can fetch the
+ingest process's metrics over the state bus and render both in one page.
+"""
+import asyncio
+import math
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+LOOP_LAG_INTERVAL = 0.1  # seconds between event-loop lag samples
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKET_MIN_EXP = -16  # first upper bound 2^-16 s (~15 us)
+BUCKET_MAX_EXP = 6    # last finite upper bound 2^6 s = 64 s
+BUCKET_BOUNDS = [2.0 ** e for e in range(BUCKET_MIN_EXP, BUCKET_MAX_EXP + 1)]
+
+# (suffix, labels, value) samples of one metric family
+Sample = Tuple[str, Dict[str, str], float]
+Number = Union[int, float]
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: Number = 1):
+        self.value += amount
+
+    def samples(self, labels: Dict[str, str]) -> List[Sample]:
+        return [("", labels, self.value)]
+
+
+class Histogram:
+    """Counts per power-of-two bucket plus their sum, in seconds; the count is derived at scrape time."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)  # the last one is +Inf
+        self.sum = 0.0
+
+    def observe(self, seconds: float, _frexp=math.frexp, _first=BUCKET_MIN_EXP, _last=len(BUCKET_BOUNDS)):
+        # v in [2^(e-1), 2^e) has upper bound 2^e
+        index = _frexp(seconds)[1] - _first if seconds > 0 else 0
+        if not 0 <= index <= _last:
+            index = 0 if index < 0 else _last
+        self.counts[index] += 1
+        self.sum += seconds
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def samples(self, labels: Dict[str, str]) -> List[Sample]:
+        samples = []
+        cumulative = 0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            cumulative += count
+            samples.append(("_bucket", {**labels, "le": repr(bound)}, cumulative))
+        cumulative += self.counts[-1]
+        samples.append(("_bucket", {**labels, "le": "+Inf"}, cumulative))
+        samples.append(("_sum", labels, self.sum))
+        samples.append(("_count", labels, cumulative))
+        return samples
+
+
+def _skip(*args):
+    pass
+
+
+def _switch(child, enabled: bool):
+    # An instance attribute shadows the method, so hot paths keep their reference
+    for method in ("inc", "observe"):
+        if hasattr(type(child), method):
+            if enabled:
+                child.__dict__.pop(method, None)
+            else:
+                setattr(child, method, _skip)
+
+
+class Family:
+    """One metric name with its children, one per combination of label values."""
+
+    def __init__(self, name: str, kind: str, help: str, labelnames: Tuple[str, ...], factory: Callable):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.labelnames = labelnames
+        self.factory = factory
+        self.children: Dict[Tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str):
+        """The child for these label values, created on first use; hot paths keep the result."""
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = self.factory()
+            _switch(child, REGISTRY.enabled)
+        return child
+
+    def collect(self) -> dict:
+        samples = []
+        for values, child in list(self.children.items()):
+            samples.extend(child.samples(dict(zip(self.labelnames, values))))
+        return {"name": self.name, "type": self.kind, "help": self.help, "samples": samples}
+
+
+class Collector:
+    """
+    A family read at scrape time: `fn` returns a number, or a dict from
+    label value (or tuple of values) to number.
+    """
+
+    def __init__(self, name: str, kind: str, help: str, fn: Callable[[], Any], labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.fn = fn
+        self.labelnames = labelnames
+
+    def collect(self) -> dict:
+        value = self.fn()
+        if isinstance(value, dict):
+            samples = [
+                ("", dict(zip(self.labelnames, key if isinstance(key, tuple) else (key,))), v)
+                for key, v in value.items()
+            ]
+        else:
+            samples = [("", {}, value)]
+        return {"name": self.name, "type": self.kind, "help": self.help, "samples": samples}
+
+
+class Registry:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.families: Dict[str, Union[Family, Collector]] = {}
+        self.enabled = enabled
+
+    def set_enabled(self, enabled: bool):
+        """Turns every counter and histogram into a no-op, or back."""
+        self.enabled = enabled
+        for family in self.families.values():
+            for child in getattr(family, "children", {}).values():
+                _switch(child, enabled)
+
+    def _add(self, family):
+        if family.name in self.families:
+            raise ValueError(f"metric {family.name} already registered")
+        self.families[family.name] = family
+        return family
+
+    def counter(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Family:
+        return self._add(Family(name, "counter", help, labels, Counter))
+
+    def histogram(self, name: str, help: str, labels: Tuple[str, ...] = ()) -> Family:
+        return self._add(Family(name, "histogram", help, labels, Histogram))
+
+    def collector(self, name: str, kind: str, help: str, fn: Callable[[], Any],
+                  labels: Tuple[str, ...] = ()) -> Collector:
+        """Registers (or replaces) a scrape-time family; `kind` is "gauge" or "counter"."""
+        self.families.pop(name, None)
+        return self._add(Collector(name, kind, help, fn, labels))
+
+    def collect(self) -> List[dict]:
+        return [family.collect() for family in self.families.values()]
+
+
+REGISTRY = Registry()
+
+
+def with_labels(families: Iterable[dict], **labels: str) -> List[dict]:
+    """Adds constant labels to every sample, e.g. to tell processes apart."""
+    return [
+        {**family, "samples": [(suffix, {**labels, **sample_labels}, value)
+                               for suffix, sample_labels, value in family["samples"]]}
+        for family in families
+    ]
+
+
+def merge(*groups: Iterable[dict]) -> List[dict]:
+    """Joins the samples of same-named families from several processes."""
+    merged: Dict[str, dict] = {}
+    for families in groups:
+        for family in families:
+            existing = merged.get(family["name"])
+            if existing is None:
+                merged[family["name"]] = {**family, "samples": list(family["samples"])}
+            else:
+                existing["samples"].extend(family["samples"])
+    return list(merged.values())
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: Number) -> str:
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+def render(families: Iterable[dict]) -> str:
+    lines = []
+    for family in families:
+        name = family["name"]
+        lines.append(f"# HELP {name} {family['help']}")
+        lines.append(f"# TYPE {name} {family['type']}")
+        for suffix, labels, value in family["samples"]:
+            if labels:
+                label_text = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+                lines.append(f"{name}{suffix}{{{label_text}}} {_format_value(value)}")
+            else:
+                lines.append(f"{name}{suffix} {_format_value(value)}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+# Process-wide metrics
+
+def resident_memory_bytes() -> int:
+    """RSS from /proc (Linux); elsewhere the peak RSS getrusage reports."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        if resource is None:
+            return 0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # bytes on macOS, KiB elsewhere
+
+
+REGISTRY.collector("process_resident_memory_bytes", "gauge", "Resident memory size in bytes", resident_memory_bytes)
+REGISTRY.collector("process_cpu_seconds_total", "counter", "User and system CPU time spent in seconds",
+                   time.process_time)
+
+LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_event_loop_lag_seconds",
+    "How late the event loop woke a timer, sampled every 100 ms").labels()
+
+
+async def sample_loop_lag(interval: float = LOOP_LAG_INTERVAL, histogram: Optional[Histogram] = None):
+    """Sleeps `interval` over and over and records how late each wake-up was."""
+    histogram = histogram or LOOP_LAG_SECONDS
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        histogram.observe(max(0.0, time.perf_counter() - start - interval))
@@ -0,0 +1,281 @@
+import heapq
+import os
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+# Depth bands around mid, in percent (e.g. notional within ±0.5%)
+BOOK_BANDS = tuple(float(b) / 100 for b in os.getenv("ORDER_BOOK_BANDS", "0.1,0.5,1").split(","))
+REBASE_FRACTION = 0.25  # re-anchor the bands once mid drifts this share of the narrowest band
+PRUNE_BAND = 0.1        # levels further than 10% from mid are dropped on re-anchor
+WALL_BAND = 0.02        # walls are searched within ±2%
+WALL_COUNT = 3
+WALL_MULTIPLE = 5.0     # a wall holds at least 5x the mean level notional in the band
+MAX_BUFFER = 1000       # diffs buffered while waiting for a snapshot (~100 s at 100 ms)
+
+
+class BookSide:
+    """
+    One side of an L2 book. Prices sit in a sorted list searched with bisect,
+    best level first (asks ascending, bids stored negated), and quantities in
+    a dict. Changing a level's size is an O(1) dict write; a level appearing
+    or disappearing adds an O(log n) search plus a memmove insert/delete.
+    """
+
+    __slots__ = ("is_bid", "keys", "qty")
+
+    def __init__(self, is_bid: bool):
+        self.is_bid = is_bid
+        self.keys: List[float] = []
+        self.qty: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def clear(self):
+        self.keys.clear()
+        self.qty.clear()
+
+    def set(self, price: float, qty: float) -> float:
+        """Sets the absolute size at `price` (0 removes it); returns the size change."""
+        old = self.qty.get(price, 0.0)
+        key = -price if self.is_bid else price
+        if qty == 0.0:
+            if old:
+                del self.qty[price]
+                del self.keys[bisect_left(self.keys, key)]
+        else:
+            if not old:
+                insort(self.keys, key)
+            self.qty[price] = qty
+        return qty - old
+
+    def update(self, levels: List[List[str]], bounds: List[float], depth: List[float]):
+        """
+        Applies a diff's [price, qty] strings (`set` inlined, this is the hot
+        path) and adds each size change's notional to `depth[i]` for every
+        band bound it lies within. Bounds run narrowest first.
+        """
+        keys, qty = self.keys, self.qty
+        get = qty.get
+        sign = -1.0 if self.is_bid else 1.0
+        # In key space every side is ascending, so "within" is key <= bound
+        key_bounds = [sign * bound for bound in bounds]
+        widest = key_bounds[-1] if key_bounds else float("-inf")
+        for p, q in levels:
+            price = float(p)
+            size = float(q)
+            old = get(price, 0.0)
+            key = sign * price
+            if size:
+                if size == old:
+                    continue
+                if not old:
+                    insort(keys, key)
+                qty[price] = size
+            elif old:
+                del qty[price]
+                del keys[bisect_left(keys, key)]
+            else:
+                continue
+            if key <= widest:
+                notional = (size - old) * price
+                for i, bound in enumerate(key_bounds):
+                    if key <= bound:
+                        depth[i] += notional
+
+    def best(self) -> Optional[float]:
+        if not self.keys:
+            return None
+        return -self.keys[0] if self.is_bid else self.keys[0]
+
+    def _cut(self, bound: float) -> int:
+        """Number of levels from the best one up to and including `bound`."""
+        return bisect_right(self.keys, -bound if self.is_bid else bound)
+
+    def within(self, bound: float) -> List[Tuple[float, float]]:
+        """(price, qty) from the best level out to `bound`."""
+        sign = -1 if self.is_bid else 1
+        qty = self.qty
+        return [(sign * key, qty[sign * key]) for key in self.keys[:self._cut(bound)]]
+
+    def notional_within(self, bound: float) -> float:
+        return sum(price * qty for price, qty in self.within(bound))
+
+    def prune(self, bound: float):
+        """Drops levels beyond `bound`."""
+        cut = self._cut(bound)
+        sign = -1 if self.is_bid else 1
+        for key in self.keys[cut:]:
+            del self.qty[sign * key]
+        del self.keys[cut:]
+
+
+class OrderBook:
+    """
+    Local L2 book kept from the `@depth@100ms` diff stream plus a REST
+    snapshot, following Binance's futures procedure: diffs are buffered until
+    the snapshot arrives, those older than its lastUpdateId are dropped, the
+    first applied one must straddle it (U <= lastUpdateId <= u), and every
+    later one must chain on the previous (pu == previous u). A broken chain
+    drops the book back to buffering until a new snapshot is loaded.
+
+    Notional depth within each band around mid is kept incrementally: every
+    level change inside a band adjusts that band's running total. The bands
+    are anchored to the mid at the last re-anchor and re-anchored (one
+    bisect-bounded sum per band) once mid drifts a quarter of the narrowest
+    band, so totals stay exact relative to a mid at most that far off.
+    """
+
+    def __init__(self, bands: Tuple[float, ...] = BOOK_BANDS):
+        self.bands = bands
+        self.bids = BookSide(is_bid=True)
+        self.asks = BookSide(is_bid=False)
+        self.synced = False
+        self.last_update_id = 0
+        self.event_time = 0
+        self.buffer: Deque[dict] = deque(maxlen=MAX_BUFFER)
+        self._awaiting_first = False
+        self.anchor = 0.0
+        self._bid_bounds = [0.0] * len(bands)
+        self._ask_bounds = [0.0] * len(bands)
+        self.bid_depth = [0.0] * len(bands)
+        self.ask_depth = [0.0] * len(bands)
+        self.updates = 0
+        self.resyncs = 0
+        self.rebases = 0
+
+    @property
+    def mid(self) -> float:
+        bid, ask = self.bids.best(), self.asks.best()
+        return (bid + ask) / 2 if bid is not None and ask is not None else 0.0
+
+    def reset(self):
+        """Back to buffering; the caller fetches a new snapshot."""
+        self.synced = False
+        self.buffer.clear()
+        self.resyncs += 1
+
+    def apply(self, event: dict) -> bool:
+        """Applies one depthUpdate diff; False means the book lost sync and needs a snapshot."""
+        if not self.synced:
+            self.buffer.append(event)
+            return True
+        if self._awaiting_first:
+            if event["u"] < self.last_update_id:
+                return True  # already in the snapshot
+            # Normally U <= lastUpdateId <= u; a diff that starts right after the
+            # snapshot (pu == lastUpdateId) chains onto it just as well
+            if event["U"] > self.last_update_id and event["pu"] != self.last_update_id:
+                self.reset()
+                self.buffer.append(event)
+                return False
+            self._awaiting_first = False
+        elif event["pu"] != self.last_update_id:
+            self.reset()
+            self.buffer.append(event)
+            return False
+        self._apply(event)
+        return True
+
+    def load_snapshot(self, snapshot: dict) -> bool:
+        """
+        Loads a REST /fapi/v1/depth snapshot and replays the buffered diffs
+        on top; False if they do not bridge it (the snapshot is older than
+        everything buffered), in which case a newer snapshot is needed.
+        """
+        self.bids.clear()
+        self.asks.clear()
+        for price, qty in snapshot["bids"]:
+            self.bids.set(float(price), float(qty))
+        for price, qty in snapshot["asks"]:
+            self.asks.set(float(price), float(qty))
+        self.last_update_id = snapshot["lastUpdateId"]
+        self.event_time = snapshot.get("E", 0)
+        self.synced = True
+        self._awaiting_first = True
+        self._rebase()
+        buffered = list(self.buffer)
+        self.buffer.clear()
+        for i, event in enumerate(buffered):
+            if not self.apply(event):
+                # reset() left only the failing diff buffered; keep the rest for the next snapshot
+                self.buffer.extend(buffered[i + 1:])
+                return False
+        return True
+
+    def _apply(self, event: dict):
+        self.bids.update(event["b"], self._bid_bounds, self.bid_depth)
+        self.asks.update(event["a"], self._ask_bounds, self.ask_depth)
+        self.updates += len(event["b"]) + len(event["a"])
+        self.last_update_id = event["u"]
+        self.event_time = event["E"]
+        mid = self.mid
+        if mid and abs(mid - self.anchor) > self.anchor * self.bands[0] * REBASE_FRACTION:
+            self._rebase()
+
+    def _rebase(self):
+        mid = self.mid
+        if not mid:
+            return
+        self.anchor = mid
+        self.bids.prune(mid * (1 - PRUNE_BAND))
+        self.asks.prune(mid * (1 + PRUNE_BAND))
+        self._bid_bounds = [mid * (1 - band) for band in self.bands]
+        self._ask_bounds = [mid * (1 + band) for band in self.bands]
+        self.bid_depth = [self.bids.notional_within(bound) for bound in self._bid_bounds]
+        self.ask_depth = [self.asks.notional_within(bound) for bound in self._ask_bounds]
+        self.rebases += 1
+
+    def walls(self, side: BookSide, bound: float) -> List[Dict]:
+        """Largest levels out to `bound` that stand well above the average level."""
+        levels = side.within(bound)
+        if not levels:
+            return []
+        threshold = WALL_MULTIPLE * sum(price * qty for price, qty in levels) / len(levels)
+        largest = heapq.nlargest(WALL_COUNT, levels, key=lambda level: level[0] * level[1])
+        return [
+            {"price": price, "qty": qty, "notional": price * qty}
+            for price, qty in largest if price * qty >= threshold
+        ]
+
+    def metrics(self) -> dict:
+        """Wire view: top of book, banded depth and imbalance, liquidity walls."""
+        bid, ask = self.bids.best(), self.asks.best()
+        if not self.synced or bid is None or ask is None:
+            return {"synced": False}
+        mid = (bid + ask) / 2
+        depth = []
+        for band, bid_notional, ask_notional in zip(self.bands, self.bid_depth, self.ask_depth):
+            total = bid_notional + ask_notional
+            depth.append({
+                "band": band * 100,
+                "bid": bid_notional,
+                "ask": ask_notional,
+                "imbalance": (bid_notional - ask_notional) / total if total else 0.0,
+            })
+        return {
+            "synced": True,
+            "bid": bid,
+            "ask": ask,
+            "mid": mid,
+            "spread": ask - bid,
+            "spreadBps": (ask - bid) / mid * 1e4,
+            "depth": depth,
+            "walls": {
+                "bid": self.walls(self.bids, mid * (1 - WALL_BAND)),
+                "ask": self.walls(self.asks, mid * (1 + WALL_BAND)),
+            },
+            "updateId": self.last_update_id,
+            "ts": self.event_time,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "synced": self.synced,
+            "levels": len(self.bids) + len(self.asks),
+            "updates": self.updates,
+            "resyncs": self.resyncs,
+            "rebases": self.rebases,
+            "buffered": len(self.buffer),
+        }
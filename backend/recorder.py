@@ -0,0 +1,112 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("TickRecorder")
+
+DAY_MS = 86_400_000
+
+# Fixed-width little-endian records; a file is just these back to back, so it
+# can be memory-mapped straight into a NumPy record array.
+DTYPES = {
+    "trade": np.dtype([("ts", "<i8"), ("price", "<f8"), ("qty", "<f8"), ("is_sell", "u1")]),
+    "liquidation": np.dtype([("ts", "<i8"), ("price", "<f8"), ("qty", "<f8"), ("is_sell", "u1")]),
+    "mark": np.dtype([("ts", "<i8"), ("mark", "<f8"), ("index", "<f8"), ("funding", "<f8")]),
+}
+
+
+def _day(ts_ms: int) -> str:
+    return datetime.fromtimestamp(ts_ms / 1000, tz=timezone.utc).strftime("%Y-%m-%d")
+
+
+def partition_path(root: str, day: str, symbol: str, kind: str) -> str:
+    return os.path.join(root, day, symbol.upper(), f"{kind}.bin")
+
+
+def load(root: str, day: str, symbol: str, kind: str) -> np.ndarray:
+    """Memory-maps one day of recorded events for a symbol (empty if none)."""
+    path = partition_path(root, day, symbol, kind)
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return np.empty(0, dtype=DTYPES[kind])
+    return np.memmap(path, dtype=DTYPES[kind], mode="r")
+
+
+class TickRecorder:
+    """
+    Appends normalized stream events to per-day, per-symbol binary files.
+
+    The record_* calls used by the WebSocket handler only append a tuple to an
+    in-memory list. A background task swaps the buffers out every
+    `flush_interval` seconds and a dedicated writer thread converts them to
+    record arrays and appends them to disk.
+    """
+
+    def __init__(self, root: str, flush_interval: float = 1.0):
+        self.root = root
+        self.flush_interval = flush_interval
+        self._buffers: Dict[Tuple[str, str], List[tuple]] = {}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick-recorder")
+        self._task: Optional[asyncio.Task] = None
+        self.records_written = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    # Hot path: called from BinanceClient._handle_stream_message
+
+    def record_trade(self, symbol: str, ts: int, price: float, qty: float, is_sell: bool):
+        # aggTrade is by far the busiest stream, so avoid setdefault's per-call list
+        buf = self._buffers.get((symbol, "trade"))
+        if buf is None:
+            buf = self._buffers[(symbol, "trade")] = []
+        buf.append((ts, price, qty, is_sell))
+
+    def record_liquidation(self, symbol: str, ts: int, price: float, qty: float, side: str):
+        self._buffers.setdefault((symbol, "liquidation"), []).append((ts, price, qty, side == "SELL"))
+
+    def record_mark(self, symbol: str, ts: int, mark: float, index: float, funding: float):
+        self._buffers.setdefault((symbol, "mark"), []).append((ts, mark, index, funding))
+
+    # Background flushing
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Recorder flush error: {e}")
+
+    async def flush(self):
+        if not self._buffers:
+            return
+        buffers, self._buffers = self._buffers, {}
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write, buffers)
+
+    def _write(self, buffers: Dict[Tuple[str, str], List[tuple]]):
+        for (symbol, kind), rows in buffers.items():
+            records = np.array(rows, dtype=DTYPES[kind])
+            days = records["ts"] // DAY_MS
+            # Almost always a single day; split only across midnight. Exchange
+            # timestamps need not be monotonic, so the day count decides
+            unique = np.unique(days)
+            for day in unique:
+                chunk = records[days == day] if len(unique) > 1 else records
+                path = partition_path(self.root, _day(int(day) * DAY_MS), symbol, kind)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "ab") as f:
+                    f.write(chunk.tobytes())
+            self.records_written += len(records)
@@ -0,0 +1,256 @@
+"""
+Deterministic replay of Binance stream data through the live code paths.
+
+Frames go through `BinanceClient._handle_batch` (aggTrade, forceOrder,
+markPrice) in batches, `SignalScanner.detect` (all-ticker arrays) and
+`SignalScanner.apply_kline` (kline_1m) exactly as they would live, so MarketState aggregations and the scanner's RSI/volume
+rules can be tested, backtested and benchmarked offline. Cooldowns, candles and
+rolling windows all run on event time, so the same input always produces the
+same output regardless of clock mode.
+
+    cd backend && python -m replay --synthetic 300
+    cd backend && python -m replay --recording ./ticks --day 2026-10-17 --speed 10
+    cd backend && python -m replay --jsonl capture.jsonl
+"""
+import argparse
+import asyncio
+import gzip
+import heapq
+import json
+import logging
+import random
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from binance_client import BinanceClient
+from market_state import MarketState
+from recorder import DTYPES, load
+from scanner import SignalScanner
+
+logger = logging.getLogger("Replay")
+
+TICKER_STREAM = "!ticker@arr"
+FUTURES_EVENTS = ("aggTrade", "forceOrder", "markPriceUpdate")
+REPLAY_BATCH = 256  # futures frames applied per BinanceClient._handle_batch call
+
+
+def event_time(frame: dict) -> int:
+    data = frame["data"]
+    return data[0]["E"] if isinstance(data, list) else data["E"]
+
+
+# Sources: each yields combined-stream frames ({"stream", "data"}) in event-time order
+
+def read_jsonl(path: str) -> Iterator[dict]:
+    """Raw combined-stream frames, one JSON object per line (optionally gzipped)."""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _recorded_frames(root: str, day: str, symbol: str, kind: str) -> Iterator[dict]:
+    records = load(root, day, symbol, kind)
+    stream = symbol.lower()
+    if kind == "trade":
+        for ts, price, qty, is_sell in records.tolist():
+            yield {"stream": f"{stream}@aggTrade",
+                   "data": {"e": "aggTrade", "E": ts, "s": symbol, "p": price, "q": qty, "m": bool(is_sell)}}
+    elif kind == "liquidation":
+        for ts, price, qty, is_sell in records.tolist():
+            yield {"stream": f"{stream}@forceOrder",
+                   "data": {"e": "forceOrder", "E": ts,
+                            "o": {"s": symbol, "S": "SELL" if is_sell else "BUY", "ap": price, "q": qty}}}
+    elif kind == "mark":
+        for ts, mark, index, funding in records.tolist():
+            yield {"stream": f"{stream}@markPrice",
+                   "data": {"e": "markPriceUpdate", "E": ts, "s": symbol, "p": mark, "P": index, "r": funding}}
+
+
+def read_recording(root: str, day: str, symbols: Iterable[str]) -> Iterator[dict]:
+    """Merges a TickRecorder day across symbols and kinds into one time-ordered stream."""
+    sources = [_recorded_frames(root, day, symbol.upper(), kind) for symbol in symbols for kind in DTYPES]
+    return heapq.merge(*sources, key=event_time)
+
+
+def synthetic(symbols: int = 50, minutes: int = 30, trades_per_second: int = 20,
+              seed: int = 7, start_ms: int = 1_700_000_000_000) -> Iterator[dict]:
+    """
+    Seeded random-walk market: per second, `trades_per_second` aggTrades, a
+    markPrice and a kline_1m update per symbol, plus one all-ticker frame.
+    Symbols trend with fading volume so the scanner rules actually fire.
+    """
+    rng = random.Random(seed)
+    names = [f"SYM{i}USDT" for i in range(symbols)]
+    price = [rng.uniform(0.1, 50000) for _ in names]
+    open_24h = list(price)
+    drift = [rng.gauss(0, 0.00005) for _ in names]
+    volume = [rng.uniform(1e5, 1e7) for _ in names]
+    flow = [rng.uniform(10, 1000) for _ in names]
+    minute_volume = [0.0 for _ in names]
+    for second in range(minutes * 60):
+        base = start_ms + second * 1000
+        if base % 60_000 < 1000:
+            minute_volume = [0.0 for _ in names]
+        for i, name in enumerate(names):
+            stream = name.lower()
+            for t in range(trades_per_second):
+                price[i] *= 1 + drift[i] / trades_per_second + rng.gauss(0, 0.00003)
+                qty = rng.expovariate(1.0) * flow[i] / trades_per_second
+                volume[i] += qty
+                minute_volume[i] += qty
+                yield {"stream": f"{stream}@aggTrade",
+                       "data": {"e": "aggTrade", "E": base + t * 1000 // trades_per_second, "s": name,
+                                "p": f"{price[i]:.6f}", "q": f"{qty:.4f}", "m": rng.random() < 0.5}}
+            yield {"stream": f"{stream}@markPrice",
+                   "data": {"e": "markPriceUpdate", "E": base + 999, "s": name, "p": f"{price[i]:.6f}",
+                            "P": f"{price[i] * 0.9999:.6f}", "r": "0.0001"}}
+            opened = base - base % 60_000
+            yield {"stream": f"{stream}@kline_1m",
+                   "data": {"e": "kline", "E": base + 999, "s": name,
+                            "k": {"t": opened, "T": opened + 59_999, "s": name, "i": "1m",
+                                  "c": f"{price[i]:.6f}", "v": f"{minute_volume[i]:.4f}",
+                                  "x": base % 60_000 >= 59_000}}}
+        if second % 60 == 59:
+            flow = [f * 0.9 for f in flow]
+        yield {"stream": TICKER_STREAM,
+               "data": [{"e": "24hrTicker", "E": base + 999, "s": name, "c": f"{price[i]:.6f}",
+                         "o": f"{open_24h[i]:.6f}", "v": f"{volume[i]:.3f}"}
+                        for i, name in enumerate(names)]}
+
+
+class ReplayEngine:
+    """
+    Feeds frames into a BinanceClient and optional SignalScanner.
+
+    `speed=None` replays as fast as possible; `speed=N` paces frames at N times
+    their recorded rate. Futures frames are applied in batches of up to
+    `batch_size`, as the live socket drains them, flushed before every
+    scanner frame and pacing sleep. Symbols are given a MarketState on first
+    sight. Scanner hits become signals immediately (the REST enrichment is
+    skipped) and put the symbol on cooldown, which is what backtesting the
+    rules needs.
+    """
+
+    def __init__(self, client: Optional[BinanceClient] = None, scanner: Optional[SignalScanner] = None,
+                 speed: Optional[float] = None, batch_size: int = REPLAY_BATCH):
+        self.client = client or BinanceClient()
+        self.scanner = scanner
+        self.speed = speed
+        self.batch_size = batch_size
+        self._batch: List[dict] = []
+        self.signals: List[dict] = []
+        self.events = 0
+        self.by_type: Dict[str, int] = {}
+        self.elapsed = 0.0
+        self.first_ts: Optional[int] = None
+        self.last_ts: Optional[int] = None
+
+    def _ensure_state(self, data: dict):
+        if data.get("e") not in FUTURES_EVENTS:
+            return  # spot miniTicker symbols are not contracts
+        symbol = data.get("s") or data.get("o", {}).get("s")
+        if symbol and symbol not in self.client.states:
+            self.client.states[symbol] = MarketState(symbol=symbol)
+
+    def feed(self, frame: dict):
+        data = frame.get("data")
+        if data is None:
+            return
+        if isinstance(data, list):
+            self.by_type["24hrTicker"] = self.by_type.get("24hrTicker", 0) + 1
+            self.flush()
+            if self.scanner:
+                for hit in self.scanner.detect(data):
+                    self.scanner.last_alert_time[hit["symbol"]] = self.scanner.clock
+                    self.signals.append(dict(hit, ts=data[0]["E"]))
+        else:
+            self._ensure_state(data)
+            event_type = data.get("e")
+            self.by_type[event_type] = self.by_type.get(event_type, 0) + 1
+            if event_type == "kline":
+                if self.scanner:
+                    self.scanner.apply_kline(data)
+                return
+            if event_type == "depthUpdate":
+                return  # order books need their REST snapshot, which a capture does not have
+            self._batch.append(frame)
+            if len(self._batch) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Applies the queued futures frames."""
+        if self._batch:
+            self.client._handle_batch(self._batch)
+            self._batch = []
+
+    async def run(self, frames: Iterable[dict]) -> dict:
+        start = time.perf_counter()
+        for frame in frames:
+            ts = event_time(frame)
+            if self.first_ts is None:
+                self.first_ts = ts
+            if self.speed:
+                due = start + (ts - self.first_ts) / 1000 / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    self.flush()
+                    await asyncio.sleep(delay)
+            self.feed(frame)
+            self.last_ts = ts
+            self.events += 1
+        self.flush()
+        self.elapsed = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self) -> dict:
+        span = (self.last_ts - self.first_ts) / 1000 if self.events else 0.0
+        return {
+            "events": self.events,
+            "by_type": self.by_type,
+            "elapsed_s": round(self.elapsed, 3),
+            "events_per_s": round(self.events / self.elapsed) if self.elapsed else 0,
+            "market_span_s": span,
+            "speedup": round(span / self.elapsed, 1) if self.elapsed else 0.0,
+            "symbols": len(self.client.states),
+            "signals": len(self.signals),
+        }
+
+
+async def main(args):
+    if args.jsonl:
+        frames = read_jsonl(args.jsonl)
+    elif args.recording:
+        frames = read_recording(args.recording, args.day, args.symbols)
+    else:
+        frames = synthetic(args.synthetic, args.minutes, seed=args.seed)
+
+    scanner = None if args.no_scanner else SignalScanner(state=None, db_path=":memory:")
+    if scanner:
+        await scanner.store.open()
+    engine = ReplayEngine(scanner=scanner, speed=args.speed)
+    stats = await engine.run(frames)
+    if scanner:
+        await scanner.stop()
+
+    for signal in engine.signals:
+        print(f"{signal['ts']:>14} {signal['side']:<5} {signal['symbol']:<14} "
+              f"rsi {signal['rsi']:6.2f}  24h {signal['change']:+6.2f}%  @ {signal['price']}")
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded or synthetic Binance streams offline")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--jsonl", help="file of raw combined-stream frames, one per line")
+    source.add_argument("--recording", help="TickRecorder root directory (needs --day and --symbols)")
+    source.add_argument("--synthetic", type=int, default=50, metavar="SYMBOLS")
+    parser.add_argument("--day", help="YYYY-MM-DD partition of the recording")
+    parser.add_argument("--symbols", nargs="+", default=["BTCUSDT"])
+    parser.add_argument("--minutes", type=int, default=15, help="synthetic market length")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--speed", type=float, help="real-time multiplier; omit to run as fast as possible")
+    parser.add_argument("--no-scanner", action="store_true", help="only drive MarketState")
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+
+from http_client import HttpClient, HttpError, RETRY_STATUSES
+
+logger = logging.getLogger("RestScheduler")
+
+# Overridable to point the backend at a stand-in exchange (benchmarks/fake_exchange.py)
+FAPI_URL = os.getenv("BINANCE_FAPI_URL", "https://fapi.binance.com")
+SPOT_URL = os.getenv("BINANCE_SPOT_URL", "https://api.binance.com")
+
+# Background work (scanner warm-up) may only spend this share of a budget, so
+# dashboard refreshes always have headroom
+BACKGROUND_SHARE = 0.5
+FOREGROUND_SHARE = 0.9
+# A 429 is not retried inside HttpClient: the request goes back through its
+# budget, which the 429 has blocked for Retry-After, this many times at most
+RATE_LIMIT_RETRIES = 2
+SCHEDULER_RETRY_STATUSES = RETRY_STATUSES - {429}
+
+
+def klines_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+def depth_weight(limit: int) -> int:
+    if limit <= 50:
+        return 2
+    if limit <= 100:
+        return 5
+    if limit <= 500:
+        return 10
+    return 20
+
+
+class WeightBudget:
+    """
+    Client-side mirror of one Binance IP limit, counted in fixed windows
+    aligned to the wall clock like the exchange's own. The server's
+    X-MBX-USED-WEIGHT-1M figure overrides the local count whenever it is higher
+    (other processes on the same IP spend it too), and a 418/429 blocks the
+    budget for the Retry-After period.
+    """
+
+    def __init__(self, limit: int, window: float = 60.0):
+        self.limit = limit
+        self.window = window
+        self.used = 0
+        self.waits = 0
+        self.throttled = 0
+        self._window_start = 0.0
+        self._blocked_until = 0.0
+
+    def _roll(self, now: float):
+        start = now - now % self.window
+        if start != self._window_start:
+            self._window_start = start
+            self.used = 0
+
+    async def acquire(self, weight: int, share: float = FOREGROUND_SHARE):
+        while True:
+            now = time.time()
+            self._roll(now)
+            if now < self._blocked_until:
+                await asyncio.sleep(self._blocked_until - now)
+                continue
+            if self.used + weight <= self.limit * share:
+                self.used += weight
+                return
+            self.waits += 1
+            await asyncio.sleep(self._window_start + self.window - now + 0.05)
+
+    def observe(self, used: int):
+        self._roll(time.time())
+        self.used = max(self.used, used)
+
+    def block(self, seconds: float):
+        self.throttled += 1
+        self._blocked_until = max(self._blocked_until, time.time() + seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "limit": self.limit,
+            "used": self.used,
+            "waits": self.waits,
+            "throttled": self.throttled,
+            "blocked_for": max(0.0, round(self._blocked_until - time.time(), 1)),
+        }
+
+
+class RestScheduler:
+    """
+    Every Binance REST call in the backend goes through here, so BinanceClient
+    and SignalScanner spend one shared, weight-aware budget per API:
+
+    - `fapi`: USDⓈ-M futures request weight, 2400/min
+    - `data`: /futures/data statistics endpoints, 1000 requests per 5 min
+    - `spot`: spot request weight, 6000/min
+
+    Callers issue independent requests concurrently (asyncio.gather); the
+    budgets make them wait only when a limit is actually near. A 429 blocks
+    its budget for Retry-After and the request queues for it again.
+    """
+
+    def __init__(self, http: Optional[HttpClient] = None, fapi_limit: int = 2400,
+                 data_limit: int = 1000, spot_limit: int = 6000):
+        self.http = http or HttpClient()
+        self.budgets: Dict[str, WeightBudget] = {
+            "fapi": WeightBudget(fapi_limit),
+            "data": WeightBudget(data_limit, window=300.0),
+            "spot": WeightBudget(spot_limit),
+        }
+
+    def _route(self, path: str):
+        if path.startswith("/futures/data/"):
+            return FAPI_URL, self.budgets["data"]
+        if path.startswith("/api/"):
+            return SPOT_URL, self.budgets["spot"]
+        return FAPI_URL, self.budgets["fapi"]
+
+    async def get(self, path: str, params: Optional[dict] = None, weight: int = 1,
+                  background: bool = False) -> Any:
+        base, budget = self._route(path)
+
+        def on_response(resp: aiohttp.ClientResponse):
+            used = resp.headers.get("X-MBX-USED-WEIGHT-1M")
+            if used and budget.window == 60.0:
+                budget.observe(int(used))
+            if resp.status in (418, 429):
+                retry_after = resp.headers.get("Retry-After", "60")
+                logger.warning(f"Binance {resp.status} on {path}; backing off {retry_after}s")
+                budget.block(float(retry_after) if retry_after.isdigit() else 60.0)
+
+        for attempt in range(RATE_LIMIT_RETRIES + 1):
+            await budget.acquire(weight, BACKGROUND_SHARE if background else FOREGROUND_SHARE)
+            try:
+                return await self.http.get_json(base + path, params=params, on_response=on_response,
+                                                retry_statuses=SCHEDULER_RETRY_STATUSES)
+            except HttpError as e:
+                # 418 means an IP ban is already escalating, so never retry into it
+                if e.status != 429 or attempt == RATE_LIMIT_RETRIES:
+                    raise
+
+    # Endpoints
+
+    async def klines(self, symbol: str, interval: str = "1m", limit: int = 500,
+                     background: bool = False) -> List[list]:
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        return await self.get("/fapi/v1/klines", params, klines_weight(limit), background)
+
+    async def depth(self, symbol: str, limit: int = 1000) -> dict:
+        return await self.get("/fapi/v1/depth", {"symbol": symbol, "limit": limit}, depth_weight(limit))
+
+    async def open_interest(self, symbol: str) -> dict:
+        return await self.get("/fapi/v1/openInterest", {"symbol": symbol})
+
+    async def ratio(self, endpoint: str, symbol: str, period: str = "5m", limit: int = 1) -> List[dict]:
+        """One of the /futures/data long/short ratio series, e.g. topLongShortPositionRatio."""
+        params = {"symbol": symbol, "period": period, "limit": limit}
+        return await self.get(f"/futures/data/{endpoint}", params)
+
+    async def futures_data(self, endpoint: str, symbol: str, period: str, limit: int = 30,
+                           end_time: Optional[int] = None, background: bool = False) -> List[dict]:
+        """The newest `limit` points (up to `end_time`) of a /futures/data history, e.g. openInterestHist (30 days at most)."""
+        params = {"symbol": symbol, "period": period, "limit": limit}
+        if end_time is not None:
+            params["endTime"] = end_time
+        return await self.get(f"/futures/data/{endpoint}", params, background=background)
+
+    async def ticker_24hr(self) -> List[dict]:
+        return await self.get("/fapi/v1/ticker/24hr", weight=40)
+
+    async def exchange_info(self) -> dict:
+        return await self.get("/fapi/v1/exchangeInfo")
+
+    async def spot_prices(self) -> Dict[str, str]:
+        # Unfiltered (weight 4): a `symbols` filter fails outright on any futures-only pair
+        return {d["symbol"]: d["price"] for d in await self.get("/api/v3/ticker/price", weight=4)}
+
+    def stats(self) -> dict:
+        return {name: budget.to_dict() for name, budget in self.budgets.items()}
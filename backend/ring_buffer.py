@@ -0,0 +1,95 @@
+from array import array
+from collections import deque
+from typing import Any, Deque, Dict, Iterator, List
+
+
+class RingBuffer:
+    """Fixed-capacity FIFO for event tapes; O(1) append with oldest-first eviction."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items: Deque[Any] = deque(maxlen=capacity)
+
+    def append(self, item: Any):
+        self._items.append(item)
+
+    def extend(self, items):
+        self._items.extend(items)
+
+    def clear(self):
+        self._items.clear()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._items)
+
+    def __getitem__(self, index: int) -> Any:
+        return self._items[index]
+
+    def tail(self, count: int) -> List[Any]:
+        """Newest `count` items, oldest first."""
+        count = min(count, len(self._items))
+        if count <= 0:
+            return []
+        items = self._items
+        return [items[i] for i in range(len(items) - count, len(items))]
+
+    def to_list(self) -> List[Any]:
+        return list(self._items)
+
+
+class TradeTape:
+    """
+    Struct-of-arrays ring buffer for aggTrades. Each column is a preallocated
+    array('d') written in place, so inserting a trade allocates nothing; dicts
+    are only built when the tape is actually read.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.price = array("d", [0.0]) * capacity
+        self.quantity = array("d", [0.0]) * capacity
+        self.timestamp = array("d", [0.0]) * capacity
+        self.is_sell = array("b", [0]) * capacity
+        self._next = 0   # slot the next trade is written to
+        self._size = 0
+
+    def append(self, price: float, quantity: float, is_sell: bool, timestamp: int):
+        i = self._next
+        self.price[i] = price
+        self.quantity[i] = quantity
+        self.timestamp[i] = timestamp
+        self.is_sell[i] = is_sell
+        self._next = i + 1 if i + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+
+    def clear(self):
+        self._next = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _slots(self, count: int) -> Iterator[int]:
+        count = min(count, self._size)
+        start = self._next - count
+        for k in range(count):
+            yield (start + k) % self.capacity
+
+    def tail(self, count: int) -> List[Dict]:
+        """Newest `count` trades as wire dicts, oldest first."""
+        return [
+            {
+                "price": self.price[i],
+                "quantity": self.quantity[i],
+                "side": "SELL" if self.is_sell[i] else "BUY",
+                "timestamp": int(self.timestamp[i]),
+            }
+            for i in self._slots(count)
+        ]
+
+    def to_list(self) -> List[Dict]:
+        return self.tail(self._size)
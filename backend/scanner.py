@@ -1,53 +1,70 @@
 import asyncio
-import sqlite3
-import time
-import pandas as pd
-import numpy as np
+import os
 import logging
+import time
 from datetime import datetime
-from binance import AsyncClient, BinanceSocketManager
-from market_state import MarketState
+from typing import Optional
+import aiohttp
+from binance_client import FSTREAM_URL
+from indicators import UniverseIndicators
+from work_queue import CandidateQueue
+from rest_scheduler import RestScheduler
+from universe import SymbolUniverse
+from signal_store import SignalStore
+from metrics import REGISTRY
+from wire_format import decode_message
 
 logger = logging.getLogger("SignalScanner")
 
 DB_NAME = "binance_public_scanner.db"
+SCANNER_WORKERS = int(os.getenv("SCANNER_WORKERS", "2"))
+SCANNER_QUEUE_SIZE = int(os.getenv("SCANNER_QUEUE_SIZE", "32"))
+TICKER_STREAM_URL = f"{FSTREAM_URL}/ws/!ticker@arr"  # every USDⓈ-M 24h ticker, once a second
+# Real 1m volumes for the fading-volume rule: <symbol>@kline_1m for every symbol
+# the ticker has shown, on as many combined sockets as Binance's per-connection cap needs
+KLINE_STREAM_URL = f"{FSTREAM_URL}/stream"
+KLINE_STREAMS_PER_SOCKET = 1000  # Binance allows 1024
+SUBSCRIBE_CHUNK = 200            # streams per SUBSCRIBE message, sent at most 5/s (the limit is 10)
+
+FRAME_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_scanner_frame_seconds", "Applying one all-ticker frame: universe, indicators, rule scan").labels()
+ANALYSIS_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_scanner_analysis_seconds", "Enriching and emitting one candidate signal (REST included)").labels()
 
 class SignalScanner:
-    def __init__(self, state: MarketState):
+    def __init__(self, state, workers: int = SCANNER_WORKERS, queue_size: int = SCANNER_QUEUE_SIZE,
+                 db_path: str = DB_NAME, rest: Optional[RestScheduler] = None,
+                 universe: Optional[SymbolUniverse] = None):
+        # MarketState or SymbolRegistry: anything with scanner_status / add_scanner_signal
         self.state = state
         self.last_alert_time = {}
         self.cooldown_seconds = 120
-        self.top_trader_limiter = asyncio.Semaphore(2)
+        # Event time (s) of the latest ticker frame; cooldowns run on it so a replay behaves like live
+        self.clock = 0.0
+        # Klines and top-trader ratios share BinanceClient's weight budget
+        self.rest = rest or RestScheduler()
+        # Optional /symbols cache fed from the same all-ticker frames
+        self.universe = universe
+        # The receive loop only enqueues; `workers` tasks run the REST enrichment
+        self.workers = workers
+        self.candidates = CandidateQueue(queue_size)
+        self._in_flight = set()
+        self.signals_emitted = 0
         self._running = False
-        self.init_db()
-
-    def calculate_rsi(self, series, period=14):
-        delta = series.diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-        rs = gain / loss
-        return 100 - (100 / (100 + rs))
-
-    def init_db(self):
-        conn = sqlite3.connect(DB_NAME)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS signals
-                     (timestamp TEXT, symbol TEXT, price REAL, rsi REAL, delta REAL, top_ratio REAL)''')
-        conn.commit()
-        conn.close()
-
-    async def get_top_trader_sentiment_limited(self, client, symbol):
-        """Ensures no more than 2 requests per minute across the whole script."""
-        async with self.top_trader_limiter:
-            try:
-                data = await client.futures_top_longshort_position_ratio(symbol=symbol, period='15m', limit=1)
-                ratio = float(data[0]['longShortRatio']) if data else 1.0
-                # Lock the slot for 30 seconds to maintain 2-per-minute pace
-                await asyncio.sleep(30) 
-                return ratio
-            except Exception as e:
-                logger.error(f"Rate limit hit or API error on {symbol}: {e}")
-                return 1.0
+        # Signal rules: 24h move beyond min_move_pct with RSI past the band and fading volume
+        self.min_move_pct = 2.5
+        self.rsi_overbought = 65
+        self.rsi_oversold = 35
+        self.indicators = UniverseIndicators()
+        self.store = SignalStore(db_path)
+
+    async def get_top_trader_sentiment(self, symbol):
+        try:
+            data = await self.rest.ratio("topLongShortPositionRatio", symbol, period='15m')
+            return float(data[0]['longShortRatio']) if data else 1.0
+        except Exception as e:
+            logger.error(f"Rate limit hit or API error on {symbol}: {e}")
+            return 1.0
 
     async def start(self):
         self._running = True
@@ -56,115 +73,190 @@ class SignalScanner:
 
     async def stop(self):
         self._running = False
+        await self.store.close()
 
     async def run(self):
         while self._running:
             try:
                 self.state.scanner_status = "Connecting to Firehose..."
-                client = await AsyncClient.create() 
-                bm = BinanceSocketManager(client)
-                ts = bm.all_ticker_futures_socket()
-                
                 logger.info("Connecting to Binance All Ticker Stream...")
-                async with ts as tscm:
+                # Raw stream on the shared session, like BinanceClient's sockets
+                async with self.rest.http.session.ws_connect(TICKER_STREAM_URL) as ws:
                     self.state.scanner_status = "Active | Monitoring 200+ symbols"
-                    while self._running:
-                        msg = await tscm.recv()
-                        if not msg or not isinstance(msg, list): continue
-                        
-                        for item in msg:
-                            symbol = item['s']
-                            if not symbol.endswith('USDT'): continue
-
-                            curr_price = float(item['c'])
-                            open_price = float(item['o'])
-                            price_change = ((curr_price - open_price) / open_price) * 100
-
-                            # Check if price move is > 2.5% (Eased from 3%)
-                            if abs(price_change) > 2.5:
-                                self.state.scanner_status = f"Analyzing {symbol} ({price_change:+.1f}%)"
-                                now = time.time()
-                                
-                                # 2-Minute Cooldown logic
-                                if symbol in self.last_alert_time and (now - self.last_alert_time[symbol]) < self.cooldown_seconds:
-                                    continue
-
-                                # Fetch klines for Indicators and CVD
-                                klines = await client.futures_klines(symbol=symbol, interval='1m', limit=50)
-                                df = pd.DataFrame(klines, columns=['time','o','h','l','c','v','ct','qv','n','tb','tq','i']).astype(float)
-                                
-                                # RSI & Volume Checks
-                                rsi_series = self.calculate_rsi(df['c'], period=14)
-                                curr_rsi = rsi_series.iloc[-1]
-                                vol_decreasing = df['v'].iloc[-1] < df['v'].iloc[-2] < df['v'].iloc[-3]
-
-                                if vol_decreasing:
-                                    # Conditions for Long (Oversold) or Short (Overbought)
-                                    is_short_signal = price_change > 0 and curr_rsi > 65
-                                    is_long_signal = price_change < 0 and curr_rsi < 35
-
-                                    if is_short_signal or is_long_signal:
-                                        self.state.scanner_status = f"SIGNAL DETECTED: {symbol}"
-                                        df['delta'] = df['tb'] - (df['v'] - df['tb'])
-                                        cvd = df['delta'].sum()
-                                        sentiment = await self.get_top_trader_sentiment_limited(client, symbol)
-                                        
-                                        self.last_alert_time[symbol] = now
-                                        signal = {
-                                            "timestamp": datetime.now().isoformat(),
-                                            "symbol": symbol,
-                                            "price": curr_price,
-                                            "rsi": float(curr_rsi),
-                                            "delta": float(cvd),
-                                            "top_ratio": sentiment
-                                        }
-                                        
-                                        self.save_to_sqlite(signal)
-                                        self.state.add_scanner_signal(signal)
-                                        
-                                        side = "SHORT" if is_short_signal else "LONG"
-                                        logger.info(f"detected {side} SIGNAL: {symbol} | RSI: {curr_rsi:.2f}")
-                                        
-                                        async def reset_status():
-                                            await asyncio.sleep(5)
-                                            if self._running:
-                                                self.state.scanner_status = "Active | Monitoring 200+ symbols"
-                                        asyncio.create_task(reset_status())
-
-                await client.close_connection()
+                    tasks = [asyncio.create_task(self._warm_up()), asyncio.create_task(self._kline_streams())]
+                    tasks += [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+                    try:
+                        async for frame in ws:
+                            if not self._running: break
+                            if frame.type == aiohttp.WSMsgType.ERROR: break
+                            if frame.type != aiohttp.WSMsgType.TEXT: continue
+                            msg = decode_message(frame.data)
+                            if not msg or not isinstance(msg, list): continue
+                            start = time.perf_counter()
+                            self._process_frame(msg)
+                            FRAME_SECONDS.observe(time.perf_counter() - start)
+                    finally:
+                        for task in tasks:
+                            task.cancel()
             except Exception as e:
                 self.state.scanner_status = f"Reconnecting... ({str(e)[:15]})"
                 logger.error(f"Scanner run error: {e}")
                 await asyncio.sleep(5)
 
-    def save_to_sqlite(self, signal):
-        try:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute("INSERT INTO signals VALUES (?,?,?,?,?,?)", 
-                      (signal["timestamp"], signal["symbol"], signal["price"], signal["rsi"], signal["delta"], signal["top_ratio"]))
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            logger.error(f"DB Error: {e}")
+    def detect(self, msg: list) -> list:
+        """
+        Applies one all-ticker frame and returns the symbols that pass the
+        signal rules and are not cooling down. One vectorized indicator pass
+        over the whole universe; no awaits, no network.
+        """
+        items = [item for item in msg if item['s'].endswith('USDT')]
+        if not items:
+            return []
+        self.clock = items[0]['E'] / 1000
+        self.indicators.update(items, items[0]['E'])
+        hits = []
+        for hit in self.indicators.scan(self.min_move_pct, self.rsi_overbought, self.rsi_oversold):
+            symbol = hit["symbol"]
+            # 2-Minute Cooldown logic
+            if symbol in self.last_alert_time and (self.clock - self.last_alert_time[symbol]) < self.cooldown_seconds:
+                continue
+            if symbol in self._in_flight:
+                continue
+            hits.append(hit)
+        return hits
 
-    def get_recent_signals(self, limit=20):
+    def apply_kline(self, data: dict):
+        """Applies one `kline_1m` event to the live minute volumes."""
+        kline = data["k"]
+        self.indicators.update_kline(data["s"], int(kline["t"]), float(kline["v"]))
+
+    async def _kline_streams(self):
+        """Keeps one kline socket per KLINE_STREAMS_PER_SOCKET symbols the ticker has shown."""
+        shards = []
         try:
-            conn = sqlite3.connect(DB_NAME)
-            c = conn.cursor()
-            c.execute("SELECT * FROM signals ORDER BY timestamp DESC LIMIT ?", (limit,))
-            rows = c.fetchall()
-            conn.close()
-            return [
-                {
-                    "timestamp": r[0],
-                    "symbol": r[1],
-                    "price": r[2],
-                    "rsi": r[3],
-                    "delta": r[4],
-                    "top_ratio": r[5]
-                } for r in rows
-            ]
-        except Exception as e:
-            logger.error(f"DB Fetch Error: {e}")
-            return []
+            while self._running:
+                while len(shards) * KLINE_STREAMS_PER_SOCKET < len(self.indicators):
+                    shards.append(asyncio.create_task(self._kline_socket(len(shards))))
+                await asyncio.sleep(5)
+        finally:
+            for task in shards:
+                task.cancel()
+
+    async def _kline_socket(self, shard: int):
+        first = shard * KLINE_STREAMS_PER_SOCKET
+        while self._running:
+            try:
+                async with self.rest.http.session.ws_connect(KLINE_STREAM_URL) as ws:
+                    subscribed, request_id = first, 0
+                    while self._running:
+                        # Symbols are only ever appended, so new ones are the tail of the shard
+                        fresh = self.indicators.symbols[subscribed:first + KLINE_STREAMS_PER_SOCKET]
+                        for start in range(0, len(fresh), SUBSCRIBE_CHUNK):
+                            request_id += 1
+                            params = [f"{symbol.lower()}@kline_1m" for symbol in fresh[start:start + SUBSCRIBE_CHUNK]]
+                            await ws.send_json({"method": "SUBSCRIBE", "params": params, "id": request_id})
+                            await asyncio.sleep(0.2)
+                        subscribed += len(fresh)
+                        try:
+                            frame = await ws.receive(timeout=5)
+                        except asyncio.TimeoutError:
+                            continue
+                        if frame.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                            break
+                        if frame.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        msg = decode_message(frame.data)
+                        data = msg.get("data") if isinstance(msg, dict) else None
+                        if data and data.get("e") == "kline":
+                            self.apply_kline(data)
+            except Exception as e:
+                logger.error(f"Kline stream error: {e}")
+            if self._running:
+                await asyncio.sleep(5)
+
+    def _process_frame(self, msg: list):
+        if self.universe is not None:
+            self.universe.update(msg)
+        for hit in self.detect(msg):
+            # Biggest movers first; a symbol already queued just gets the fresher hit
+            self.candidates.put(hit["symbol"], abs(hit["change"]), hit)
+
+    async def _worker(self):
+        while True:
+            symbol, hit = await self.candidates.get()
+            self.last_alert_time[symbol] = self.clock
+            self._in_flight.add(symbol)
+            start = time.perf_counter()
+            try:
+                await self._emit_signal(hit)
+            except Exception as e:
+                logger.error(f"Signal analysis failed for {symbol}: {e}")
+            finally:
+                self._in_flight.discard(symbol)
+                ANALYSIS_SECONDS.observe(time.perf_counter() - start)
+
+    async def _warm_up(self):
+        """Seeds RSI/volume state from klines for symbols the stream has not warmed yet."""
+        attempted = set()  # new listings without enough klines just warm from the stream
+        while self._running:
+            cold = [s for s in self.indicators.cold_symbols() if s not in attempted]
+            if not cold:
+                await asyncio.sleep(5)
+                continue
+            for symbol in cold:
+                attempted.add(symbol)
+                try:
+                    # Background share of the budget, so warm-up never starves the dashboard
+                    klines = await self.rest.klines(symbol, '1m', limit=50, background=True)
+                    self.indicators.seed(symbol, klines)
+                except Exception as e:
+                    logger.warning(f"Warm-up failed for {symbol}: {e}")
+
+    async def _emit_signal(self, hit: dict):
+        symbol = hit["symbol"]
+        self.state.scanner_status = f"SIGNAL DETECTED: {symbol}"
+        async def fetch_cvd():
+            try:
+                # CVD over the last 50 minutes: taker buy - taker sell base volume
+                klines = await self.rest.klines(symbol, '1m', limit=50)
+                return sum(2 * float(k[9]) - float(k[5]) for k in klines)
+            except Exception as e:
+                logger.error(f"Delta fetch failed for {symbol}: {e}")
+                return 0.0
+        cvd, sentiment = await asyncio.gather(fetch_cvd(), self.get_top_trader_sentiment(symbol))
+
+        signal = {
+            "timestamp": datetime.now().isoformat(),
+            "symbol": symbol,
+            "price": hit["price"],
+            "rsi": hit["rsi"],
+            "delta": float(cvd),
+            "top_ratio": sentiment
+        }
+        
+        self.save_to_sqlite(signal)
+        self.state.add_scanner_signal(signal)
+        self.signals_emitted += 1
+        
+        logger.info(f"detected {hit['side']} SIGNAL: {symbol} | RSI: {hit['rsi']:.2f}")
+        
+        async def reset_status():
+            await asyncio.sleep(5)
+            if self._running:
+                self.state.scanner_status = f"Active | Monitoring {len(self.indicators)} symbols"
+        asyncio.create_task(reset_status())
+
+    def stats(self) -> dict:
+        return {
+            "symbols": len(self.indicators),
+            "queue": self.candidates.stats(),
+            "in_flight": len(self._in_flight),
+            "workers": self.workers,
+            "signals": self.signals_emitted,
+        }
+
+    def save_to_sqlite(self, signal):
+        self.store.add(signal)
+
+    async def get_recent_signals(self, limit=20, symbol=None):
+        return await self.store.recent(limit, symbol)
@@ -0,0 +1,340 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from http_client import HttpError
+from metrics import REGISTRY
+from rest_scheduler import RestScheduler
+
+logger = logging.getLogger("SeriesStore")
+
+MINUTE_MS = 60_000
+DAY_MS = 86_400_000
+
+# Resolution -> (bucket ms, retention ms or None to keep forever). Every
+# sample lands in all four; coarser ones outlive finer ones.
+RESOLUTIONS: Dict[str, Tuple[int, Optional[int]]] = {
+    "1m": (MINUTE_MS, 2 * DAY_MS),
+    "5m": (5 * MINUTE_MS, 30 * DAY_MS),
+    "1h": (60 * MINUTE_MS, 365 * DAY_MS),
+    "1d": (DAY_MS, None),
+}
+METRICS = ("oi", "global_long", "top_accounts_long", "top_positions_long", "funding", "basis")
+# Metrics Binance keeps history for: /futures/data endpoint and value field
+HISTORY = {
+    "oi": ("openInterestHist", "sumOpenInterest"),
+    "global_long": ("globalLongShortAccountRatio", "longAccount"),
+    "top_accounts_long": ("topLongShortAccountRatio", "longAccount"),
+    "top_positions_long": ("topLongShortPositionRatio", "longAccount"),
+}
+HISTORY_RESOLUTIONS = ("5m", "1h", "1d")  # /futures/data has no 1m period
+HISTORY_DAYS = 30    # how far back /futures/data goes
+HISTORY_LIMIT = 500  # points per /futures/data request, its maximum
+MAX_POINTS = 2000    # per metric in one query
+PRUNE_INTERVAL = 3600.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    res INTEGER NOT NULL,         -- bucket width, ms
+    symbol TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    ts INTEGER NOT NULL,          -- bucket start, epoch ms
+    close REAL NOT NULL,          -- latest value in the bucket
+    low REAL NOT NULL,
+    high REAL NOT NULL,
+    total REAL NOT NULL,          -- sum of the samples, mean = total / n
+    n INTEGER NOT NULL,
+    last_ts INTEGER NOT NULL,     -- time of the sample behind `close`
+    PRIMARY KEY (res, symbol, metric, ts)
+) WITHOUT ROWID;
+"""
+
+# Merges a partial bucket into the stored one, so any number of flushes (and
+# the rollups, which are just the same deltas on wider buckets) add up exactly
+UPSERT = """
+INSERT INTO series VALUES (?,?,?,?,?,?,?,?,?,?)
+ON CONFLICT (res, symbol, metric, ts) DO UPDATE SET
+    close = CASE WHEN excluded.last_ts >= series.last_ts THEN excluded.close ELSE series.close END,
+    low = MIN(series.low, excluded.low),
+    high = MAX(series.high, excluded.high),
+    total = series.total + excluded.total,
+    n = series.n + excluded.n,
+    last_ts = MAX(series.last_ts, excluded.last_ts)
+"""
+
+SERIES_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_series_store_seconds", "Time-series store work on its database thread", ("op",))
+WRITE_SECONDS = SERIES_SECONDS.labels("write")
+QUERY_SECONDS = SERIES_SECONDS.labels("query")
+PRUNE_SECONDS = SERIES_SECONDS.labels("prune")
+
+
+def now_ms() -> int:
+    return int(time.time() * 1000)
+
+
+class SeriesStore:
+    """
+    Per-symbol history of open interest, the three long/short account
+    shares, funding and basis, in SQLite at 1m/5m/1h/1d resolution.
+
+    Samples are folded into per-minute partial buckets in memory and
+    group-committed like SignalStore's inserts; each flush upserts those
+    deltas into the bucket of every resolution, so the rollups are always
+    current without re-reading finer rows. Expired rows are pruned per
+    resolution at most hourly. The first use of a symbol backfills what
+    Binance still has (the last 30 days of OI and ratios) into the buckets
+    the store has no rows for yet, paging back with `endTime` 500 points at a
+    time. The database is opened by `open()` at startup; all its work runs on
+    one dedicated thread, and queries are range scans of the primary key.
+    """
+
+    def __init__(self, path: str, rest: Optional[RestScheduler] = None, flush_interval: float = 10.0):
+        self.path = path
+        self.rest = rest or RestScheduler()
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="series-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        # (symbol, metric, minute) -> [close, low, high, total, n, last_ts]
+        self._pending: Dict[Tuple[str, str, int], list] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._backfills: Dict[str, asyncio.Task] = {}
+        self._pruned_at = 0.0
+        self.samples = 0
+        self.rows_written = 0
+        self.backfilled_points = 0
+
+    # Runs on the store thread
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._conn = conn
+
+    def _write(self, rows: List[tuple]):
+        start = time.perf_counter()
+        with self._conn:
+            self._conn.executemany(UPSERT, rows)
+        WRITE_SECONDS.observe(time.perf_counter() - start)
+        if time.time() - self._pruned_at > PRUNE_INTERVAL:
+            self._prune()
+
+    def _prune(self):
+        start = time.perf_counter()
+        now = now_ms()
+        with self._conn:
+            for bucket, retention in RESOLUTIONS.values():
+                if retention is not None:
+                    self._conn.execute("DELETE FROM series WHERE res = ? AND ts < ?", (bucket, now - retention))
+        self._pruned_at = time.time()
+        PRUNE_SECONDS.observe(time.perf_counter() - start)
+
+    def _gaps(self, symbol: str, now: int) -> List[Tuple[str, str, int, int]]:
+        """
+        (metric, resolution, start, end): runs of closed buckets in the
+        backfill horizon with no row, so a page that failed earlier is found
+        again even after newer ones succeeded.
+        """
+        gaps = []
+        for metric in HISTORY:
+            for res in HISTORY_RESOLUTIONS:
+                bucket, retention = RESOLUTIONS[res]
+                horizon = min(HISTORY_DAYS * DAY_MS, retention or HISTORY_DAYS * DAY_MS)
+                expected = (now - horizon) // bucket * bucket + bucket
+                top = now // bucket * bucket
+                rows = self._conn.execute(
+                    "SELECT ts FROM series WHERE res = ? AND symbol = ? AND metric = ? AND ts >= ? AND ts < ? "
+                    "ORDER BY ts", (bucket, symbol, metric, expected, top))
+                for (ts,) in rows:
+                    if ts > expected:
+                        gaps.append((metric, res, expected, ts))
+                    expected = ts + bucket
+                if expected < top:
+                    gaps.append((metric, res, expected, top))
+        return gaps
+
+    def _query(self, symbol: str, metrics: Iterable[str], bucket: int, start: int, end: int) -> List[tuple]:
+        t0 = time.perf_counter()
+        rows = []
+        for metric in metrics:
+            # Newest MAX_POINTS in range, returned oldest first
+            cur = self._conn.execute(
+                "SELECT metric, ts, close, low, high, total, n FROM series "
+                "WHERE res = ? AND symbol = ? AND metric = ? AND ts >= ? AND ts <= ? ORDER BY ts DESC LIMIT ?",
+                (bucket, symbol, metric, start // bucket * bucket, end, MAX_POINTS))
+            rows.extend(reversed(cur.fetchall()))
+        QUERY_SECONDS.observe(time.perf_counter() - t0)
+        return rows
+
+    # Event loop side
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        """Opens the database; call once before use."""
+        if self._conn is None:
+            await self._run(self._open)
+
+    def add(self, symbol: str, metric: str, ts: int, value: float):
+        """Folds one sample into its minute's partial bucket; never blocks."""
+        key = (symbol, metric, ts // MINUTE_MS * MINUTE_MS)
+        bucket = self._pending.get(key)
+        if bucket is None:
+            self._pending[key] = [value, value, value, value, 1, ts]
+        else:
+            if ts >= bucket[5]:
+                bucket[0], bucket[5] = value, ts
+            if value < bucket[1]:
+                bucket[1] = value
+            elif value > bucket[2]:
+                bucket[2] = value
+            bucket[3] += value
+            bucket[4] += 1
+        self.samples += 1
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        await asyncio.sleep(self.flush_interval)
+        await self.flush()
+
+    async def flush(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
+        # Every minute delta goes into its bucket at each resolution, merged here first
+        merged: Dict[tuple, list] = {}
+        for (symbol, metric, minute), delta in pending.items():
+            for bucket, _ in RESOLUTIONS.values():
+                key = (bucket, symbol, metric, minute // bucket * bucket)
+                row = merged.get(key)
+                if row is None:
+                    merged[key] = list(delta)
+                else:
+                    if delta[5] >= row[5]:
+                        row[0], row[5] = delta[0], delta[5]
+                    row[1] = min(row[1], delta[1])
+                    row[2] = max(row[2], delta[2])
+                    row[3] += delta[3]
+                    row[4] += delta[4]
+        rows = [key + tuple(row) for key, row in merged.items()]
+        try:
+            await self._run(self._write, rows)
+            self.rows_written += len(rows)
+        except Exception as e:
+            logger.error(f"Series write error: {e}")
+
+    async def backfill(self, symbol: str):
+        """Loads the Binance history a symbol is missing, once per process; concurrent callers share it."""
+        task = self._backfills.get(symbol)
+        if task is None:
+            task = self._backfills[symbol] = asyncio.create_task(self._backfill(symbol))
+        await asyncio.shield(task)
+
+    async def _backfill(self, symbol: str):
+        now = now_ms()
+        try:
+            gaps = await self._run(self._gaps, symbol, now)
+        except Exception as e:
+            logger.error(f"Series backfill error for {symbol}: {e}")
+            self._backfills.pop(symbol, None)
+            return
+        fetches = []
+        for metric, res, start, end in gaps:
+            endpoint, field = HISTORY[metric]
+            bucket = RESOLUTIONS[res][0]
+            missing = (end - start) // bucket
+            # One request returns HISTORY_LIMIT points at most (~1.7 days at 5m), so
+            # each gap is split into pages ending HISTORY_LIMIT buckets apart
+            for page in range(0, missing, HISTORY_LIMIT):
+                fetches.append(self._fetch_history(symbol, metric, res, endpoint, field,
+                                                   min(missing - page, HISTORY_LIMIT), start - 1,
+                                                   end - page * bucket))
+        if not fetches:
+            return
+        results = await asyncio.gather(*fetches, return_exceptions=True)
+        rows = []
+        errors = [r for r in results if isinstance(r, Exception)]
+        for result in results:
+            if not isinstance(result, Exception):
+                rows.extend(result)
+        if errors:
+            logger.warning(f"Series backfill for {symbol}: {len(errors)} of {len(results)} requests failed ({errors[-1]})")
+            # Retry the gaps on next use, unless Binance rejected the request itself (e.g. unknown symbol)
+            if not all(isinstance(e, HttpError) and 400 <= e.status < 500 and e.status not in (418, 429)
+                       for e in errors):
+                self._backfills.pop(symbol, None)
+        if rows:
+            try:
+                await self._run(self._write, rows)
+            except Exception as e:
+                logger.error(f"Series write error: {e}")
+                return
+            self.rows_written += len(rows)
+            self.backfilled_points += len(rows)
+            logger.info(f"Backfilled {len(rows)} history points for {symbol}")
+
+    async def _fetch_history(self, symbol: str, metric: str, res: str, endpoint: str, field: str,
+                             limit: int, since: int, end: int) -> List[tuple]:
+        """The `limit` buckets before `end` (a bucket start) that are newer than `since`."""
+        bucket = RESOLUTIONS[res][0]
+        data = await self.rest.futures_data(endpoint, symbol, res, limit, end_time=end - 1, background=True)
+        rows = []
+        for point in data:
+            ts = int(point["timestamp"])
+            # Only whole buckets the store has not seen; the open one is live data's
+            if since < ts // bucket * bucket < end:
+                value = float(point[field])
+                rows.append((bucket, symbol, metric, ts // bucket * bucket, value, value, value, value, 1, ts))
+        return rows
+
+    @staticmethod
+    def resolution_for(start: int, end: int, now: Optional[int] = None) -> str:
+        """The finest resolution that still holds `start` and fits the range in MAX_POINTS buckets."""
+        now = now or now_ms()
+        for res, (bucket, retention) in RESOLUTIONS.items():
+            if (retention is None or start >= now - retention) and (end - start) // bucket <= MAX_POINTS:
+                return res
+        return "1d"
+
+    async def query(self, symbol: str, metrics: Iterable[str] = METRICS, start: Optional[int] = None,
+                    end: Optional[int] = None, resolution: Optional[str] = None) -> dict:
+        """Buckets per metric between `start` and `end` (epoch ms), oldest first."""
+        end = end or now_ms()
+        start = start if start is not None else end - 7 * DAY_MS
+        metrics = [m for m in metrics if m in METRICS]
+        res = resolution if resolution in RESOLUTIONS else self.resolution_for(start, end)
+        await self.backfill(symbol)
+        await self.flush()  # read-your-writes for samples still in memory
+        series: Dict[str, List[dict]] = {metric: [] for metric in metrics}
+        try:
+            rows = await self._run(self._query, symbol, metrics, RESOLUTIONS[res][0], start, end)
+        except Exception as e:
+            logger.error(f"Series query error: {e}")
+            rows = []
+        for metric, ts, close, low, high, total, n in rows:
+            series[metric].append({"time": ts, "value": close, "mean": total / n, "low": low, "high": high})
+        return {"symbol": symbol, "resolution": res, "start": start, "end": end, "series": series}
+
+    def stats(self) -> dict:
+        return {
+            "samples": self.samples,
+            "pending": len(self._pending),
+            "rows_written": self.rows_written,
+            "backfilled_symbols": len(self._backfills),
+            "backfilled_points": self.backfilled_points,
+        }
+
+    async def close(self):
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
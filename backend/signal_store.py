@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from metrics import REGISTRY
+
+logger = logging.getLogger("SignalStore")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    ts INTEGER NOT NULL,          -- epoch milliseconds
+    symbol TEXT NOT NULL,
+    price REAL,
+    rsi REAL,
+    delta REAL,
+    top_ratio REAL
+);
+CREATE INDEX IF NOT EXISTS idx_signals_ts ON signals (ts);
+CREATE INDEX IF NOT EXISTS idx_signals_symbol_ts ON signals (symbol, ts);
+"""
+
+SQLITE_SECONDS = REGISTRY.histogram(
+    "cryptoterminal_sqlite_seconds", "Signal store work on its database thread", ("op",))
+INSERT_SECONDS = SQLITE_SECONDS.labels("insert")
+QUERY_SECONDS = SQLITE_SECONDS.labels("query")
+
+
+class SignalStore:
+    """
+    Scanner signal persistence on one long-lived SQLite connection, opened by
+    `open()` at startup rather than on construction.
+
+    All database work runs on a dedicated single-thread executor, so the event
+    loop never blocks on disk and the connection is only ever touched by one
+    thread. Inserts are buffered and group-committed: a batch is written once
+    `batch_size` rows are pending or `flush_interval` seconds after the first.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100, flush_interval: float = 1.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="signal-store")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pending: List[tuple] = []
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._flushes: Set[asyncio.Task] = set()
+
+    # Runs on the store thread
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate(conn)
+        conn.executescript(SCHEMA)
+        conn.commit()
+        self._conn = conn
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """
+        Converts the original ISO-text `timestamp` table to epoch-ms `ts` in
+        one transaction. A `signals_legacy` table left behind by an interrupted
+        earlier migration is copied in and dropped the same way.
+        """
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(signals)")]
+        if "timestamp" not in columns and "signals_legacy" not in tables:
+            return
+        logger.info("Migrating signals table to integer timestamps...")
+        # executescript() would commit mid-way, so every statement is a plain execute()
+        conn.execute("BEGIN")
+        try:
+            if "timestamp" in columns:
+                conn.execute("ALTER TABLE signals RENAME TO signals_legacy")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            rows = conn.execute(
+                "SELECT timestamp, symbol, price, rsi, delta, top_ratio FROM signals_legacy"
+            )
+            while True:
+                chunk = rows.fetchmany(10_000)
+                if not chunk:
+                    break
+                conn.executemany(
+                    "INSERT INTO signals VALUES (?,?,?,?,?,?)",
+                    [(_iso_to_ms(r[0]),) + tuple(r[1:]) for r in chunk if r[0]],
+                )
+            conn.execute("DROP TABLE signals_legacy")
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _insert_many(self, rows: List[tuple]):
+        start = time.perf_counter()
+        with self._conn:
+            self._conn.executemany("INSERT INTO signals VALUES (?,?,?,?,?,?)", rows)
+        INSERT_SECONDS.observe(time.perf_counter() - start)
+
+    def _query_recent(self, limit: int, symbol: Optional[str]) -> List[tuple]:
+        start = time.perf_counter()
+        if symbol:
+            cur = self._conn.execute(
+                "SELECT * FROM signals WHERE symbol = ? ORDER BY ts DESC LIMIT ?", (symbol, limit)
+            )
+        else:
+            cur = self._conn.execute("SELECT * FROM signals ORDER BY ts DESC LIMIT ?", (limit,))
+        rows = cur.fetchall()
+        QUERY_SECONDS.observe(time.perf_counter() - start)
+        return rows
+
+    # Event loop side
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self):
+        """Opens (and if needed migrates) the database; call once before use."""
+        if self._conn is None:
+            await self._run(self._open)
+
+    def add(self, signal: Dict):
+        """Buffers a signal for the next group commit; never blocks."""
+        self._pending.append((
+            _iso_to_ms(signal["timestamp"]), signal["symbol"], signal["price"],
+            signal["rsi"], signal["delta"], signal["top_ratio"],
+        ))
+        if len(self._pending) == self.batch_size:  # once per batch, the flush takes them all
+            self._flush_now()
+        elif self._flush_timer is None:
+            self._flush_timer = asyncio.get_running_loop().call_later(self.flush_interval, self._flush_now)
+
+    def _flush_now(self):
+        task = asyncio.create_task(self.flush())
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def flush(self):
+        # A timer is only pending while rows are; whoever takes the rows cancels it
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        try:
+            await self._run(self._insert_many, rows)
+        except Exception as e:
+            logger.error(f"DB Error: {e}")
+
+    async def recent(self, limit: int = 20, symbol: Optional[str] = None) -> List[Dict]:
+        await self.flush()  # read-your-writes for signals still in the buffer
+        try:
+            rows = await self._run(self._query_recent, limit, symbol)
+        except Exception as e:
+            logger.error(f"DB Fetch Error: {e}")
+            return []
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(r[0] / 1000).isoformat(),
+                "symbol": r[1],
+                "price": r[2],
+                "rsi": r[3],
+                "delta": r[4],
+                "top_ratio": r[5]
+            } for r in rows
+        ]
+
+    async def close(self):
+        await self.flush()
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=False)
+
+
+def _iso_to_ms(value: str) -> int:
+    # Signals carry naive local-time ISO strings (datetime.now().isoformat())
+    return int(datetime.fromisoformat(value).timestamp() * 1000)
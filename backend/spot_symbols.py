@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("SpotSymbols")
+
+# Futures contracts on low-priced coins quote a multiple of the coin:
+# 1000PEPE, 1000000MOG, 1MBABYDOGE (1M = one million)
+MULTIPLIER_PREFIX = re.compile(r"^(\d+)(M?)([A-Z].*)$")
+
+
+def build_spot_map(futures_info: dict, spot_symbols) -> Dict[str, Tuple[str, float]]:
+    """
+    Maps each perpetual futures symbol to (spot symbol, multiplier), where
+    futures price ~= spot price * multiplier. Contracts without a spot market
+    are left out.
+    """
+    mapping = {}
+    for s in futures_info.get("symbols", []):
+        if s.get("contractType") != "PERPETUAL":
+            continue
+        base, quote = s["baseAsset"], s["quoteAsset"]
+        if base + quote in spot_symbols:
+            mapping[s["symbol"]] = (base + quote, 1.0)
+            continue
+        m = MULTIPLIER_PREFIX.match(base)
+        if m and m.group(3) + quote in spot_symbols:
+            multiplier = int(m.group(1)) * (1_000_000 if m.group(2) else 1)
+            mapping[s["symbol"]] = (m.group(3) + quote, float(multiplier))
+    return mapping
+
+
+class SpotSymbolMap:
+    """
+    Cached futures -> spot symbol table, built once from futures exchangeInfo
+    plus the spot price list (which doubles as the initial spot prices).
+    """
+
+    def __init__(self, max_age: float = 6 * 3600):
+        self.max_age = max_age
+        self.to_spot: Dict[str, Tuple[str, float]] = {}
+        self.to_futures: Dict[str, List[Tuple[str, float]]] = {}
+        self.prices: Dict[str, float] = {}
+        self.loaded_at = 0.0
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.loaded_at > self.max_age
+
+    async def load(self, rest):
+        futures_info, prices = await asyncio.gather(rest.exchange_info(), rest.spot_prices())
+        self.to_spot = build_spot_map(futures_info, prices)
+        self.to_futures = {}
+        for futures_symbol, (spot_symbol, multiplier) in self.to_spot.items():
+            self.to_futures.setdefault(spot_symbol, []).append((futures_symbol, multiplier))
+        self.prices = {symbol: float(price) for symbol, price in prices.items()}
+        self.loaded_at = time.time()
+        logger.info(f"Mapped {len(self.to_spot)} futures symbols to spot markets")
+
+    def spot_symbol(self, futures_symbol: str) -> Optional[str]:
+        entry = self.to_spot.get(futures_symbol)
+        return entry[0] if entry else None
+
+    def spot_price(self, futures_symbol: str) -> float:
+        """Last spot price from the load, scaled to the futures contract (0 if unknown)."""
+        entry = self.to_spot.get(futures_symbol)
+        if not entry or entry[0] not in self.prices:
+            return 0.0
+        return self.prices[entry[0]] * entry[1]
+
+    def futures_for(self, spot_symbol: str) -> List[Tuple[str, float]]:
+        return self.to_futures.get(spot_symbol, [])
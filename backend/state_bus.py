@@ -0,0 +1,481 @@
+"""
+State bus: the link between one ingestion process and any number of
+stateless API/WebSocket worker processes (SERVICE_MODE=ingest / api).
+
+The ingestion process owns the exchange connections, the scanner and the
+pollers, and publishes every watched symbol's channel snapshots and patches
+(the same messages /ws clients get) over a local Unix socket. Each worker
+mirrors the channels its own dashboards watch and fans them out; it tells
+the ingestion side which symbols and channels it needs, and forwards
+one-off queries (/signals, /news, ...) to it.
+
+Frames are a 4-byte big-endian length followed by a JSON object with an
+`op`: worker -> ingest `acquire`, `release`, `watch`, `resync`, `query`;
+ingest -> worker `msg`, `doc`, `reply`.
+"""
+import asyncio
+import itertools
+import logging
+import os
+import struct
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from broadcaster import ConnectionManager, LatencyStats, EVENT_LATENCY
+from market_state import CHANNELS
+from wire_format import decode_message, encode_message
+
+logger = logging.getLogger("StateBus")
+
+STATE_BUS_PATH = os.getenv("STATE_BUS_PATH", "/tmp/cryptoterminal-state.sock")
+BUS_QUEUE_SIZE = 10_000  # frames buffered per worker before it is resynced
+BUS_RETRY_SECONDS = 1.0
+QUERY_TIMEOUT = 10.0
+
+_HEADER = struct.Struct(">I")
+
+
+class BusUnavailable(Exception):
+    """The ingestion process is not reachable (or did not answer in time)."""
+
+
+def encode_frame(message: dict) -> bytes:
+    body = encode_message(message).encode()
+    return _HEADER.pack(len(body)) + body
+
+
+async def read_frame(reader: asyncio.StreamReader) -> dict:
+    (size,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return decode_message(await reader.readexactly(size))
+
+
+# Ingestion side
+
+class BusWorker:
+    """
+    One connected worker process as seen by the publisher: the channels it
+    watches per symbol, the ones it needs a snapshot of, and a bounded send
+    queue drained by its own writer task (like a ClientConnection).
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter, max_queue: int = BUS_QUEUE_SIZE):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.watching: Dict[str, Set[str]] = {}
+        self.needs_snapshot: Set[Tuple[str, str]] = set()
+        self.acquired: Set[str] = set()
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.frames_dropped = 0
+
+    def wants(self, symbol: str, channel: str) -> bool:
+        return channel in self.watching.get(symbol, ()) and (symbol, channel) not in self.needs_snapshot
+
+    def offer(self, frame: bytes):
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            # Patches chain on each other: drop the backlog, resend snapshots
+            while not self.queue.empty():
+                self.queue.get_nowait()
+                self.frames_dropped += 1
+            self.frames_dropped += 1
+            self.needs_snapshot = {(s, c) for s, channels in self.watching.items() for c in channels}
+
+    async def run_writer(self):
+        while True:
+            frames = [await self.queue.get()]
+            while not self.queue.empty():
+                frames.append(self.queue.get_nowait())
+            data = b"".join(frames)
+            self.writer.write(data)
+            await self.writer.drain()
+            self.frames_sent += len(frames)
+            self.bytes_sent += len(data)
+
+
+class StatePublisher(ConnectionManager):
+    """
+    ConnectionManager for the ingestion process: local /ws clients work as
+    usual, and every connected worker counts as one more subscriber of the
+    symbols and channels it watches, so the same event-driven flush loop
+    renders each patch once and hands it to clients and workers alike.
+    """
+
+    def __init__(self, max_queue: int = BUS_QUEUE_SIZE):
+        super().__init__()
+        self.bus_queue = max_queue
+        self.workers: Set[BusWorker] = set()
+        self.departed = {"sent": 0, "bytes_sent": 0, "dropped": 0}  # totals of workers that left
+        self.docs: Dict[str, Any] = {}
+        self.latency["bus"] = LatencyStats(histogram=EVENT_LATENCY.labels("bus"))
+        self.registry = None
+        self.queries: Dict[str, Callable[..., Awaitable[Any]]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def serve(self, registry, queries: Dict[str, Callable[..., Awaitable[Any]]], path: str = STATE_BUS_PATH):
+        """Starts accepting workers; `registry` hands out states, `queries` answers their one-off requests."""
+        self.registry = registry
+        self.queries = queries
+        if os.path.exists(path):
+            os.unlink(path)  # left over from a previous run
+        self._server = await asyncio.start_unix_server(self._handle_worker, path)
+        logger.info(f"State bus listening on {path}")
+
+    async def close(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def publish_doc(self, name: str, value: Any):
+        """Market-wide document (e.g. the symbol universe) sent to every worker, and to new ones on connect."""
+        self.docs[name] = value
+        frame = encode_frame({"op": "doc", "name": name, "value": value})
+        for worker in self.workers:
+            worker.offer(frame)
+
+    async def _handle_worker(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = BusWorker(writer, self.bus_queue)
+        self.workers.add(worker)
+        writer_task = asyncio.create_task(worker.run_writer())
+        logger.info(f"Worker connected ({len(self.workers)} total)")
+        for name, value in self.docs.items():
+            worker.offer(encode_frame({"op": "doc", "name": name, "value": value}))
+        try:
+            while True:
+                self._handle_request(worker, await read_frame(reader))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Worker connection error: {e}")
+        finally:
+            self.workers.discard(worker)
+            self.departed["sent"] += worker.frames_sent
+            self.departed["bytes_sent"] += worker.bytes_sent
+            self.departed["dropped"] += worker.frames_dropped
+            writer_task.cancel()
+            writer.close()
+            for symbol in worker.acquired:
+                asyncio.create_task(self.registry.release(symbol))
+            logger.info(f"Worker disconnected ({len(self.workers)} left)")
+
+    def _handle_request(self, worker: BusWorker, message: dict):
+        op = message.get("op")
+        symbol = message.get("symbol")
+        if op == "acquire" and symbol not in worker.acquired:
+            worker.acquired.add(symbol)
+            # Subscribing a new symbol fetches its history first; do not hold up the socket
+            asyncio.create_task(self.registry.acquire(symbol))
+        elif op == "release" and symbol in worker.acquired:
+            worker.acquired.discard(symbol)
+            worker.watching.pop(symbol, None)
+            worker.needs_snapshot = {key for key in worker.needs_snapshot if key[0] != symbol}
+            asyncio.create_task(self.registry.release(symbol))
+        elif op == "watch" and symbol in worker.acquired:
+            channels = {c for c in message.get("channels", ()) if c in CHANNELS}
+            previous = worker.watching.get(symbol, set())
+            worker.watching[symbol] = channels
+            worker.needs_snapshot -= {(symbol, c) for c in previous - channels}
+            worker.needs_snapshot |= {(symbol, c) for c in channels - previous}
+            self.notifier.notify()
+        elif op == "resync" and message.get("channel") in worker.watching.get(symbol, ()):
+            worker.needs_snapshot.add((symbol, message["channel"]))
+            self.notifier.notify()
+        elif op == "query":
+            asyncio.create_task(self._answer(worker, message))
+
+    async def _answer(self, worker: BusWorker, message: dict):
+        reply = {"op": "reply", "id": message.get("id")}
+        try:
+            reply["value"] = await self.queries[message["name"]](**message.get("args", {}))
+        except Exception as e:
+            reply["error"] = f"{type(e).__name__}: {e}"
+        worker.offer(encode_frame(reply))
+
+    # ConnectionManager hooks: workers count as subscribers too
+
+    def symbols(self) -> List[str]:
+        symbols = set(super().symbols())
+        for worker in self.workers:
+            symbols.update(worker.watching)
+        return list(symbols)
+
+    def has_subscribers(self, symbol: str, channel: str) -> bool:
+        return super().has_subscribers(symbol, channel) or any(
+            channel in w.watching.get(symbol, ()) for w in self.workers
+        )
+
+    def awaiting_snapshot(self, symbol: str, channel: str) -> bool:
+        return super().awaiting_snapshot(symbol, channel) or any(
+            (symbol, channel) in w.needs_snapshot for w in self.workers
+        )
+
+    def broadcast(self, message: dict, symbol: str, channel: str, event_time: int = 0) -> int:
+        sent = super().broadcast(message, symbol, channel, event_time)
+        frame = None
+        for worker in self.workers:
+            if worker.wants(symbol, channel):
+                if frame is None:
+                    frame = encode_frame({"op": "msg", "symbol": symbol, "event": event_time, "msg": message})
+                worker.offer(frame)
+                sent += 1
+        if frame is not None and event_time:
+            self.latency["bus"].add(time.time() * 1000 - event_time)
+        return sent
+
+    def send_snapshots(self, snapshot: dict, symbol: str, channel: str):
+        super().send_snapshots(snapshot, symbol, channel)
+        frame = None
+        for worker in self.workers:
+            if (symbol, channel) in worker.needs_snapshot:
+                worker.needs_snapshot.discard((symbol, channel))
+                if frame is None:
+                    frame = encode_frame({"op": "msg", "symbol": symbol, "event": 0, "msg": snapshot})
+                worker.offer(frame)
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["workers"] = {
+            "connected": len(self.workers),
+            "queued": sum(w.queue.qsize() for w in self.workers),
+            "sent": self.departed["sent"] + sum(w.frames_sent for w in self.workers),
+            "bytes_sent": self.departed["bytes_sent"] + sum(w.bytes_sent for w in self.workers),
+            "dropped": self.departed["dropped"] + sum(w.frames_dropped for w in self.workers),
+        }
+        return stats
+
+
+# Worker side
+
+class StateMirror:
+    """
+    One symbol's channels as a worker last received them: each channel's
+    wire paths and seq, kept from its snapshot plus every patch since, so new
+    dashboards get a snapshot without a round trip to the ingestion process.
+    """
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.values: Dict[str, Dict[str, Any]] = {}
+        self.seqs: Dict[str, int] = {}
+
+    def synced(self, channel: str) -> bool:
+        return channel in self.seqs
+
+    def retain(self, channels: Iterable[str]):
+        """Forgets channels no longer watched; their patches stop coming."""
+        for channel in set(self.seqs) - set(channels):
+            self.drop(channel)
+
+    def drop(self, channel: str):
+        self.values.pop(channel, None)
+        self.seqs.pop(channel, None)
+
+    def apply(self, message: dict) -> bool:
+        """Applies a snapshot or patch; False on a seq gap (the channel then needs a new snapshot)."""
+        channel = message["channel"]
+        if message["type"] == "snapshot":
+            self.values[channel] = dict(message["set"])
+            self.seqs[channel] = message["seq"]
+            return True
+        seq = self.seqs.get(channel)
+        if seq is None or message["seq"] != seq + 1:
+            self.drop(channel)
+            return False
+        values = self.values[channel]
+        values.update(message.get("set", {}))
+        for path, tape in message.get("append", {}).items():
+            values[path] = _append_tape(values.get(path) or [], tape["items"], tape.get("key"))[-tape["max"]:]
+        self.seqs[channel] = message["seq"]
+        return True
+
+    def snapshot(self, channel: str) -> dict:
+        return {"type": "snapshot", "channel": channel, "seq": self.seqs[channel], "set": dict(self.values[channel])}
+
+
+def _append_tape(current: List, items: List, key: Optional[str]) -> List:
+    """Same rule as the dashboard: keyed tapes replace the entry with the same key."""
+    if not key:
+        return current + items
+    tape = list(current)
+    for item in items:
+        for i in range(len(tape) - 1, -1, -1):
+            if tape[i][key] == item[key]:
+                tape[i] = item
+                break
+        else:
+            tape.append(item)
+    return tape
+
+
+class StateSubscriber:
+    """
+    Worker end of the bus. Stands in for the SymbolRegistry in /ws
+    (`acquire` / `release` reference-count symbols with the ingestion
+    process) and feeds the worker's ConnectionManager: patches are forwarded
+    to in-sync dashboards as they arrive, snapshots are served from the
+    mirrors. Reconnects on its own; while the ingestion process is away,
+    dashboards simply receive nothing and resync once it is back.
+    """
+
+    def __init__(self, manager: ConnectionManager, universe=None, path: str = STATE_BUS_PATH):
+        self.manager = manager
+        self.universe = universe
+        self.path = path
+        self.mirrors: Dict[str, StateMirror] = {}
+        self.refcounts: Dict[str, int] = {}
+        self.watched: Dict[str, frozenset] = {}
+        self.docs: Dict[str, Any] = {}
+        self.messages = 0
+        self.gaps = 0
+        self.connects = 0
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._replies: Dict[int, asyncio.Future] = {}
+        self._ids = itertools.count(1)
+
+    @property
+    def states(self) -> Dict[str, StateMirror]:
+        return self.mirrors
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    async def acquire(self, symbol: str) -> StateMirror:
+        symbol = symbol.upper()
+        self.refcounts[symbol] = self.refcounts.get(symbol, 0) + 1
+        mirror = self.mirrors.get(symbol)
+        if mirror is None:
+            mirror = self.mirrors[symbol] = StateMirror(symbol)
+            self._send({"op": "acquire", "symbol": symbol})
+            self.manager.notifier.notify()
+        return mirror
+
+    async def release(self, symbol: str):
+        symbol = symbol.upper()
+        count = self.refcounts.get(symbol, 0) - 1
+        if count > 0:
+            self.refcounts[symbol] = count
+            return
+        self.refcounts.pop(symbol, None)
+        self.mirrors.pop(symbol, None)
+        self.watched.pop(symbol, None)
+        self._send({"op": "release", "symbol": symbol})
+
+    async def query(self, name: str, **args) -> Any:
+        """Runs a named query on the ingestion process."""
+        if self._writer is None:
+            raise BusUnavailable("state bus not connected")
+        request_id = next(self._ids)
+        future = asyncio.get_running_loop().create_future()
+        self._replies[request_id] = future
+        self._send({"op": "query", "id": request_id, "name": name, "args": args})
+        try:
+            return await asyncio.wait_for(future, QUERY_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise BusUnavailable(f"query {name} timed out")
+        finally:
+            self._replies.pop(request_id, None)
+
+    def _send(self, message: dict):
+        if self._writer is not None:
+            self._writer.write(encode_frame(message))
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError as e:
+                logger.warning(f"State bus {self.path} unavailable ({e}); retrying")
+                await asyncio.sleep(BUS_RETRY_SECONDS)
+                continue
+            self._writer = writer
+            self.connects += 1
+            logger.info(f"Connected to state bus {self.path}")
+            for symbol in self.refcounts:
+                self._send({"op": "acquire", "symbol": symbol})
+            sync_task = asyncio.create_task(self._sync_loop())
+            try:
+                while True:
+                    self._handle(await read_frame(reader))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                logger.warning("State bus connection lost")
+            except Exception as e:
+                logger.error(f"State bus error: {e}")
+            finally:
+                sync_task.cancel()
+                self._writer = None
+                writer.close()
+                self._reset()
+            await asyncio.sleep(BUS_RETRY_SECONDS)
+
+    def _reset(self):
+        """After a disconnect: nothing is in sync any more and pending queries fail."""
+        self.watched.clear()
+        for mirror in self.mirrors.values():
+            mirror.values.clear()
+            mirror.seqs.clear()
+        for client in list(self.manager.clients.values()):
+            client.resync()
+        for future in self._replies.values():
+            if not future.done():
+                future.set_exception(BusUnavailable("state bus disconnected"))
+
+    def _handle(self, message: dict):
+        op = message["op"]
+        if op == "msg":
+            self.messages += 1
+            symbol = message["symbol"]
+            mirror = self.mirrors.get(symbol)
+            if mirror is None:
+                return  # released meanwhile
+            msg = message["msg"]
+            channel = msg["channel"]
+            if not mirror.apply(msg):
+                self.gaps += 1
+                self._send({"op": "resync", "symbol": symbol, "channel": channel})
+            elif msg["type"] == "snapshot":
+                self._sync()
+            else:
+                self.manager.broadcast(msg, symbol, channel, message.get("event", 0))
+        elif op == "doc":
+            self.docs[message["name"]] = message["value"]
+            if message["name"] == "universe" and self.universe is not None:
+                self.universe.load(message["value"]["rows"], message["value"]["version"])
+        elif op == "reply":
+            future = self._replies.get(message.get("id"))
+            if future is not None and not future.done():
+                if "error" in message:
+                    future.set_exception(BusUnavailable(message["error"]))
+                else:
+                    future.set_result(message.get("value"))
+
+    async def _sync_loop(self):
+        while True:
+            self._sync()
+            await self.manager.notifier.wait(None)
+
+    def _sync(self):
+        """Tells the ingestion side what this worker's dashboards watch and serves waiting snapshots."""
+        if self._writer is None:
+            return
+        manager = self.manager
+        for symbol, mirror in self.mirrors.items():
+            channels = frozenset(c for c in CHANNELS if manager.has_subscribers(symbol, c))
+            if channels != self.watched.get(symbol):
+                self.watched[symbol] = channels
+                mirror.retain(channels)
+                self._send({"op": "watch", "symbol": symbol, "channels": sorted(channels)})
+            for channel in channels:
+                if mirror.synced(channel) and manager.awaiting_snapshot(symbol, channel):
+                    manager.send_snapshots(mirror.snapshot(channel), symbol, channel)
+
+    def stats(self) -> dict:
+        return {
+            "connected": self.connected,
+            "connects": self.connects,
+            "symbols": {symbol: sorted(mirror.seqs) for symbol, mirror in self.mirrors.items()},
+            "messages": self.messages,
+            "gaps": self.gaps,
+            "pending_queries": len(self._replies),
+        }
@@ -0,0 +1,148 @@
+import logging
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional
+
+from market_state import MarketState, TAPE_LIMITS
+from ring_buffer import RingBuffer
+
+logger = logging.getLogger("SymbolRegistry")
+
+# Unwatched symbols kept streaming so switching back is instant
+MAX_IDLE_SYMBOLS = int(os.getenv("MAX_IDLE_SYMBOLS", "5"))
+
+
+class SymbolRegistry:
+    """
+    Per-symbol MarketStates sharing one BinanceClient connection.
+
+    Symbols are reference-counted by the dashboards watching them. A symbol
+    nobody watches stays subscribed as idle until more than `max_idle` symbols
+    are idle, then the least recently used one is unsubscribed and dropped.
+
+    Market-wide data (global news, scanner output) is held here and fanned out
+    to every state, so each symbol's snapshot stays self-contained.
+    """
+
+    def __init__(self, client, max_idle: int = MAX_IDLE_SYMBOLS,
+                 on_added: Optional[Callable[[MarketState], None]] = None,
+                 on_change: Optional[Callable[[], None]] = None):
+        self.client = client
+        self.max_idle = max_idle
+        self.on_added = on_added
+        self.on_change = on_change  # handed to every state, see MarketState._touch
+        self.states: Dict[str, MarketState] = {}
+        self.refcounts: Dict[str, int] = {}
+        self._idle: "OrderedDict[str, None]" = OrderedDict()
+        self._subscribing: Dict[str, MarketState] = {}  # add_symbol still in flight
+
+        self.global_news: List[Dict] = []
+        self.scanner_signals = RingBuffer(TAPE_LIMITS["scannerSignals"])
+        self._scanner_status = "Initializing..."
+
+    def get(self, symbol: str) -> Optional[MarketState]:
+        return self.states.get(symbol.upper())
+
+    def __iter__(self):
+        return iter(list(self.states.values()))
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+    async def acquire(self, symbol: str) -> MarketState:
+        """Returns the live state for `symbol`, subscribing to it if needed."""
+        symbol = symbol.upper()
+        self.refcounts[symbol] = self.refcounts.get(symbol, 0) + 1
+        self._idle.pop(symbol, None)
+        state = self.states.get(symbol)
+        if state is not None:
+            return state
+
+        state = self._new_state(symbol)
+        self.states[symbol] = state
+        logger.info(f"Adding symbol {symbol} ({len(self.states)} active)")
+        self._subscribing[symbol] = state
+        try:
+            await self.client.add_symbol(symbol, state)
+        except Exception:
+            # Undo this acquire, so a failed SUBSCRIBE neither pins the symbol
+            # nor leaves a half-added state for the next acquire to return
+            count = self.refcounts.get(symbol, 0) - 1
+            if count > 0:
+                self.refcounts[symbol] = count
+            else:
+                self.refcounts.pop(symbol, None)
+            if self.states.get(symbol) is state:
+                del self.states[symbol]
+            if symbol not in self.states:
+                await self.client.remove_symbol(symbol)
+            raise
+        finally:
+            if self._subscribing.get(symbol) is state:
+                del self._subscribing[symbol]
+        if self.states.get(symbol) is not state:
+            # Released and evicted while the SUBSCRIBE was in flight, so it went out
+            # after the eviction; unsubscribe now unless the symbol was acquired again
+            if not self.refcounts.get(symbol):
+                await self.client.remove_symbol(symbol)
+            return state
+        if self.on_added:
+            self.on_added(state)
+        return state
+
+    async def release(self, symbol: str):
+        symbol = symbol.upper()
+        count = self.refcounts.get(symbol, 0) - 1
+        if count > 0:
+            self.refcounts[symbol] = count
+            return
+        self.refcounts.pop(symbol, None)
+        if symbol not in self.states:
+            return
+        self._idle[symbol] = None
+        self._idle.move_to_end(symbol)
+        while len(self._idle) > self.max_idle:
+            evicted, _ = self._idle.popitem(last=False)
+            await self._evict(evicted)
+
+    async def _evict(self, symbol: str):
+        logger.info(f"Evicting idle symbol {symbol}")
+        self.states.pop(symbol, None)
+        if symbol not in self._subscribing:  # otherwise acquire() unsubscribes once it is done
+            await self.client.remove_symbol(symbol)
+
+    def _new_state(self, symbol: str) -> MarketState:
+        state = MarketState(symbol=symbol)
+        state.on_change = self.on_change
+        state.global_news = self.global_news
+        state.load_scanner_signals(self.scanner_signals)
+        state.scanner_status = self._scanner_status
+        return state
+
+    # Market-wide fields, fanned out to every symbol
+
+    def set_global_news(self, news: List[Dict]):
+        self.global_news = news
+        for state in self.states.values():
+            state.global_news = news
+
+    @property
+    def scanner_status(self) -> str:
+        return self._scanner_status
+
+    @scanner_status.setter
+    def scanner_status(self, status: str):
+        self._scanner_status = status
+        for state in self.states.values():
+            state.scanner_status = status
+
+    def add_scanner_signal(self, signal: Dict):
+        self.scanner_signals.append(signal)
+        for state in self.states.values():
+            state.add_scanner_signal(signal)
+
+    def load_scanner_signals(self, signals: Iterable[Dict]):
+        self.scanner_signals.clear()
+        self.scanner_signals.extend(signals)
+        for state in self.states.values():
+            state.load_scanner_signals(self.scanner_signals)
@@ -0,0 +1,60 @@
+from indicators import MINUTE_MS, UniverseIndicators
+
+T0 = 1_700_000_040_000 // MINUTE_MS * MINUTE_MS
+# (close, base volume) of consecutive 1m klines
+SERIES = [(100 + i * 0.5, v) for i, v in enumerate(
+    [50, 42, 61, 38, 47, 55, 40, 39, 44, 52, 58, 36, 49, 45, 41, 60, 33, 30, 27, 29, 25, 22])]
+
+
+def kline(minute: int, close: float, volume: float) -> list:
+    start = T0 + minute * MINUTE_MS
+    return [start, str(close), str(close), str(close), str(close), str(volume), start + MINUTE_MS - 1]
+
+
+def ticker(ind: UniverseIndicators, symbol: str, ts: int, close: float):
+    ind.update([{"s": symbol, "c": str(close), "o": "100", "v": "123456"}], ts)
+
+
+def test_seed_volumes_are_kline_volumes():
+    ind = UniverseIndicators()
+    klines = [kline(m, c, v) for m, (c, v) in enumerate(SERIES[:17])]
+    ticker(ind, "BTCUSDT", T0 + 16 * MINUTE_MS + 5_000, SERIES[16][0])
+    ind.seed("BTCUSDT", klines)
+    i = ind.index["BTCUSDT"]
+    assert ind.volumes[i].tolist() == [v for _, v in SERIES[13:16]]
+    assert ind.live_volume[i] == SERIES[16][1]
+
+
+def test_stream_volumes_match_klines():
+    """Partial kline_1m updates, late final updates and quiet minutes all end up as the kline's own volume."""
+    ind = UniverseIndicators()
+    seeded = 17
+    ind.seed("BTCUSDT", [kline(m, c, v) for m, (c, v) in enumerate(SERIES[:seeded])])
+    i = ind.index["BTCUSDT"]
+    for minute in range(seeded - 1, len(SERIES)):
+        close, volume = SERIES[minute]
+        start = T0 + minute * MINUTE_MS
+        ticker(ind, "BTCUSDT", start + 100, close)
+        # Two partial updates, then the final one arrives after the ticker clock moved on
+        ind.update_kline("BTCUSDT", start, volume / 3)
+        ind.update_kline("BTCUSDT", start, volume * 2 / 3)
+        assert ind.live_volume[i] == volume * 2 / 3
+        ticker(ind, "BTCUSDT", start + MINUTE_MS + 100, close)
+        ind.update_kline("BTCUSDT", start, volume)
+        assert ind.volumes[i].tolist() == [v for _, v in SERIES[minute - 2:minute + 1]]
+        assert ind.live_volume[i] == 0.0
+
+    # A minute without trades has no kline update at all
+    ticker(ind, "BTCUSDT", T0 + (len(SERIES) + 1) * MINUTE_MS + 100, SERIES[-1][0])
+    assert ind.volumes[i].tolist() == [SERIES[-2][1], SERIES[-1][1], 0.0]
+
+
+def test_volume_decreasing_uses_live_and_closed_klines():
+    ind = UniverseIndicators()
+    ind.seed("BTCUSDT", [kline(m, c, v) for m, (c, v) in enumerate(SERIES)])
+    i = ind.index["BTCUSDT"]
+    # Closed ..., 27, 29, 25 and live 22: 22 < 25 but 25 < 29 too, so fading
+    assert ind.volumes[i].tolist() == [27, 29, 25]
+    assert ind.volume_decreasing()[i]
+    ind.update_kline("BTCUSDT", T0 + (len(SERIES) - 1) * MINUTE_MS, 26)
+    assert not ind.volume_decreasing()[i]
@@ -0,0 +1,59 @@
+import asyncio
+
+from http_client import HttpError
+from series_store import HISTORY, HISTORY_LIMIT, RESOLUTIONS, SeriesStore
+
+FIVE_MINUTES = RESOLUTIONS["5m"][0]
+FIELDS = {endpoint: field for endpoint, field in HISTORY.values()}
+
+
+class FakeRest:
+    """/futures/data with one point per bucket; the `fail_page`th 5m OI request fails once with a 503."""
+
+    def __init__(self, fail_page=None):
+        self.fail_page = fail_page
+        self.calls = []
+
+    async def futures_data(self, endpoint, symbol, period, limit=30, end_time=None, background=False):
+        self.calls.append((endpoint, period, end_time))
+        if endpoint == "openInterestHist" and period == "5m":
+            page = sum(1 for e, p, _ in self.calls if e == endpoint and p == period)
+            if page == self.fail_page:
+                self.fail_page = None
+                raise HttpError(503, f"/futures/data/{endpoint}")
+        bucket = RESOLUTIONS[period][0]
+        last = end_time // bucket * bucket
+        return [{"timestamp": ts, FIELDS[endpoint]: "1.0"}
+                for ts in range(last - (limit - 1) * bucket, last + 1, bucket)]
+
+
+async def stored(store: SeriesStore, metric: str, res: str):
+    rows = await store._run(lambda: store._conn.execute(
+        "SELECT ts FROM series WHERE res = ? AND symbol = 'BTCUSDT' AND metric = ? ORDER BY ts",
+        (RESOLUTIONS[res][0], metric)).fetchall())
+    return [ts for (ts,) in rows]
+
+
+def test_failed_middle_page_is_refetched(tmp_path):
+    async def run():
+        rest = FakeRest(fail_page=2)  # pages run newest first, so this is an older one
+        store = SeriesStore(str(tmp_path / "series.db"), rest)
+        await store.open()
+        await store.backfill("BTCUSDT")
+        pages = [end for endpoint, period, end in rest.calls if (endpoint, period) == ("openInterestHist", "5m")]
+        assert len(pages) > 2
+        holed = await stored(store, "oi", "5m")
+        assert any(b - a > FIVE_MINUTES for a, b in zip(holed, holed[1:]))
+        assert "BTCUSDT" not in store._backfills  # a 503 is retried on next use
+
+        rest.calls.clear()
+        await store.backfill("BTCUSDT")
+        # The hole is requested again (plus a bucket that may have closed meanwhile) and filled
+        oi_pages = [end for e, p, end in rest.calls if (e, p) == ("openInterestHist", "5m")]
+        assert pages[1] in oi_pages and len(oi_pages) <= 2
+        filled = await stored(store, "oi", "5m")
+        assert len(filled) >= len(holed) + HISTORY_LIMIT
+        assert all(b - a == FIVE_MINUTES for a, b in zip(filled, filled[1:]))
+        await store.close()
+
+    asyncio.run(run())
@@ -0,0 +1,115 @@
+import logging
+from typing import Dict, List, Optional, Tuple
+
+from wire_format import encode_message
+
+logger = logging.getLogger("SymbolUniverse")
+
+FIELDS = ("symbol", "price", "change", "volume")
+SORTS = {
+    # name: (row field, descending)
+    "volume": ("volume", True),
+    "gainers": ("change", True),
+    "losers": ("change", False),
+}
+STALE_MS = 3_600_000  # symbols silent this long (delisted/settled) drop out
+RESPONSE_CACHE = 32   # encoded pages kept per version
+
+
+class SymbolUniverse:
+    """
+    The USDT-perp universe served by /symbols, kept live from the all-ticker
+    frames the scanner already receives instead of a 24hr ticker download per
+    request.
+
+    Each frame only carries the tickers that changed, so rows are upserted in
+    place and `version` bumps. Sort orders are rebuilt lazily, at most once
+    per version, by re-sorting the previous order: between frames it is
+    nearly sorted already, which Timsort handles in close to linear time.
+    Encoded responses are cached per version, so repeated requests are
+    memory reads, and the version doubles as the ETag.
+    """
+
+    def __init__(self):
+        self.rows: Dict[str, dict] = {}
+        self.version = 0
+        self.last_event = 0
+        self._orders: Dict[str, Tuple[int, List[str]]] = {}
+        self._responses: Dict[tuple, Tuple[bytes, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    @property
+    def etag(self) -> str:
+        return f'"u{self.version}"'
+
+    def update(self, items: List[dict]):
+        """Applies one all-ticker frame (list of 24hrTicker payloads)."""
+        rows = self.rows
+        for item in items:
+            symbol = item["s"]
+            if not symbol.endswith("USDT"):
+                continue
+            rows[symbol] = {
+                "symbol": symbol,
+                "price": float(item["c"]),
+                "change": float(item["P"]),
+                "volume": float(item["q"]),  # quote volume, in USDT
+                "ts": item["E"],
+            }
+            if item["E"] > self.last_event:
+                self.last_event = item["E"]
+        self._bump()
+
+    def seed(self, rows: List[dict]):
+        """Fills the universe from REST rows before the stream has delivered a frame."""
+        for row in rows:
+            self.rows.setdefault(row["symbol"], dict(row, ts=self.last_event))
+        self._bump()
+
+    def load(self, rows: List[dict], version: int):
+        """
+        Replaces every row with a copy published by the ingestion process,
+        taking over its version so all API workers hand out the same ETags.
+        """
+        self.rows = {row["symbol"]: row for row in rows}
+        self.last_event = max((row["ts"] for row in rows), default=0)
+        self.version = version
+        self._responses.clear()
+
+    def _bump(self):
+        self.version += 1
+        self._responses.clear()
+
+    def order(self, sort: str) -> List[str]:
+        cached = self._orders.get(sort)
+        if cached and cached[0] == self.version:
+            return cached[1]
+        field, descending = SORTS[sort]
+        rows = self.rows
+        cutoff = self.last_event - STALE_MS
+        previous = cached[1] if cached else []
+        # Previous order first (nearly sorted), then any newly listed symbols
+        seen = set(previous)
+        symbols = [s for s in previous if s in rows and rows[s]["ts"] >= cutoff]
+        symbols += [s for s in rows if s not in seen and rows[s]["ts"] >= cutoff]
+        symbols.sort(key=lambda s: rows[s][field], reverse=descending)
+        self._orders[sort] = (self.version, symbols)
+        return symbols
+
+    def page(self, sort: str = "volume", offset: int = 0, limit: Optional[int] = None,
+             fields: Optional[Tuple[str, ...]] = None) -> Tuple[bytes, int]:
+        """Encoded JSON list for one page, plus the total number of symbols."""
+        key = (sort, offset, limit, fields)
+        cached = self._responses.get(key)
+        if cached is not None:
+            return cached
+        symbols = self.order(sort)
+        window = symbols[offset:offset + limit] if limit is not None else symbols[offset:]
+        fields = fields or FIELDS
+        body = encode_message([{f: self.rows[s][f] for f in fields} for s in window]).encode()
+        if len(self._responses) >= RESPONSE_CACHE:
+            self._responses.clear()
+        self._responses[key] = (body, len(symbols))
+        return body, len(symbols)
@@ -0,0 +1,90 @@
+import json
+from dataclasses import dataclass
+from typing import Any, Optional, Union
+
+try:
+    import orjson
+except ImportError:  # optional speedup
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional binary encoding
+    msgpack = None
+
+ENCODINGS = ("json", "msgpack") if msgpack is not None else ("json",)
+LAYOUTS = ("rows", "columnar")
+
+
+def encode_message(message: Any) -> str:
+    """Encodes a message once for every client; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, separators=(",", ":"))
+
+
+def decode_message(data: Union[str, bytes]) -> Any:
+    """Parses one JSON frame; uses orjson when installed."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+@dataclass(frozen=True)
+class WireFormat:
+    """
+    How one /ws client wants its frames:
+
+    - `encoding`: "json" (text frames, the default) or "msgpack" (binary
+      frames; needs the optional msgpack package)
+    - `layout`: "rows" (tapes as lists of objects, the default) or
+      "columnar" (tapes as one array per field, e.g. {"time": [...],
+      "close": [...]}, so keys are not repeated per entry)
+    """
+
+    encoding: str = "json"
+    layout: str = "rows"
+
+    @classmethod
+    def negotiate(cls, encoding: Optional[str] = None, layout: Optional[str] = None) -> "WireFormat":
+        """Requested format, falling back to the defaults for anything unknown or unavailable."""
+        return cls(
+            encoding if encoding in ENCODINGS else "json",
+            layout if layout in LAYOUTS else "rows",
+        )
+
+    def hello(self) -> dict:
+        """First frame on every connection (always JSON text) telling the client what it got."""
+        return {"type": "hello", "encoding": self.encoding, "layout": self.layout, "encodings": list(ENCODINGS)}
+
+    def encode(self, message: dict) -> Union[str, bytes]:
+        if self.layout == "columnar":
+            message = to_columnar(message)
+        if self.encoding == "msgpack":
+            return msgpack.packb(message)
+        return encode_message(message)
+
+
+DEFAULT_FORMAT = WireFormat()
+
+
+def columns(rows: Any) -> Any:
+    """A list of same-keyed objects as {key: [values]}; anything else unchanged."""
+    if not isinstance(rows, list) or not rows or not isinstance(rows[0], dict):
+        return rows
+    keys = rows[0].keys()
+    if not keys or any(row.keys() != keys for row in rows):
+        return rows
+    return {key: [row[key] for row in rows] for key in keys}
+
+
+def to_columnar(message: dict) -> dict:
+    """Columnar copy of a snapshot/patch: `set` values and `append` items become column dicts."""
+    if "set" not in message and "append" not in message:
+        return message
+    out = dict(message)
+    if "set" in message:
+        out["set"] = {path: columns(value) for path, value in message["set"].items()}
+    if "append" in message:
+        out["append"] = {path: dict(tape, items=columns(tape["items"])) for path, tape in message["append"].items()}
+    return out
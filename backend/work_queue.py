@@ -0,0 +1,63 @@
+import asyncio
+from typing import Any, Dict, Hashable, Tuple
+
+
+class CandidateQueue:
+    """
+    Bounded, deduplicating priority queue of scanner candidates.
+
+    Re-queuing a key that is already waiting replaces its payload (latest
+    frame wins) instead of adding a duplicate. When full, a new candidate
+    evicts the lowest-priority one if it outranks it, otherwise it is dropped.
+    The queue is small (tens of entries), so selection is a linear scan.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+        self._ready = asyncio.Event()
+        self.enqueued = 0
+        self.deduplicated = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._items
+
+    def put(self, key: Hashable, priority: float, payload: Any) -> bool:
+        """Returns False if the candidate was dropped."""
+        if key in self._items:
+            self._items[key] = (max(priority, self._items[key][0]), payload)
+            self.deduplicated += 1
+            return True
+        if len(self._items) >= self.maxsize:
+            lowest = min(self._items, key=lambda k: self._items[k][0])
+            if self._items[lowest][0] >= priority:
+                self.dropped += 1
+                return False
+            del self._items[lowest]
+            self.dropped += 1
+        self._items[key] = (priority, payload)
+        self.enqueued += 1
+        self._ready.set()
+        return True
+
+    async def get(self) -> Tuple[Hashable, Any]:
+        """Waits for and removes the highest-priority candidate."""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        key = max(self._items, key=lambda k: self._items[k][0])
+        _, payload = self._items.pop(key)
+        return key, payload
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "depth": len(self._items),
+            "capacity": self.maxsize,
+            "enqueued": self.enqueued,
+            "deduplicated": self.deduplicated,
+            "dropped": self.dropped,
+        }
@@ -14,6 +14,51 @@ export interface Liquidation {
     ts: number;
 }
 
+export interface Trade {
+    price: number;
+    quantity: number;
+    side: string; // taker side, "BUY" or "SELL"
+    timestamp: number;
+}
+
+export interface OrderBookMetrics {
+    synced: boolean;
+    bid?: number;
+    ask?: number;
+    mid?: number;
+    spread?: number;
+    spreadBps?: number;
+    // Quote notional within ±band% of mid; imbalance = (bid - ask) / (bid + ask)
+    depth?: { band: number; bid: number; ask: number; imbalance: number }[];
+    walls?: {
+        bid: { price: number; qty: number; notional: number }[];
+        ask: { price: number; qty: number; notional: number }[];
+    };
+    updateId?: number;
+    ts?: number;
+}
+
+export interface LiquidationTotals {
+    long: number;  // USD notional of longs liquidated (forced sells)
+    short: number; // USD notional of shorts liquidated (forced buys)
+}
+
+export interface LiquidationMap {
+    totals: { '1m': LiquidationTotals; '5m': LiquidationTotals; '1h': LiquidationTotals };
+    count: number;
+    // Sparse price x minute histogram: cell i sits in row rows[i] (minutes from
+    // start, oldest first) and between prices[bins[i]] and prices[bins[i] + 1]
+    heatmap: {
+        start: number;
+        bucketMs: number;
+        prices: number[];
+        rows: number[];
+        bins: number[];
+        long: number[];
+        short: number[];
+    };
+}
+
 export interface MarketState {
     symbol: string;
     price: number;
@@ -37,6 +82,9 @@ export interface MarketState {
         cvd: any[];
     };
     liquidations: Liquidation[];
+    trades?: Trade[]; // only with the opt-in 'tape' channel
+    book?: OrderBookMetrics; // only with the opt-in 'book' channel
+    liquidationMap?: LiquidationMap; // only with the opt-in 'heatmap' channel
     social?: {
         galaxyScore: number;
         altRank: number;
@@ -58,6 +106,78 @@ export interface MarketState {
     }[];
 }
 
+/** Channels the dashboard subscribes to; 'tape' (every trade) and 'book' (order book) are opt-in. */
+export const DEFAULT_CHANNELS = ['ticker', 'liquidations', 'ratios', 'social', 'news', 'scanner'];
+
+/**
+ * Messages from the backend are per channel, each channel with its own seq.
+ * A snapshot `set`s every path of its channel; a patch `set`s dotted paths and
+ * `append`s to tapes. Keyed tapes (live candles) replace the entry with the
+ * same key instead of appending.
+ */
+interface StatePatch {
+    type: 'patch' | 'snapshot';
+    channel: string;
+    seq: number;
+    set?: { [path: string]: any };
+    append?: { [path: string]: { items: any[]; max: number; key?: string } };
+}
+
+/** First frame on every connection: the wire format the server agreed to. */
+interface WireHello {
+    type: 'hello';
+    encoding: string;
+    layout: 'rows' | 'columnar';
+    encodings: string[];
+}
+
+/** Columnar layout sends tapes as {field: [values]}; turn one back into a list of objects. */
+function fromColumns(value: any): any {
+    if (!value || typeof value !== 'object' || Array.isArray(value)) return value;
+    const keys = Object.keys(value);
+    if (!keys.length || !keys.every(k => Array.isArray(value[k]))) return value;
+    return value[keys[0]].map((_: any, i: number) => Object.fromEntries(keys.map(k => [k, value[k][i]])));
+}
+
+function fromColumnar(msg: StatePatch): StatePatch {
+    const set = msg.set && Object.fromEntries(Object.entries(msg.set).map(([path, v]) => [path, fromColumns(v)]));
+    const append = msg.append && Object.fromEntries(
+        Object.entries(msg.append).map(([path, tape]) => [path, { ...tape, items: fromColumns(tape.items) }])
+    );
+    return { ...msg, set, append };
+}
+
+/** Copy-on-write update of a dotted path so OnChanges inputs see new references. */
+function setPath(target: any, path: string, update: (current: any) => any): any {
+    const [head, ...rest] = path.split('.');
+    const copy = { ...target };
+    copy[head] = rest.length ? setPath(target?.[head] ?? {}, rest.join('.'), update) : update(target?.[head]);
+    return copy;
+}
+
+function appendTape(current: any[], items: any[], key?: string): any[] {
+    if (!key) return current.concat(items);
+    const next = current.slice();
+    for (const item of items) {
+        let idx = next.length - 1;
+        while (idx >= 0 && next[idx][key] !== item[key]) idx--;
+        if (idx >= 0) next[idx] = item;
+        else next.push(item);
+    }
+    return next;
+}
+
+function applyPatch(state: MarketState, patch: StatePatch): MarketState {
+    let next: any = state;
+    for (const [path, value] of Object.entries(patch.set ?? {})) {
+        next = setPath(next, path, () => value);
+    }
+    for (const [path, tape] of Object.entries(patch.append ?? {})) {
+        next = setPath(next, path, (current: any[] = []) => appendTape(current, tape.items, tape.key).slice(-tape.max));
+    }
+    return next;
+}
+
 @Injectable({
     providedIn: 'root'
 })
@@ -65,6 +185,13 @@ export class MarketDataService {
     public apiUrl: string;
     private socket$: WebSocketSubject<any>;
     private stateSubject = new BehaviorSubject<MarketState | null>(null);
+    private channels = DEFAULT_CHANNELS;
+    private seqs: { [channel: string]: number } = {};
+    private draft: any = null;
+    private symbol: string | null = null;
+    private columnar = false;
+    // Channels whose patches are dropped until their next snapshot
+    private awaitingSnapshot = new Set<string>();
 
     public state$ = this.stateSubject.asObservable();
     public isConnected$ = new BehaviorSubject<boolean>(false);
@@ -73,7 +200,8 @@ export class MarketDataService {
         // Switch between Local and Production Backend
         const isLocal = window.location.hostname === 'localhost';
         this.apiUrl = isLocal ? 'http://localhost:8000' : 'https://cyptoterminal.onrender.com';
-        const wsUrl = isLocal ? 'ws://localhost:8000/ws' : 'wss://cyptoterminal.onrender.com/ws';
+        // Columnar tapes: field arrays instead of repeating keys per entry (negotiated, see WireHello)
+        const wsUrl = (isLocal ? 'ws://localhost:8000/ws' : 'wss://cyptoterminal.onrender.com/ws') + '?layout=columnar';
 
         this.socket$ = webSocket({
             url: wsUrl,
@@ -81,6 +209,9 @@ export class MarketDataService {
                 next: () => {
                     console.log('WebSocket connected');
                     this.isConnected$.next(true);
+                    // The server starts every connection on its default symbol and channels
+                    this.awaitingSnapshot = new Set(this.channels);
+                    this.socket$.next({ action: 'subscribe', symbol: this.symbol ?? undefined, channels: this.channels });
                 }
             },
             closeObserver: {
@@ -102,14 +233,50 @@ export class MarketDataService {
                 return EMPTY;
             })
         ).subscribe({
-            next: (data) => this.stateSubject.next(data),
+            next: (msg) => this.handleMessage(msg),
             error: (err) => console.error(err)
         });
     }
 
+    private handleMessage(raw: StatePatch | WireHello) {
+        if (raw.type === 'hello') {
+            this.columnar = raw.layout === 'columnar';
+            return;
+        }
+        const msg = this.columnar ? fromColumnar(raw) : raw;
+        const current = this.stateSubject.value;
+        if (msg.type === 'snapshot') {
+            this.seqs[msg.channel] = msg.seq;
+            this.awaitingSnapshot.delete(msg.channel);
+            if (current) {
+                this.stateSubject.next(applyPatch(current, msg));
+                return;
+            }
+            // First load: publish once every subscribed channel has arrived
+            this.draft = applyPatch(this.draft ?? {}, msg);
+            if (this.awaitingSnapshot.size === 0) {
+                this.stateSubject.next(this.draft);
+                this.draft = null;
+            }
+            return;
+        }
+        if (msg.type === 'patch' && current && !this.awaitingSnapshot.has(msg.channel)) {
+            if (msg.seq !== this.seqs[msg.channel] + 1) {
+                // Missed a patch; drop this channel's deltas until the server resends its snapshot
+                this.awaitingSnapshot.add(msg.channel);
+                this.socket$.next({ action: 'resync', channel: msg.channel });
+                return;
+            }
+            this.seqs[msg.channel] = msg.seq;
+            this.stateSubject.next(applyPatch(current, msg));
+        }
+    }
+
     public changeSymbol(symbol: string) {
+        this.symbol = symbol;
         if (this.socket$) {
-            this.socket$.next({ action: 'subscribe', symbol: symbol });
+            this.awaitingSnapshot = new Set(this.channels);
+            this.socket$.next({ action: 'subscribe', symbol: symbol, channels: this.channels });
             // Optionally clear current state while waiting
             // this.stateSubject.next(null); 
         }